@@ -0,0 +1,54 @@
+"""
+Micro-benchmark: building the token request on the callback path.
+
+Without a pool each exchange mints its client assertion inline. With
+assertion_pool_size the assertion is popped from a pool that a background
+thread keeps filled; each timed call is preceded by an untimed refill, as
+the refiller would do between callbacks.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_assertion_pool
+"""
+import argparse
+import time
+
+from duo_universal import client
+
+CLIENT_ID = 'DIXXXXXXXXXXXXXXXXXX'
+CLIENT_SECRET = 'deadbeefdeadbeefdeadbeefdeadbeefdeadbeef'
+HOST = 'api-XXXXXXX.test.duosecurity.com'
+REDIRECT_URI = 'https://www.example.com'
+DUO_CODE = 'deadbeefdeadbeefdeadbeefdeadbeef'
+
+
+def time_requests(duo_client, number, refill=None):
+    total = 0
+    for _ in range(number):
+        if refill is not None:
+            refill()
+        start = time.perf_counter()
+        duo_client._build_token_request(DUO_CODE)
+        total += time.perf_counter() - start
+    return total / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-n', '--number', type=int, default=20000,
+                        help='Token requests built per run')
+    args = parser.parse_args()
+
+    inline = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+    pooled = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI, assertion_pool_size=4)
+    pool = pooled._assertion_pools[client.OAUTH_V1_TOKEN_ENDPOINT.format(HOST)]
+    # Refill from this thread only, so the timing is not shared with the refiller
+    pool._wake_refiller = lambda: None
+
+    for name, seconds in (('inline mint', time_requests(inline, args.number)),
+                          ('pooled', time_requests(pooled, args.number, pool.refill))):
+        print('{:<12} {:>10.2f} us/request'.format(name, seconds * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Memory benchmark: resident memory per cached tenant.
+
+Builds the same number of tenants as standalone Clients and through a
+ClientRegistry, where clients on one host share a SessionPool, and
+reports the growth in resident set size per client. Each variant is
+measured in a fresh interpreter so neither reuses memory freed by the
+other. Reads /proc, so it runs on Linux only.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_client_registry
+"""
+import argparse
+import gc
+import subprocess
+import sys
+
+from duo_universal import client
+from duo_universal.registry import ClientRegistry
+
+CLIENT_SECRET = 'deadbeefdeadbeefdeadbeefdeadbeefdeadbe{:02d}'
+HOSTS = ('api-XXXXXXX.test.duosecurity.com', 'api-YYYYYYY.test.duosecurity.com')
+REDIRECT_URI = 'https://www.example.com'
+
+
+def tenant(key):
+    return dict(client_id='DI{:018d}'.format(key), client_secret=CLIENT_SECRET.format(key % 100),
+                host=HOSTS[key % len(HOSTS)], redirect_uri=REDIRECT_URI)
+
+
+def resident_bytes():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * 4096
+
+
+def bytes_per_client(build, number):
+    build(-1)
+    gc.collect()
+    before = resident_bytes()
+    clients = [build(key) for key in range(number)]
+    gc.collect()
+    per_client = (resident_bytes() - before) / number
+    del clients
+    return per_client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-n', '--number', type=int, default=20000,
+                        help='Tenants built per run')
+    parser.add_argument('--variant', choices=('standalone', 'registry'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant == 'standalone':
+        print(bytes_per_client(lambda key: client.Client(**tenant(key)), args.number))
+        return
+    if args.variant == 'registry':
+        registry = ClientRegistry(tenant, max_clients=args.number + 1)
+        print(bytes_per_client(registry.get, args.number))
+        return
+
+    for name in ('standalone', 'registry'):
+        output = subprocess.check_output([sys.executable, '-m', 'benchmarks.bench_client_registry',
+                                          '-n', str(args.number), '--variant', name])
+        print('{:<12} {:>8.0f} bytes/client'.format(name, float(output)))
+
+
+if __name__ == '__main__':
+    main()
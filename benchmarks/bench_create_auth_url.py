@@ -0,0 +1,76 @@
+"""
+Micro-benchmark: building the authorize URL in create_auth_url.
+
+The legacy path builds the full claims dict, signs it with jwt.encode and
+urlencodes the whole query string for every user. The client now
+serializes the constant claims and query prefix once per client and only
+splices in exp, state and duo_uname.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_create_auth_url
+"""
+import argparse
+import time
+import timeit
+import warnings
+from unittest import mock
+from urllib.parse import urlencode
+
+import jwt
+
+from duo_universal import client
+
+CLIENT_ID = 'DIXXXXXXXXXXXXXXXXXX'
+CLIENT_SECRET = 'deadbeefdeadbeefdeadbeefdeadbeefdeadbeef'
+HOST = 'api-XXXXXXX.test.duosecurity.com'
+REDIRECT_URI = 'https://www.example.com/duo-callback'
+USERNAME = 'user1'
+STATE = 'deadbeefdeadbeefdeadbeefdeadbeefdead'
+
+
+def legacy_create_auth_url(duo_client, username, state, nonce=None):
+    jwt_args = {
+        'scope': 'openid',
+        'redirect_uri': duo_client._redirect_uri,
+        'client_id': duo_client._client_id,
+        'iss': duo_client._client_id,
+        'aud': client.API_HOST_URI_FORMAT.format(duo_client._api_host),
+        'exp': time.time() + duo_client._clamped_expiry_duration,
+        'state': state,
+        'response_type': 'code',
+        'duo_uname': username,
+        'use_duo_code_attribute': duo_client._use_duo_code_attribute,
+    }
+    all_args = {
+        'response_type': 'code',
+        'client_id': duo_client._client_id,
+        'request': jwt.encode(jwt_args, duo_client._client_secret, algorithm='HS512'),
+    }
+    if nonce:
+        all_args['nonce'] = nonce
+    return '{}?{}'.format(client.OAUTH_V1_AUTHORIZE_ENDPOINT.format(duo_client._api_host),
+                          urlencode(all_args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-n', '--number', type=int, default=20000,
+                        help='URLs built per timing run')
+    args = parser.parse_args()
+
+    # PyJWT warns about the 40 byte secret on every call
+    warnings.simplefilter('ignore')
+    duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+    with mock.patch('time.time', return_value=time.time()):
+        assert duo_client.create_auth_url(USERNAME, STATE) == \
+            legacy_create_auth_url(duo_client, USERNAME, STATE)
+
+    for name, func in (('legacy', lambda: legacy_create_auth_url(duo_client, USERNAME, STATE)),
+                       ('template', lambda: duo_client.create_auth_url(USERNAME, STATE))):
+        seconds = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+        print('{:<10} {:>10.2f} us/url {:>12,.0f} urls/s'.format(name, seconds * 1e6, 1 / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Macro-benchmark: bulk authorize URL generation.
+
+Compares a create_auth_url loop with create_auth_urls in the calling thread
+and with a pool of worker processes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_create_auth_urls
+"""
+import argparse
+import os
+import time
+
+from duo_universal import client
+
+CLIENT_ID = 'DIXXXXXXXXXXXXXXXXXX'
+CLIENT_SECRET = 'deadbeefdeadbeefdeadbeefdeadbeefdeadbeef'
+HOST = 'api-XXXXXXX.test.duosecurity.com'
+REDIRECT_URI = 'https://www.example.com/duo-callback'
+STATE = 'deadbeefdeadbeefdeadbeefdeadbeefdead'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-n', '--number', type=int, default=100000,
+                        help='URLs generated per run')
+    parser.add_argument('-p', '--processes', type=int, default=os.cpu_count(),
+                        help='Worker processes for the pooled run')
+    args = parser.parse_args()
+
+    duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+    items = [('user{}'.format(i), STATE, None) for i in range(args.number)]
+    runs = (
+        ('create_auth_url loop', lambda: [duo_client.create_auth_url(*item) for item in items]),
+        ('create_auth_urls', lambda: list(duo_client.create_auth_urls(items))),
+        ('create_auth_urls x{}'.format(args.processes),
+         lambda: list(duo_client.create_auth_urls(items, processes=args.processes))),
+    )
+    for name, func in runs:
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+        print('{:<24} {:>8.3f} s {:>12,.0f} urls/s'.format(name, seconds, args.number / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Micro-benchmark: id_token verification after a code exchange.
+
+jwt.decode re-validates the key, re-parses the constant header and keys a
+new HMAC for every token. IdTokenVerifier fixes the audience, issuer and
+leeway per client and checks the signature with the pre-keyed HMAC.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_id_token
+"""
+import argparse
+import time
+import timeit
+import warnings
+
+import jwt
+
+from duo_universal.client import FIVE_MINUTES_IN_SECONDS, LEEWAY, OAUTH_V1_TOKEN_ENDPOINT
+from duo_universal.id_token import IdTokenVerifier
+
+CLIENT_ID = 'DIXXXXXXXXXXXXXXXXXX'
+CLIENT_SECRET = 'deadbeefdeadbeefdeadbeefdeadbeefdeadbeef'
+ISSUER = OAUTH_V1_TOKEN_ENDPOINT.format('api-XXXXXXX.test.duosecurity.com')
+
+
+def pyjwt_decode(token):
+    return jwt.decode(token, CLIENT_SECRET, audience=CLIENT_ID, issuer=ISSUER, leeway=LEEWAY,
+                      algorithms=["HS512"], options={'require': ['exp', 'iat'], 'verify_iat': True})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-n', '--number', type=int, default=20000,
+                        help='Tokens verified per timing run')
+    args = parser.parse_args()
+
+    # PyJWT warns about the 40 byte secret on every call
+    warnings.simplefilter('ignore')
+    now = time.time()
+    token = jwt.encode({
+        'aud': CLIENT_ID,
+        'exp': now + FIVE_MINUTES_IN_SECONDS,
+        'iat': now,
+        'iss': ISSUER,
+        'preferred_username': 'user1',
+        'auth_result': {'result': 'allow', 'status': 'allow', 'status_msg': 'Login Successful'},
+    }, CLIENT_SECRET, algorithm='HS512')
+    verifier = IdTokenVerifier(CLIENT_SECRET, CLIENT_ID, ISSUER, LEEWAY)
+    assert verifier.verify(token) == pyjwt_decode(token)
+
+    for name, func in (('jwt.decode', lambda: pyjwt_decode(token)),
+                       ('IdTokenVerifier', lambda: verifier.verify(token))):
+        seconds = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+        print('{:<16} {:>10.2f} us/token {:>12,.0f} tokens/s'.format(name, seconds * 1e6, 1 / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Micro-benchmark: 36 character state/jti strings.
+
+The old generator built a random.SystemRandom and made one os.urandom
+backed choice() per character. The buffered generator reads os.urandom in
+blocks and maps them to the alphabet with one bytes.translate call.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_random_string
+"""
+import argparse
+import random
+import string
+import timeit
+
+from duo_universal.client import STATE_LENGTH
+from duo_universal.csprng import random_alphanumeric
+
+
+def system_random_choice():
+    generator = random.SystemRandom()
+    characters = string.ascii_letters + string.digits
+    return ''.join(generator.choice(characters) for i in range(STATE_LENGTH))
+
+
+def buffered():
+    return random_alphanumeric(STATE_LENGTH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-n', '--number', type=int, default=20000,
+                        help='Strings generated per timing run')
+    args = parser.parse_args()
+
+    for name, func in (('SystemRandom.choice', system_random_choice),
+                       ('buffered urandom', buffered)):
+        seconds = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+        print('{:<20} {:>10.2f} us/string {:>12,.0f} strings/s'.format(name, seconds * 1e6, 1 / seconds))
+
+
+if __name__ == '__main__':
+    main()
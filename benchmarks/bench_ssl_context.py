@@ -0,0 +1,45 @@
+"""
+Micro-benchmark: per-connection TLS context setup.
+
+With `verify=<bundle path>` urllib3 builds a new SSLContext and parses the
+CA bundle for every new connection. The client now loads each bundle once
+into a shared context, so a new connection only looks that context up.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ssl_context
+"""
+import argparse
+import timeit
+
+from urllib3.util.ssl_ import create_urllib3_context
+
+from duo_universal.client import DEFAULT_CA_CERT_PATH
+from duo_universal.tls import get_ssl_context
+
+
+def per_connection_context():
+    context = create_urllib3_context()
+    context.load_verify_locations(DEFAULT_CA_CERT_PATH)
+    return context
+
+
+def shared_context():
+    return get_ssl_context(DEFAULT_CA_CERT_PATH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-n', '--number', type=int, default=2000,
+                        help='Context setups per timing run')
+    args = parser.parse_args()
+
+    shared_context()
+    for name, func in (('per-connection load', per_connection_context),
+                       ('shared context', shared_context)):
+        seconds = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+        print('{:<22} {:>10.2f} us/connection'.format(name, seconds * 1e6))
+
+
+if __name__ == '__main__':
+    main()
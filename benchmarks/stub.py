@@ -0,0 +1,154 @@
+"""
+Local stand-in for the Duo OAuth endpoints used by the macro-benchmarks.
+
+DuoStub serves the health check and token endpoints over HTTPS with
+HTTP/1.1 keep-alive on 127.0.0.1, using a throwaway self-signed
+certificate made with the openssl command line tool. Token responses
+carry an id_token signed with the client secret, so clients pointed at
+the stub run their real request, TLS and verification code. The server
+runs in its own process so it does not compete with the benchmarked
+client for the GIL.
+"""
+import http.server
+import json
+import multiprocessing
+import os
+import shutil
+import ssl
+import subprocess
+import tempfile
+import time
+import warnings
+from urllib.parse import parse_qs, urlsplit
+
+import jwt
+
+from duo_universal.client import FIVE_MINUTES_IN_SECONDS, OAUTH_V1_TOKEN_ENDPOINT
+
+ERR_OPENSSL_MISSING = 'The local Duo stub needs the openssl command line tool to make its certificate.'
+
+
+def make_certificate(directory):
+    """
+    Writes a self-signed certificate and key for 127.0.0.1 to `directory`
+
+    Returns:
+
+    The certificate and key paths
+    """
+    if shutil.which('openssl') is None:
+        raise RuntimeError(ERR_OPENSSL_MISSING)
+    cert = os.path.join(directory, 'stub.crt')
+    key = os.path.join(directory, 'stub.key')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'ec', '-pkeyopt', 'ec_paramgen_curve:prime256v1',
+                    '-nodes', '-days', '1', '-subj', '/CN=127.0.0.1',
+                    '-addext', 'subjectAltName=IP:127.0.0.1',
+                    '-keyout', key, '-out', cert],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return cert, key
+
+
+class _StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # The headers and body are separate writes; without this every
+    # response waits out the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        if url.path == '/oauth/v1/health_check':
+            self._reply(200, {'stat': 'OK', 'response': {'timestamp': int(time.time())}})
+        elif url.path == '/oauth/v1/token':
+            code = parse_qs(url.query).get('code', [''])[0]
+            self._reply(200, {'id_token': self.server.id_token(code)})
+        else:
+            self._reply(404, {'stat': 'FAIL', 'message': 'Not found'})
+
+    def _reply(self, status, body):
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _StubServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, client_id, client_secret, username, cert, key):
+        super().__init__(('127.0.0.1', 0), _StubHandler)
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.username = username
+        self.host = '127.0.0.1:{}'.format(self.server_address[1])
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        self.socket = context.wrap_socket(self.socket, server_side=True)
+
+    def id_token(self, code):
+        now = time.time()
+        return jwt.encode({
+            'aud': self.client_id,
+            'exp': now + FIVE_MINUTES_IN_SECONDS,
+            'iat': now,
+            'iss': OAUTH_V1_TOKEN_ENDPOINT.format(self.host),
+            'preferred_username': self.username,
+            'nonce': code,
+            'auth_result': {'result': 'allow', 'status': 'allow', 'status_msg': 'Login Successful'},
+        }, self.client_secret, algorithm='HS512')
+
+
+def _serve(connection, *args):
+    # PyJWT warns about short test secrets on every call
+    warnings.simplefilter('ignore')
+    server = _StubServer(*args)
+    connection.send(server.host)
+    connection.close()
+    server.serve_forever()
+
+
+class DuoStub:
+    """
+    HTTPS server answering like Duo for one client, usable as a context manager
+
+    Every exchange succeeds for `username`, and the duo_code is echoed back
+    as the id_token nonce, so a caller passing the same string as code and
+    nonce gets a fully verifiable token without telling the stub about it.
+    """
+
+    def __init__(self, client_id, client_secret, username):
+        self._args = (client_id, client_secret, username)
+        self._directory = tempfile.mkdtemp(prefix='duo-stub-')
+        self.ca_certs, self._key = make_certificate(self._directory)
+        self._process = None
+        self.host = None
+
+    def start(self):
+        context = multiprocessing.get_context('spawn')
+        receiver, sender = context.Pipe(duplex=False)
+        self._process = context.Process(target=_serve, args=(sender,) + self._args + (self.ca_certs, self._key),
+                                        daemon=True)
+        self._process.start()
+        sender.close()
+        self.host = receiver.recv()
+        receiver.close()
+        return self
+
+    def close(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
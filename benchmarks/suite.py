@@ -0,0 +1,416 @@
+"""
+Benchmark suite for the duo_universal hot paths.
+
+Micro-benchmarks time single client operations in-process. Macro-benchmarks
+run health checks and whole logins (create_auth_url, then the code
+exchange) against a local HTTPS stub of Duo, so they include the real
+connection pool, TLS, request and id_token verification code. Results are
+saved as JSON, and two result files can be compared to flag benchmarks
+that slowed down by more than a threshold.
+
+Run from the repository root:
+
+    python -m benchmarks.suite run -o before.json
+    python -m benchmarks.suite run -o after.json
+    python -m benchmarks.suite compare before.json after.json
+
+compare exits with status 1 when any benchmark regressed. Run both sides
+on the same quiet machine and Python; the bench_*.py scripts next to this
+one compare each optimization with the code it replaced.
+
+The suite's own tests live beside it, outside the installed package's test
+tree, and also run from the repository root:
+
+    python -m unittest benchmarks.test_suite
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+import warnings
+from unittest import mock
+
+import jwt
+
+from duo_universal import client
+from duo_universal.version import __version__
+
+CLIENT_ID = 'DIXXXXXXXXXXXXXXXXXX'
+CLIENT_SECRET = 'deadbeefdeadbeefdeadbeefdeadbeefdeadbeef'
+HOST = 'api-XXXXXXX.test.duosecurity.com'
+REDIRECT_URI = 'https://www.example.com/duo-callback'
+USERNAME = 'user1'
+STATE = 'deadbeefdeadbeefdeadbeefdeadbeefdead'
+TOKEN_ENDPOINT = client.OAUTH_V1_TOKEN_ENDPOINT.format(HOST)
+
+MICRO = 'micro'
+MACRO = 'macro'
+# Version of the result file layout
+RESULTS_FORMAT = 1
+# Slowdown, as a fraction of the baseline, that compare reports as a regression
+DEFAULT_THRESHOLD = 0.10
+# Interleaved passes over the selected benchmarks
+DEFAULT_ROUNDS = 3
+# Timing runs per micro-benchmark and round; the fastest is compared
+DEFAULT_REPEAT = 3
+# Timed calls per macro-benchmark and round; the median is compared
+DEFAULT_ITERATIONS = 100
+# Untimed calls made before each benchmark is measured
+DEFAULT_WARMUP = 30
+
+BENCHMARKS = {}
+
+
+def benchmark(name, kind):
+    """
+    Registers a benchmark factory under `name`
+
+    The factory receives the Fixtures of the run and returns the callable
+    to time.
+    """
+    def register(factory):
+        BENCHMARKS[name] = (kind, factory)
+        return factory
+    return register
+
+
+def id_token(issuer, username=USERNAME, nonce=None):
+    now = time.time()
+    claims = {
+        'aud': CLIENT_ID,
+        'exp': now + client.FIVE_MINUTES_IN_SECONDS,
+        'iat': now,
+        'iss': issuer,
+        'preferred_username': username,
+        'auth_result': {'result': 'allow', 'status': 'allow', 'status_msg': 'Login Successful'},
+    }
+    if nonce:
+        claims['nonce'] = nonce
+    return jwt.encode(claims, CLIENT_SECRET, algorithm='HS512')
+
+
+class Fixtures:
+    """
+    Clients shared by the benchmarks of one run, built on first use
+    """
+
+    def __init__(self):
+        self._client = None
+        self._stub = None
+        self._stub_client = None
+        self._clients = []
+
+    def new_client(self, host=HOST, **kwargs):
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, host, REDIRECT_URI, **kwargs)
+        self._clients.append(duo_client)
+        return duo_client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self.new_client()
+        return self._client
+
+    @property
+    def stub(self):
+        if self._stub is None:
+            # Imported here so the micro-benchmarks run without openssl
+            from benchmarks.stub import DuoStub
+            self._stub = DuoStub(CLIENT_ID, CLIENT_SECRET, USERNAME).start()
+        return self._stub
+
+    @property
+    def stub_client(self):
+        if self._stub_client is None:
+            self._stub_client = self.new_client(self.stub.host, duo_certs=self.stub.ca_certs)
+        return self._stub_client
+
+    def close(self):
+        for duo_client in self._clients:
+            duo_client.close()
+        if self._stub is not None:
+            self._stub.close()
+
+
+@benchmark('create_auth_url', MICRO)
+def bench_create_auth_url(fixtures):
+    duo_client = fixtures.client
+    return lambda: duo_client.create_auth_url(USERNAME, STATE)
+
+
+@benchmark('create_jwt_args', MICRO)
+def bench_create_jwt_args(fixtures):
+    duo_client = fixtures.client
+    return lambda: duo_client._create_jwt_args(TOKEN_ENDPOINT)
+
+
+@benchmark('generate_rand_alphanumeric', MICRO)
+def bench_generate_rand_alphanumeric(fixtures):
+    duo_client = fixtures.client
+    return lambda: duo_client._generate_rand_alphanumeric(client.STATE_LENGTH)
+
+
+@benchmark('jwt_encode_client_assertion', MICRO)
+def bench_jwt_encode(fixtures):
+    duo_client = fixtures.client
+    return lambda: duo_client._mint_client_assertion(TOKEN_ENDPOINT)
+
+
+@benchmark('jwt_decode_id_token', MICRO)
+def bench_jwt_decode(fixtures):
+    verifier = fixtures.client._id_token_verifier
+    token = id_token(TOKEN_ENDPOINT)
+    return lambda: verifier.verify(token)
+
+
+@benchmark('exchange_in_process', MICRO)
+def bench_exchange_in_process(fixtures):
+    # The token request and response handling without a network round trip
+    duo_client = fixtures.new_client()
+    response = mock.MagicMock(status_code=200)
+    response.json.return_value = {'id_token': id_token(TOKEN_ENDPOINT)}
+    session = duo_client._session_pool.checkout()
+    duo_client._session_pool.checkin()
+    session.post = mock.MagicMock(return_value=response)
+    return lambda: duo_client.exchange_authorization_code_for_2fa_result('duo_code', USERNAME)
+
+
+@benchmark('health_check_stub', MACRO)
+def bench_health_check_stub(fixtures):
+    duo_client = fixtures.stub_client
+    return duo_client.health_check
+
+
+@benchmark('login_stub', MACRO)
+def bench_login_stub(fixtures):
+    duo_client = fixtures.stub_client
+
+    def login():
+        state = duo_client.generate_state()
+        nonce = duo_client.generate_state()
+        duo_client.create_auth_url(USERNAME, state, nonce)
+        # The stub returns the duo_code as the id_token nonce
+        return duo_client.exchange_authorization_code_for_2fa_result(nonce, USERNAME, nonce)
+    return login
+
+
+def time_micro(func, number, repeat):
+    """
+    Returns the seconds per call of `repeat` timeit runs of `number` calls
+    """
+    return [elapsed / number for elapsed in timeit.Timer(func).repeat(repeat=repeat, number=number)]
+
+
+def time_macro(func, iterations):
+    """
+    Returns the seconds taken by each of `iterations` calls, timed with the
+    garbage collector off as timeit does
+    """
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return samples
+
+
+def summarize(kind, timings):
+    """
+    Returns the result dict of a benchmark from all of its timings
+
+    'seconds', the value compared between runs, is the fastest run per
+    call of a micro-benchmark and the median call of a macro-benchmark.
+    """
+    timings = sorted(timings)
+    median = statistics.median(timings)
+    return {
+        'kind': kind,
+        'seconds': timings[0] if kind == MICRO else median,
+        'best': timings[0],
+        'median': median,
+        'p95': timings[min(int(len(timings) * 0.95), len(timings) - 1)],
+        'samples': len(timings),
+    }
+
+
+def run(names, rounds=DEFAULT_ROUNDS, repeat=DEFAULT_REPEAT, iterations=DEFAULT_ITERATIONS,
+        warmup=DEFAULT_WARMUP):
+    """
+    Runs the named benchmarks
+
+    Arguments:
+
+    names           -- Names of the benchmarks to run
+    rounds          -- Passes over all the benchmarks. Interleaving them
+                       spreads a noisy spell of the machine over every
+                       benchmark instead of skewing one.
+    repeat          -- Timing runs per micro-benchmark and round
+    iterations      -- Timed calls per macro-benchmark and round
+    warmup          -- Untimed calls before each benchmark is first timed
+
+    Returns:
+
+    The results document: {'format', 'metadata', 'benchmarks': {name: result}}
+    """
+    timings = {name: [] for name in names}
+    numbers = {}
+    fixtures = Fixtures()
+    with warnings.catch_warnings():
+        # PyJWT warns about the 40 byte secret on every call
+        warnings.simplefilter('ignore')
+        try:
+            funcs = {name: BENCHMARKS[name][1](fixtures) for name in names}
+            for name in names:
+                for _ in range(warmup):
+                    funcs[name]()
+                if BENCHMARKS[name][0] == MICRO:
+                    # Calls per timing run, calibrated to about 0.2 s
+                    numbers[name] = timeit.Timer(funcs[name]).autorange()[0]
+            for _ in range(rounds):
+                for name in names:
+                    gc.collect()
+                    if name in numbers:
+                        timings[name].extend(time_micro(funcs[name], numbers[name], repeat))
+                    else:
+                        timings[name].extend(time_macro(funcs[name], iterations))
+        finally:
+            fixtures.close()
+    return {
+        'format': RESULTS_FORMAT,
+        'metadata': {
+            'duo_universal': __version__,
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        },
+        'benchmarks': {name: summarize(BENCHMARKS[name][0], timings[name]) for name in names},
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares two results documents benchmark by benchmark
+
+    Returns:
+
+    A list of (name, baseline seconds, current seconds, ratio, status)
+    sorted by name, where status is 'regression' when the current time
+    exceeds the baseline by more than `threshold`, 'improvement' when it
+    is faster by the same factor, 'ok' in between, and 'new' or 'missing'
+    when only one side ran the benchmark
+    """
+    before = baseline['benchmarks']
+    after = current['benchmarks']
+    rows = []
+    for name in sorted(set(before) | set(after)):
+        if name not in before:
+            rows.append((name, None, after[name]['seconds'], None, 'new'))
+            continue
+        if name not in after:
+            rows.append((name, before[name]['seconds'], None, None, 'missing'))
+            continue
+        old, new = before[name]['seconds'], after[name]['seconds']
+        ratio = new / old
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 / (1 + threshold):
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append((name, old, new, ratio, status))
+    return rows
+
+
+def _micros(seconds):
+    return '-' if seconds is None else '{:.2f}'.format(seconds * 1e6)
+
+
+def print_result(name, result):
+    print('{:<28} {:<6} {:>12} us/op {:>12,.0f} ops/s'.format(
+        name, result['kind'], _micros(result['seconds']), 1 / result['seconds']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    run_parser = commands.add_parser('run', help='Run benchmarks and optionally save the results')
+    run_parser.add_argument('-o', '--output', help='JSON file to write the results to')
+    run_parser.add_argument('-k', '--select', action='append', default=[],
+                            help='Only run benchmarks whose name contains this; may be repeated')
+    run_parser.add_argument('--micro', action='store_true', help='Only run the micro-benchmarks')
+    run_parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS,
+                            help='Interleaved passes over the benchmarks')
+    run_parser.add_argument('-r', '--repeat', type=int, default=DEFAULT_REPEAT,
+                            help='Timing runs per micro-benchmark and round')
+    run_parser.add_argument('-n', '--iterations', type=int, default=DEFAULT_ITERATIONS,
+                            help='Timed calls per macro-benchmark and round')
+    run_parser.add_argument('-w', '--warmup', type=int, default=DEFAULT_WARMUP,
+                            help='Untimed calls before each benchmark')
+
+    compare_parser = commands.add_parser('compare', help='Compare two result files')
+    compare_parser.add_argument('baseline', help='Results to compare against')
+    compare_parser.add_argument('current', help='Results to check')
+    compare_parser.add_argument('-t', '--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='Slowdown fraction reported as a regression (default %(default)s)')
+
+    commands.add_parser('list', help='List the benchmarks')
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for name, (kind, factory) in BENCHMARKS.items():
+            print('{:<28} {}'.format(name, kind))
+        return 0
+
+    if args.command == 'run':
+        names = [name for name, (kind, factory) in BENCHMARKS.items()
+                 if not args.micro or kind == MICRO]
+        if args.select:
+            names = [name for name in names if any(pattern in name for pattern in args.select)]
+        if not names:
+            parser.error('no benchmark matches the selection')
+        results = run(names, rounds=args.rounds, repeat=args.repeat, iterations=args.iterations,
+                      warmup=args.warmup)
+        for name, result in results['benchmarks'].items():
+            print_result(name, result)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+                f.write('\n')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    for key in ('python', 'implementation', 'machine'):
+        if baseline['metadata'].get(key) != current['metadata'].get(key):
+            print('warning: {} differs: {} vs {}'.format(
+                key, baseline['metadata'].get(key), current['metadata'].get(key)))
+    rows = compare(baseline, current, args.threshold)
+    print('{:<28} {:>12} {:>12} {:>8}  {}'.format('benchmark', 'before us', 'after us', 'ratio', 'status'))
+    for name, old, new, ratio, status in rows:
+        print('{:<28} {:>12} {:>12} {:>8}  {}'.format(
+            name, _micros(old), _micros(new), '-' if ratio is None else '{:.3f}'.format(ratio), status))
+    regressions = [row for row in rows if row[4] == 'regression']
+    if regressions:
+        print('{} benchmark(s) regressed by more than {:.0%}'.format(len(regressions), args.threshold))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+from benchmarks import suite
+from mock import patch
+import io
+import json
+import os
+import tempfile
+import unittest
+
+
+def results(**seconds):
+    return {
+        'format': suite.RESULTS_FORMAT,
+        'metadata': {'python': '3.11.7', 'implementation': 'CPython', 'machine': 'x86_64'},
+        'benchmarks': {name: {'kind': suite.MICRO, 'seconds': value} for name, value in seconds.items()},
+    }
+
+
+class TestCompare(unittest.TestCase):
+
+    def test_statuses(self):
+        """
+        Test that each benchmark is classified against the threshold
+        """
+        baseline = results(same=1.0, slower=1.0, faster=1.0, edge=1.0, gone=1.0)
+        current = results(same=1.05, slower=1.2, faster=0.8, edge=1.1, added=1.0)
+        rows = {row[0]: row for row in suite.compare(baseline, current, threshold=0.1)}
+        self.assertEqual({name: row[4] for name, row in rows.items()}, {
+            'added': 'new',
+            'edge': 'ok',
+            'faster': 'improvement',
+            'gone': 'missing',
+            'same': 'ok',
+            'slower': 'regression',
+        })
+        self.assertAlmostEqual(rows['slower'][3], 1.2)
+        self.assertEqual(rows['gone'][1:4], (1.0, None, None))
+
+    def test_exit_status(self):
+        """
+        Test that the compare command fails only when a benchmark regressed
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            paths = {}
+            for name, seconds in (('base', 1.0), ('ok', 1.05), ('slow', 1.5)):
+                paths[name] = os.path.join(directory, name + '.json')
+                with open(paths[name], 'w') as f:
+                    json.dump(results(create_auth_url=seconds), f)
+            with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+                self.assertEqual(suite.main(['compare', paths['base'], paths['ok']]), 0)
+                self.assertEqual(suite.main(['compare', paths['base'], paths['slow']]), 1)
+                self.assertEqual(suite.main(['compare', paths['base'], paths['slow'], '-t', '0.6']), 0)
+        self.assertIn('1 benchmark(s) regressed by more than 10%', stdout.getvalue())
+
+
+class TestRun(unittest.TestCase):
+
+    def test_summarize(self):
+        """
+        Test that micro-benchmarks compare their best run and macro-benchmarks their median call
+        """
+        timings = [3.0, 1.0, 2.0, 5.0, 4.0]
+        self.assertEqual(suite.summarize(suite.MICRO, timings)['seconds'], 1.0)
+        macro = suite.summarize(suite.MACRO, timings)
+        self.assertEqual((macro['seconds'], macro['best'], macro['p95'], macro['samples']), (3.0, 1.0, 5.0, 5))
+
+    def test_run_micro_benchmarks(self):
+        """
+        Test that a run writes a JSON serializable result per selected benchmark
+        """
+        names = ['create_jwt_args', 'exchange_in_process']
+        document = suite.run(names, rounds=2, repeat=1, warmup=1)
+        self.assertEqual(sorted(document['benchmarks']), names)
+        for result in document['benchmarks'].values():
+            self.assertEqual(result['kind'], suite.MICRO)
+            self.assertEqual(result['samples'], 2)
+            self.assertGreater(result['seconds'], 0)
+        self.assertEqual(json.loads(json.dumps(document)), document)
+
+
+if __name__ == '__main__':
+    unittest.main()
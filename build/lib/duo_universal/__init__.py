@@ -0,0 +1,8 @@
+from duo_universal.client import *
+from duo_universal.async_client import AsyncClient
+from duo_universal.health import HealthMonitor, HealthStatus
+from duo_universal.metrics import ClientStats, prometheus_text
+from duo_universal.state_store import InMemoryStateStore, RemoteStateStore, StateStore
+from duo_universal.registry import ClientRegistry
+from duo_universal.tracing import NoOpTracer, OpenTelemetryTracer
+from duo_universal.version import __version__
@@ -0,0 +1,145 @@
+import collections
+import threading
+import time
+
+from duo_universal.fork import reset_in_forked_child
+
+# Unused assertions kept ready per endpoint
+DEFAULT_ASSERTION_POOL_SIZE = 4
+# Assertions with less than this many seconds before exp are never handed out
+DEFAULT_ASSERTION_MIN_REMAINING = 60
+
+
+class ClientAssertionPool:
+    """
+    Keeps a few unused client assertions for one endpoint minted ahead of time.
+
+    take() pops a ready assertion in constant time. A daemon thread, started
+    by the first take(), mints replacements after each take and re-mints
+    entries whose remaining lifetime has dropped below `min_remaining`.
+    Every assertion is handed out at most once, so each jti is used once;
+    a forked child therefore discards the assertions minted by its parent.
+    """
+
+    def __init__(self, mint, size=DEFAULT_ASSERTION_POOL_SIZE,
+                 min_remaining=DEFAULT_ASSERTION_MIN_REMAINING):
+        """
+        Arguments:
+
+        mint            -- Callable returning a new (assertion, exp) pair
+        size            -- Maximum number of unused assertions kept
+        min_remaining   -- Seconds of lifetime an assertion must have left to be handed out
+        """
+        self._mint = mint
+        self._size = size
+        self._min_remaining = min_remaining
+        self._entries = collections.deque()
+        self._wakeup = threading.Condition()
+        self._stop_event = None
+        self._thread = None
+        reset_in_forked_child(self)
+
+    def _after_fork_in_child(self):
+        # The refiller thread did not survive the fork; the next take()
+        # starts a new one
+        self._wakeup = threading.Condition()
+        self._stop_event = None
+        self._thread = None
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def take(self):
+        """
+        Returns an unused assertion, or None if none is ready
+
+        Callers mint inline when None is returned; the refiller catches up
+        in the background.
+        """
+        assertion = None
+        deadline = time.time() + self._min_remaining
+        while True:
+            try:
+                candidate, exp = self._entries.popleft()
+            except IndexError:
+                break
+            if exp >= deadline:
+                assertion = candidate
+                break
+        self._wake_refiller()
+        return assertion
+
+    def _wake_refiller(self):
+        with self._wakeup:
+            if self._thread is None:
+                self._stop_event = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stop_event,),
+                                                name='duo-assertion-pool', daemon=True)
+                self._thread.start()
+            self._wakeup.notify()
+
+    def _evict_expiring(self):
+        deadline = time.time() + self._min_remaining
+        while self._entries and self._entries[0][1] < deadline:
+            try:
+                self._entries.popleft()
+            except IndexError:
+                break
+
+    def refill(self, stop_event=None):
+        """
+        Evicts expiring assertions and mints new ones up to the pool size
+
+        Returns:
+
+        Whether the pool was filled
+        """
+        self._evict_expiring()
+        while len(self._entries) < self._size:
+            if stop_event is not None and stop_event.is_set():
+                return False
+            assertion, exp = self._mint()
+            if exp < time.time() + self._min_remaining:
+                # The configured lifetime is too short to ever be handed out
+                return False
+            self._entries.append((assertion, exp))
+        return True
+
+    def _next_expiry_wait(self):
+        try:
+            exp = self._entries[0][1]
+        except IndexError:
+            return None
+        return max(exp - self._min_remaining - time.time(), 0)
+
+    def _run(self, stop_event):
+        while not stop_event.is_set():
+            try:
+                filled = self.refill(stop_event)
+            except Exception:
+                # take() keeps returning None, so callers mint inline and
+                # see the error themselves
+                filled = False
+            with self._wakeup:
+                if stop_event.is_set():
+                    return
+                if filled and len(self._entries) < self._size:
+                    # An assertion was taken while refilling
+                    continue
+                self._wakeup.wait(self._next_expiry_wait() if filled else None)
+
+    def stop(self):
+        """
+        Stops the refiller and drops the unused assertions
+
+        The pool remains usable; the next take() starts a new refiller.
+        """
+        with self._wakeup:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._stop_event.set()
+                self._wakeup.notify_all()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._entries.clear()
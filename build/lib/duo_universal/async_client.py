@@ -0,0 +1,329 @@
+import asyncio
+import copy
+import time
+from functools import partial
+from duo_universal.client import (
+    Client,
+    DuoException,
+    DuoDeadlineExceededException,
+    DuoTimeoutException,
+    ERR_CODE,
+    ERR_DEADLINE_EXCEEDED,
+    OAUTH_V1_HEALTH_CHECK_ENDPOINT,
+    OAUTH_V1_TOKEN_ENDPOINT,
+)
+from duo_universal.fork import reset_in_forked_child
+from duo_universal.instrumentation import (
+    OPERATION_HEALTH_CHECK,
+    OPERATION_TOKEN_EXCHANGE,
+    OUTCOME_OK,
+    PHASE_REQUEST,
+    PHASE_VERIFY,
+)
+from duo_universal.singleflight import AsyncSingleFlight
+from duo_universal.token_cache import token_exchange_key
+from duo_universal.tracing import SPAN_SIGN, SPAN_VERIFY
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - exercised only without the async extra
+    httpx = None
+
+ERR_HTTPX_MISSING = 'AsyncClient requires httpx. Install it with `pip install duo_universal[async]`.'
+
+
+class AsyncClient(Client):
+    """
+    asyncio flavour of Client.
+
+    Input validation, JWT minting and id_token verification are shared with
+    Client; health_check and exchange_authorization_code_for_2fa_result are
+    awaitable and run on a pooled httpx.AsyncClient. Observers receive the
+    same events as with Client, except the connect and tls phases.
+    """
+    if httpx is not None:
+        _retryable_exceptions = (httpx.NetworkError, httpx.TimeoutException, httpx.RemoteProtocolError)
+        _transport_exceptions = (httpx.HTTPError, DuoTimeoutException)
+    _non_retryable_exceptions = ()
+
+    def __init__(self, *args, **kwargs):
+        """
+        Initializes instance of AsyncClient class
+
+        Accepts the same arguments as Client. The pool settings map onto the
+        httpx connection limits: pool_maxsize bounds the connections per
+        client and pool_idle_timeout is the keep-alive expiry. A per-call
+        deadline bounds the whole request, not just each socket operation.
+        """
+        if httpx is None:
+            raise DuoException(ERR_HTTPX_MISSING)
+        super().__init__(*args, **kwargs)
+        self._async_session = None
+        self._async_health_check_flight = AsyncSingleFlight()
+        self._async_token_exchange_flight = AsyncSingleFlight()
+        reset_in_forked_child(self)
+
+    def _after_fork_in_child(self):
+        # The inherited httpx client is bound to the parent's connections
+        self._async_session = None
+
+    def _build_async_session(self):
+        """
+        Creates the httpx client holding this client's connection pool
+        """
+        pool = self._session_pool
+        limits = httpx.Limits(max_connections=pool.pool_maxsize,
+                              max_keepalive_connections=pool.pool_maxsize,
+                              keepalive_expiry=pool.pool_idle_timeout)
+        timeout = httpx.Timeout(connect=self._connect_timeout,
+                                read=self._read_timeout,
+                                write=self._read_timeout,
+                                pool=self._connect_timeout)
+        proxy = self._http_proxy['https'] if self._http_proxy else None
+        return httpx.AsyncClient(verify=self._async_verify(),
+                                 proxy=proxy,
+                                 limits=limits,
+                                 timeout=timeout)
+
+    def _async_verify(self):
+        context = self._shared_ssl_context()
+        return context if context is not None else False
+
+    def _request_never_sent(self, error):
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+    async def _observed_apost(self, timer, url, **kwargs):
+        """
+        Awaits _apost, timing it as the request phase of `timer`
+        """
+        timer.begin(PHASE_REQUEST)
+        return await self._apost(url, **kwargs)
+
+    async def _apost(self, url, expires_at=None, idempotent=True, **kwargs):
+        """
+        POSTs to a Duo endpoint over the client's pooled httpx session through
+        the circuit breaker, retrying transient failures according to the
+        client's retry policy
+
+        Raises:
+
+        DuoCircuitOpenException if the circuit breaker rejects the call
+        DuoTimeoutException if the request times out or `expires_at` passes
+        """
+        breaker = self._circuit_breaker
+        if breaker is None:
+            return await self._apost_with_retries(url, expires_at, idempotent, **kwargs)
+        breaker.before_call()
+        try:
+            response = await self._apost_with_retries(url, expires_at, idempotent, **kwargs)
+        except Exception as e:
+            self._record_error(breaker, e)
+            raise
+        except BaseException:
+            # Cancellation must also release a half-open trial slot
+            breaker.record_abandoned()
+            raise
+        breaker.record_response(response)
+        return response
+
+    async def _apost_with_retries(self, url, expires_at, idempotent, **kwargs):
+        if self._async_session is None:
+            self._async_session = self._build_async_session()
+        attempt = 1
+        while True:
+            remaining = None
+            if expires_at is not None:
+                remaining = expires_at - time.monotonic()
+                if remaining <= 0:
+                    raise DuoDeadlineExceededException(ERR_DEADLINE_EXCEEDED)
+            try:
+                response = await asyncio.wait_for(self._async_session.post(url, **kwargs), remaining)
+            except asyncio.TimeoutError as e:
+                # Only the caller's deadline bounds the wait
+                raise DuoDeadlineExceededException(e)
+            except Exception as e:
+                delay = self._retry_delay(attempt, expires_at, self._is_retryable_error(e, idempotent))
+                if delay is None:
+                    if isinstance(e, httpx.TimeoutException):
+                        raise DuoTimeoutException(e)
+                    raise
+            else:
+                delay = self._retry_delay(attempt, expires_at,
+                                          self._is_retryable_response(response, idempotent))
+                if delay is None:
+                    return response
+                await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self):
+        """
+        Closes the pooled connections held by this client.
+
+        The client remains usable; a later call opens new connections.
+        """
+        session, self._async_session = self._async_session, None
+        if session is not None:
+            await session.aclose()
+
+    async def warm(self, connections=1, deadline=None):
+        """
+        Awaitable counterpart of Client.warm(); the connections are opened
+        on this client's httpx pool
+        """
+        expires_at = self._deadline_expiry(deadline)
+        connections = self._prepare_warm(connections)
+        await asyncio.gather(*[self._check_health(expires_at) for _ in range(connections)])
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def health_check(self, deadline=None):
+        """
+        Checks whether Duo is available.
+
+        Arguments:
+
+        deadline        -- (Optional) Maximum number of seconds the call may take
+
+        Returns:
+
+        {'response': {'timestamp': <int:unix timestamp>}, 'stat': 'OK'}
+
+        Raises:
+
+        DuoException on error for invalid credentials
+        or problem connecting to Duo
+        DuoTimeoutException if Duo does not answer in time
+        DuoCircuitOpenException if calls to Duo are suspended
+
+        Concurrent calls share one in-flight request as in Client.health_check.
+        When the client was created with health_check_ttl the result may be
+        served from memory; see Client.__init__ for the cache settings.
+        """
+        share = partial(self._coalesced_health_check, deadline)
+        if self._health_check_cache is not None:
+            return await self._health_check_cache.aget(self._check_health, share)
+        return await share(self._check_health)
+
+    async def _coalesced_health_check(self, deadline, check):
+        """
+        Awaits `check`, or waits up to `deadline` seconds for the one already
+        in flight for this client's host
+        """
+        try:
+            return await self._async_health_check_flight.do(self._api_host, check, deadline)
+        except asyncio.TimeoutError:
+            raise DuoDeadlineExceededException(ERR_DEADLINE_EXCEEDED)
+
+    async def _check_health(self, expires_at=None):
+        """
+        Sends a health check to Duo, bypassing any cached result
+        """
+        timer = self._call_timer(OPERATION_HEALTH_CHECK, OAUTH_V1_HEALTH_CHECK_ENDPOINT)
+        with self._http_span(OAUTH_V1_HEALTH_CHECK_ENDPOINT) as span:
+            with self._tracer.start_span(SPAN_SIGN, parent=span):
+                health_check_endpoint, all_args = self._build_health_check_request()
+            status_code = None
+            try:
+                response = await self._observed_apost(timer, health_check_endpoint,
+                                                      expires_at=expires_at,
+                                                      data=all_args,
+                                                      headers=span.inject({}))
+                status_code = response.status_code
+                span.set_attribute('http.response.status_code', status_code)
+                timer.begin(PHASE_VERIFY)
+                res = self._parse_health_check_response(response)
+            except self._passthrough_exceptions as e:
+                self._call_failed(timer, span, status_code, e)
+                raise
+            except Exception as e:
+                self._call_failed(timer, span, status_code, e)
+                raise DuoException(e)
+
+        timer.finish(status_code, OUTCOME_OK)
+        return res
+
+    async def exchange_authorization_code_for_2fa_result(self, duoCode, username, nonce=None, deadline=None):
+        """
+        Exchange the duo_code for a token with Duo to determine
+        if the auth was successful.
+
+        Argument:
+
+        duoCode         -- Authentication session transaction id
+                           returned by Duo
+        username        -- Name of the user authenticating with Duo
+        nonce           -- Random 36B string used to associate
+                           a session with an ID token
+        deadline        -- (Optional) Maximum number of seconds the call may take
+
+        Return:
+
+        A token with meta-data about the auth
+
+        Raises:
+
+        DuoException on error for invalid duo_codes, invalid credentials,
+        or problems connecting to Duo
+        DuoTimeoutException if Duo does not answer in time
+        DuoCircuitOpenException if calls to Duo are suspended
+
+        Duplicate calls are coalesced and cached as in
+        Client.exchange_authorization_code_for_2fa_result.
+        """
+        if not duoCode:
+            raise DuoException(ERR_CODE)
+
+        key = token_exchange_key(duoCode, username, nonce)
+        cache = self._token_exchange_cache
+        if cache is not None:
+            decoded_token = cache.get(key)
+            if decoded_token is not None:
+                return decoded_token
+        try:
+            decoded_token = await self._async_token_exchange_flight.do(
+                key, partial(self._aexchange_code, key, duoCode, username, nonce), deadline)
+        except asyncio.TimeoutError:
+            raise DuoDeadlineExceededException(ERR_DEADLINE_EXCEEDED)
+        # Coalesced callers each get their own copy of the shared result
+        return copy.deepcopy(decoded_token)
+
+    async def _aexchange_code(self, key, duoCode, username, nonce=None):
+        """
+        Exchanges the duo_code with Duo, bypassing any cached result, and
+        caches the verified id_token
+        """
+        timer = self._call_timer(OPERATION_TOKEN_EXCHANGE, OAUTH_V1_TOKEN_ENDPOINT)
+        with self._http_span(OAUTH_V1_TOKEN_ENDPOINT) as span:
+            with self._tracer.start_span(SPAN_SIGN, parent=span):
+                token_endpoint, all_args = self._build_token_request(duoCode)
+            status_code = None
+            try:
+                try:
+                    response = await self._observed_apost(timer, token_endpoint,
+                                                          idempotent=False,
+                                                          params=all_args,
+                                                          headers=span.inject({"user-agent":
+                                                                               self._user_agent()}))
+                except self._passthrough_exceptions:
+                    raise
+                except Exception as e:
+                    raise DuoException(e)
+
+                status_code = response.status_code
+                span.set_attribute('http.response.status_code', status_code)
+                timer.begin(PHASE_VERIFY)
+                with self._tracer.start_span(SPAN_VERIFY, parent=span):
+                    decoded_token = self._process_token_response(response, username, nonce)
+            except Exception as e:
+                self._call_failed(timer, span, status_code, e)
+                raise
+
+        timer.finish(status_code, OUTCOME_OK)
+        if self._token_exchange_cache is not None:
+            self._token_exchange_cache.put(key, decoded_token)
+        return decoded_token
@@ -0,0 +1,126 @@
+import collections
+import json
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote_plus, urlencode
+
+from duo_universal.jwt_signer import base64url_encode
+
+
+def _json_member(name, value):
+    return '{}:{}'.format(json.dumps(name), json.dumps(value))
+
+
+class AuthUrlTemplate:
+    """
+    Pre-serialized authorize URL for one client.
+
+    The request JWT claims other than exp, state and duo_uname, and the
+    query string up to the request JWT, never change for a client, so they
+    are serialized once and only the per-user values are spliced in. The
+    result is identical to serializing the whole claims dict and query
+    string for every URL.
+    """
+
+    def __init__(self, signer, authorize_endpoint, client_id, redirect_uri, audience,
+                 use_duo_code_attribute):
+        """
+        Arguments:
+
+        signer                  -- HS512Signer keyed with the client secret
+        authorize_endpoint      -- Absolute URL of Duo's authorize endpoint
+        client_id               -- Client id issuing the request
+        redirect_uri            -- Where Duo redirects after 2FA
+        audience                -- Value of the request JWT 'aud' claim
+        use_duo_code_attribute  -- Value of the 'use_duo_code_attribute' claim
+        """
+        self._signer = signer
+        self._args = (signer, authorize_endpoint, client_id, redirect_uri, audience,
+                      use_duo_code_attribute)
+        # Claims keep the order create_auth_url has always used
+        self._claims_prefix = '{' + ','.join([
+            _json_member('scope', 'openid'),
+            _json_member('redirect_uri', redirect_uri),
+            _json_member('client_id', client_id),
+            _json_member('iss', client_id),
+            _json_member('aud', audience),
+        ]) + ',"exp":'
+        self._claims_state = ',"state":'
+        self._claims_username = ',{},"duo_uname":'.format(_json_member('response_type', 'code'))
+        self._claims_suffix = ',{}}}'.format(_json_member('use_duo_code_attribute', use_duo_code_attribute))
+        self._url_prefix = '{}?{}&request='.format(
+            authorize_endpoint, urlencode({'response_type': 'code', 'client_id': client_id}))
+
+    def render(self, username, state, exp, nonce=None):
+        """
+        Returns the signed authorize URL for one user
+
+        Arguments:
+
+        username        -- Value of the 'duo_uname' claim
+        state           -- Value of the 'state' claim
+        exp             -- Value of the 'exp' claim
+        nonce           -- (Optional) Appended as the 'nonce' query parameter
+        """
+        claims = ''.join((self._claims_prefix, json.dumps(exp),
+                          self._claims_state, json.dumps(state),
+                          self._claims_username, json.dumps(username),
+                          self._claims_suffix))
+        request_jwt = self._signer.encode_segment(base64url_encode(claims.encode('utf-8')))
+        # base64url and '.' need no quoting in a query string
+        url = self._url_prefix + request_jwt
+        if nonce:
+            url += '&nonce=' + quote_plus(nonce)
+        return url
+
+    def render_chunk(self, exp, chunk):
+        """
+        Returns the urls for a list of (username, state, nonce) tuples sharing `exp`
+        """
+        render = self.render
+        return [render(username, state, exp, nonce) for username, state, nonce in chunk]
+
+    def __reduce__(self):
+        return (type(self), self._args)
+
+
+# Template of the current worker process, set by _init_worker
+_worker_template = None
+
+
+def _init_worker(template):
+    global _worker_template
+    _worker_template = template
+
+
+def _render_worker_chunk(exp, chunk):
+    return _worker_template.render_chunk(exp, chunk)
+
+
+def render_in_processes(template, chunks, processes):
+    """
+    Yields the urls for (exp, chunk) pairs rendered by a pool of worker processes
+
+    The template is sent to each worker once. Chunks are submitted as they
+    are read, at most two per worker ahead of the caller, and urls are
+    yielded in input order. Closing the generator cancels pending chunks.
+
+    Arguments:
+
+    template        -- AuthUrlTemplate to render with
+    chunks          -- Iterable of (exp, [(username, state, nonce), ...]) pairs
+    processes       -- Number of worker processes
+    """
+    executor = ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(template,))
+    pending = collections.deque()
+    try:
+        for exp, chunk in chunks:
+            pending.append(executor.submit(_render_worker_chunk, exp, chunk))
+            if len(pending) >= 2 * processes:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        # shutdown(cancel_futures=True) needs Python 3.9
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
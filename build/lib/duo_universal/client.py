@@ -0,0 +1,1414 @@
+from urllib.parse import urlencode, urlsplit
+import time
+import requests
+import json
+import random
+import os
+import platform
+import threading
+import itertools
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from jwt.exceptions import InvalidTokenError
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from duo_universal.assertion_pool import ClientAssertionPool, DEFAULT_ASSERTION_MIN_REMAINING
+from duo_universal.auth_url import AuthUrlTemplate, render_in_processes
+from duo_universal.csprng import random_alphanumeric
+from duo_universal.fork import reset_in_forked_child
+from duo_universal.health import HealthCheckCache
+from duo_universal.id_token import IdTokenVerifier
+from duo_universal.instrumentation import (
+    NULL_TIMER,
+    OPERATION_CREATE_AUTH_URL,
+    OPERATION_HEALTH_CHECK,
+    OPERATION_TOKEN_EXCHANGE,
+    OUTCOME_CIRCUIT_OPEN,
+    OUTCOME_ERROR,
+    OUTCOME_INVALID_TOKEN,
+    OUTCOME_NONCE_MISMATCH,
+    OUTCOME_OK,
+    OUTCOME_TIMEOUT,
+    OUTCOME_USERNAME_MISMATCH,
+    PHASE_REQUEST,
+    PHASE_SIGN,
+    PHASE_VERIFY,
+    CallTimer,
+)
+from duo_universal.jwt_signer import HS512Signer
+from duo_universal.metrics import ClientStats
+from duo_universal.session_pool import SessionPool
+from duo_universal.singleflight import SingleFlight
+from duo_universal.state_token import StateTokenSigner
+from duo_universal.tracing import NOOP_SPAN, NOOP_TRACER, SPAN_KIND_CLIENT, SPAN_SIGN, SPAN_VERIFY
+from duo_universal.token_cache import (
+    DEFAULT_TOKEN_EXCHANGE_CACHE_SIZE,
+    DEFAULT_TOKEN_EXCHANGE_CACHE_TTL,
+    TokenExchangeCache,
+    token_exchange_key,
+)
+from duo_universal.version import __version__
+
+CLIENT_ID_LENGTH = 20
+CLIENT_SECRET_LENGTH = 40
+JTI_LENGTH = 36
+MINIMUM_STATE_LENGTH = 16
+MAXIMUM_STATE_LENGTH = 1024
+STATE_LENGTH = 36
+SUCCESS_STATUS_CODE = 200
+FIVE_MINUTES_IN_SECONDS = 300
+# One minute in seconds
+LEEWAY = 60
+# Number of per-host connection pools kept by a client's session
+DEFAULT_POOL_CONNECTIONS = 10
+# Maximum number of connections kept alive per host
+DEFAULT_POOL_MAXSIZE = 10
+# Pooled connections left unused for longer than this are dropped before the next request
+DEFAULT_POOL_IDLE_TIMEOUT = 60
+# Seconds allowed to establish a connection to Duo
+DEFAULT_CONNECT_TIMEOUT = 10
+# Seconds allowed between bytes received from Duo
+DEFAULT_READ_TIMEOUT = 30
+# Upstream statuses worth retrying for idempotent calls
+DEFAULT_RETRYABLE_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+# Seconds a failed cached health check is replayed before Duo is asked again
+DEFAULT_HEALTH_CHECK_FAILURE_TTL = 5
+# Seconds past its TTL a cached healthy result may be served while it refreshes
+DEFAULT_HEALTH_CHECK_STALE_TTL = 30
+# Seconds a signed state from generate_signed_state stays valid
+DEFAULT_SIGNED_STATE_TTL = FIVE_MINUTES_IN_SECONDS
+# Authorize urls built by create_auth_urls per shared timestamp and per worker job
+DEFAULT_AUTH_URL_CHUNK_SIZE = 500
+
+ERR_USERNAME = 'The username is invalid.'
+ERR_NONCE = 'The nonce is invalid.'
+ERR_CLIENT_ID = 'The Duo client id is invalid.'
+ERR_CLIENT_SECRET = 'The Duo client secret is invalid.'
+ERR_API_HOST = 'The Duo api host is invalid'
+ERR_REDIRECT_URI = 'No redirect uri'
+ERR_CODE = 'Missing authorization code'
+ERR_UNKNOWN = 'An unknown error has occurred.'
+ERR_GENERATE_LEN = 'Length needs to be at least 16'
+ERR_STATE_LEN = ('State must be at least {MIN} characters long and no longer than {MAX} characters').format(
+    MIN=MINIMUM_STATE_LENGTH,
+    MAX=MAXIMUM_STATE_LENGTH
+)
+ERR_NONCE_LEN = ('Nonce must be at least {MIN} characters long and no longer than {MAX} characters').format(
+    MIN=MINIMUM_STATE_LENGTH,
+    MAX=MAXIMUM_STATE_LENGTH
+)
+ERR_EXP_SECONDS_TOO_LONG = 'Client may not be configured for a JWT expiry longer than five minutes.'
+ERR_EXP_SECONDS_TOO_SHORT = 'Invalid JWT expiry duration.'
+ERR_POOL_SIZE = 'Connection pool sizes must be at least 1.'
+ERR_POOL_IDLE_TIMEOUT = 'Connection pool idle timeout must not be negative.'
+ERR_HEALTH_CHECK_TTL = 'Health check cache durations must not be negative.'
+ERR_TIMEOUT_CONFIG = 'Timeouts must be a positive number of seconds.'
+ERR_DEADLINE_EXCEEDED = 'The deadline for the Duo request was exceeded.'
+ERR_RETRY_CONFIG = 'Retry policy needs at least one attempt and non-negative backoff durations.'
+ERR_CIRCUIT_CONFIG = 'Circuit breaker thresholds must be at least 1 and its cool-down must not be negative.'
+ERR_CIRCUIT_OPEN = 'Calls to Duo are suspended after repeated failures.'
+ERR_SIGNED_STATE_TOO_LONG = ('The username and nonce do not fit in a signed state of at most {MAX} '
+                             'characters.').format(MAX=MAXIMUM_STATE_LENGTH)
+ERR_SIGNED_STATE_TTL = 'Signed state lifetime must be a positive number of seconds.'
+ERR_SESSION_POOL_CERTS = 'A shared session pool must use the same CA certificates as the client.'
+ERR_AUTH_URL_ITEM = 'Each auth url item must be a (username, state) or (username, state, nonce) tuple.'
+ERR_AUTH_URL_BATCH_CONFIG = 'Auth url chunk size and process count must be at least 1.'
+ERR_WARM_CONNECTIONS = 'The number of connections to warm must not be negative.'
+ERR_TOKEN_EXCHANGE_CACHE_CONFIG = ('Token exchange cache lifetime must not be negative and its size '
+                                   'must be at least 1.')
+ERR_ASSERTION_POOL_CONFIG = ('Assertion pool size must not be negative, and pooled assertions '
+                             'need a JWT expiry longer than {MIN} seconds.').format(
+    MIN=DEFAULT_ASSERTION_MIN_REMAINING
+)
+
+API_HOST_URI_FORMAT = "https://{}"
+OAUTH_V1_HEALTH_CHECK_ENDPOINT = "https://{}/oauth/v1/health_check"
+OAUTH_V1_AUTHORIZE_ENDPOINT = "https://{}/oauth/v1/authorize"
+OAUTH_V1_TOKEN_ENDPOINT = "https://{}/oauth/v1/token"
+DEFAULT_CA_CERT_PATH = os.path.join(os.path.dirname(__file__), 'ca_certs.pem')
+CA_BUNDLE_VERSION = "1.0"
+
+CLIENT_ASSERT_TYPE = "urn:ietf:params:oauth:client-assertion-type:jwt-bearer"
+
+
+class DuoException(Exception):
+    pass
+
+
+class DuoTimeoutException(DuoException):
+    """
+    Raised when a call to Duo times out or runs past its deadline
+    """
+    pass
+
+
+class DuoDeadlineExceededException(DuoTimeoutException):
+    """
+    Raised when a call runs past the deadline its caller set
+    """
+    pass
+
+
+class DuoCircuitOpenException(DuoException):
+    """
+    Raised without contacting Duo while the client's circuit breaker is open
+    """
+    pass
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker guarding a client's calls to Duo.
+
+    CLOSED: calls flow and consecutive failures are counted. After
+    failure_threshold failures the circuit goes OPEN and calls fail
+    immediately with DuoCircuitOpenException. After reset_timeout seconds it
+    goes HALF_OPEN and admits up to half_open_max_calls trial calls; a
+    success closes the circuit and a failure opens it again.
+
+    Transport errors, timeouts and 5xx responses count as failures. Other
+    responses, including 4xx errors, show Duo is reachable and count as
+    successes. Calls cut short by their caller's deadline say nothing about
+    Duo and count as neither. One breaker may be shared by clients talking
+    to the same host.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, half_open_max_calls=1):
+        """
+        Arguments:
+
+        failure_threshold       -- Consecutive failures that open the circuit
+        reset_timeout           -- Seconds the circuit stays open before trial calls
+        half_open_max_calls     -- Concurrent trial calls admitted while half open
+        """
+        if failure_threshold < 1 or half_open_max_calls < 1 or reset_timeout < 0:
+            raise DuoException(ERR_CIRCUIT_CONFIG)
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._half_open_max_calls = half_open_max_calls
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0
+        self._half_open_calls = 0
+        reset_in_forked_child(self)
+
+    def _after_fork_in_child(self):
+        # Trial calls admitted in the parent never report back here
+        self._lock = threading.Lock()
+        self._half_open_calls = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._reset_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._failures = 0
+
+    def before_call(self):
+        """
+        Admits a call or rejects it while the circuit is open
+
+        Raises:
+
+        DuoCircuitOpenException if the call must not be attempted
+        """
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.OPEN:
+                raise DuoCircuitOpenException(ERR_CIRCUIT_OPEN)
+            if self._state == self.HALF_OPEN:
+                if self._half_open_calls >= self._half_open_max_calls:
+                    raise DuoCircuitOpenException(ERR_CIRCUIT_OPEN)
+                self._half_open_calls += 1
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+            self._failures += 1
+            if self._state == self.CLOSED and self._failures >= self._failure_threshold:
+                self._open()
+
+    def record_abandoned(self):
+        """
+        Records an admitted call that ended without showing whether Duo is
+        healthy, freeing its trial slot while half open
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_response(self, response):
+        if response.status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+
+class RetryPolicy:
+    """
+    Describes how a Client retries transient failures.
+
+    Delays use exponential backoff with full jitter: before retry n the
+    client sleeps a random duration in [0, min(backoff_cap, backoff_base * 2 ** (n - 1))].
+    Retries never run past the caller's deadline. Authorization code
+    exchanges are only retried when the request provably never reached Duo,
+    since a code can only be redeemed once.
+    """
+
+    def __init__(self, max_attempts=3, backoff_base=0.1, backoff_cap=2.0,
+                 retryable_status_codes=DEFAULT_RETRYABLE_STATUS_CODES,
+                 retryable_exceptions=None):
+        """
+        Arguments:
+
+        max_attempts            -- Total number of attempts, including the first
+        backoff_base            -- Seconds of backoff ceiling before the first retry
+        backoff_cap             -- Upper bound in seconds on any single backoff
+        retryable_status_codes  -- HTTP statuses retried for idempotent calls
+        retryable_exceptions    -- (Optional) Exception classes to retry. Defaults to the
+                                   client's transport connection and timeout errors.
+        """
+        if max_attempts < 1 or backoff_base < 0 or backoff_cap < 0:
+            raise DuoException(ERR_RETRY_CONFIG)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.retryable_status_codes = frozenset(retryable_status_codes)
+        self.retryable_exceptions = retryable_exceptions
+        self._random = random.SystemRandom()
+
+    def backoff(self, attempt):
+        """
+        Returns the jittered number of seconds to wait after failed attempt `attempt`
+        """
+        ceiling = min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1))
+        return self._random.uniform(0, ceiling)
+
+
+class _cached_attribute:
+    """
+    Computes an instance attribute on first access and stores it on the
+    instance, so clients that never use a helper never build it. Threads
+    racing on the first access all get the value stored first.
+    """
+
+    def __init__(self, func):
+        self._func = func
+        self._name = func.__name__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance.__dict__.setdefault(self._name, self._func(instance))
+
+
+class Client:
+    # Transport errors retried by default, and those never worth retrying
+    _retryable_exceptions = (requests.ConnectionError, requests.Timeout)
+    _non_retryable_exceptions = (requests.exceptions.SSLError,)
+    # Errors from _post that already describe the failure and are raised as is
+    _passthrough_exceptions = (DuoTimeoutException, DuoCircuitOpenException)
+    # Errors from _post showing Duo could not be reached in time
+    _transport_exceptions = (requests.RequestException, DuoTimeoutException)
+    # Callables receiving a PhaseEvent for each timed phase of a call
+    _observers = ()
+    # ClientStats recording this client's calls, if any
+    _stats = None
+    # Tracer opening a span for each round trip to Duo
+    _tracer = NOOP_TRACER
+
+    @property
+    def _clamped_expiry_duration(self):
+        return max(min(FIVE_MINUTES_IN_SECONDS, self._exp_seconds), 1)
+
+    @_cached_attribute
+    def _auth_url_template(self):
+        return AuthUrlTemplate(self._jwt_signer,
+                               OAUTH_V1_AUTHORIZE_ENDPOINT.format(self._api_host),
+                               self._client_id,
+                               self._redirect_uri,
+                               API_HOST_URI_FORMAT.format(self._api_host),
+                               self._use_duo_code_attribute)
+
+    @_cached_attribute
+    def _id_token_verifier(self):
+        return IdTokenVerifier(self._client_secret,
+                               self._client_id,
+                               OAUTH_V1_TOKEN_ENDPOINT.format(self._api_host),
+                               LEEWAY,
+                               signer=self._jwt_signer)
+
+    @_cached_attribute
+    def _state_token_signer(self):
+        return StateTokenSigner(self._client_secret)
+
+    @_cached_attribute
+    def _health_check_flight(self):
+        return SingleFlight()
+
+    @_cached_attribute
+    def _token_exchange_flight(self):
+        return SingleFlight()
+
+    @_cached_attribute
+    def _token_exchange_cache(self):
+        if not self._token_exchange_cache_ttl:
+            return None
+        return TokenExchangeCache(self._token_exchange_cache_ttl, self._token_exchange_cache_size)
+
+    @staticmethod
+    def _resolve_duo_certs(duo_certs, disable_ca_pinning):
+        """
+        Returns the `verify` setting for requests to Duo: a CA bundle path,
+        True for the default bundle, or False to skip verification
+        """
+        if disable_ca_pinning and duo_certs not in (None, DEFAULT_CA_CERT_PATH):
+            raise DuoException(
+                "Cannot both disable CA pinning and provide custom CA certificates"
+            )
+        if disable_ca_pinning:
+            return True
+        if duo_certs is not None:
+            if duo_certs == "DISABLE":
+                return False
+            return duo_certs
+        return DEFAULT_CA_CERT_PATH
+
+    def _generate_rand_alphanumeric(self, length):
+        """
+        Generates random string
+        Arguments:
+
+        length      -- Desired length of random string
+
+        Returns:
+
+        Randomly generated alphanumeric string
+
+        Raises:
+
+        ValueError if length is too short
+        """
+        if length < min(MINIMUM_STATE_LENGTH, JTI_LENGTH):
+            raise ValueError(ERR_GENERATE_LEN)
+        return random_alphanumeric(length)
+
+    def _validate_init_config(self, client_id, client_secret,
+                              api_host, redirect_uri, exp_seconds):
+        """
+        Verifies __init__ parameters
+
+        Arguments:
+
+        client_id       -- Client ID for the application in Duo
+        client_secret   -- Client secret for the application in Duo
+        host            -- Duo api host
+        redirect_uri    -- Uri to redirect to after a successful auth
+        exp_seconds     -- The JWT expiry window
+
+        Raises:
+
+        DuoException errors for invalid parameters
+        """
+        if not client_id or len(client_id) != CLIENT_ID_LENGTH:
+            raise DuoException(ERR_CLIENT_ID)
+        if not client_secret or len(client_secret) != CLIENT_SECRET_LENGTH:
+            raise DuoException(ERR_CLIENT_SECRET)
+        if not api_host:
+            raise DuoException(ERR_API_HOST)
+        if not redirect_uri:
+            raise DuoException(ERR_REDIRECT_URI)
+        if exp_seconds > FIVE_MINUTES_IN_SECONDS:
+            raise DuoException(ERR_EXP_SECONDS_TOO_LONG)
+        elif exp_seconds < 0:
+            raise DuoException(ERR_EXP_SECONDS_TOO_SHORT)
+
+    def _validate_pool_config(self, pool_connections, pool_maxsize, pool_idle_timeout):
+        """
+        Verifies the connection pool parameters passed to __init__
+
+        Raises:
+
+        DuoException errors for invalid parameters
+        """
+        if pool_connections < 1 or pool_maxsize < 1:
+            raise DuoException(ERR_POOL_SIZE)
+        if pool_idle_timeout is not None and pool_idle_timeout < 0:
+            raise DuoException(ERR_POOL_IDLE_TIMEOUT)
+
+    def _validate_health_check_cache_config(self, ttl, failure_ttl, stale_ttl):
+        """
+        Verifies the health check cache parameters passed to __init__
+
+        Raises:
+
+        DuoException errors for invalid parameters
+        """
+        if ttl is None:
+            return
+        if ttl < 0 or failure_ttl < 0 or stale_ttl < 0:
+            raise DuoException(ERR_HEALTH_CHECK_TTL)
+
+    def _validate_token_exchange_cache_config(self, ttl, size):
+        """
+        Verifies the token exchange cache parameters passed to __init__
+
+        Raises:
+
+        DuoException errors for invalid parameters
+        """
+        if ttl is None:
+            return
+        if ttl < 0 or size < 1:
+            raise DuoException(ERR_TOKEN_EXCHANGE_CACHE_CONFIG)
+
+    def _validate_timeout_config(self, *timeouts):
+        """
+        Verifies the timeout parameters passed to __init__
+
+        Raises:
+
+        DuoException errors for invalid parameters
+        """
+        for timeout in timeouts:
+            if timeout is not None and timeout <= 0:
+                raise DuoException(ERR_TIMEOUT_CONFIG)
+
+    def _validate_assertion_pool_config(self, assertion_pool_size):
+        """
+        Verifies the assertion pool parameters passed to __init__
+
+        Raises:
+
+        DuoException errors for invalid parameters
+        """
+        if assertion_pool_size < 0:
+            raise DuoException(ERR_ASSERTION_POOL_CONFIG)
+        if assertion_pool_size and self._clamped_expiry_duration <= DEFAULT_ASSERTION_MIN_REMAINING:
+            raise DuoException(ERR_ASSERTION_POOL_CONFIG)
+
+    def _deadline_expiry(self, deadline):
+        """
+        Converts a per-call deadline in seconds to a time.monotonic() expiry
+        """
+        if deadline is None:
+            return None
+        return time.monotonic() + deadline
+
+    def _request_timeouts(self, expires_at):
+        """
+        Returns the (connect, read) timeouts for a request, capped by the time
+        left before `expires_at`
+
+        Raises:
+
+        DuoDeadlineExceededException if the deadline has already passed
+        """
+        connect_timeout = self._connect_timeout
+        read_timeout = self._read_timeout
+        if expires_at is not None:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                raise DuoDeadlineExceededException(ERR_DEADLINE_EXCEEDED)
+            connect_timeout = remaining if connect_timeout is None else min(connect_timeout, remaining)
+            read_timeout = remaining if read_timeout is None else min(read_timeout, remaining)
+        return connect_timeout, read_timeout
+
+    def _build_session(self):
+        """
+        Creates a requests session configured like this client's connection pool
+        """
+        return self._session_pool.build_session()
+
+    def _shared_ssl_context(self):
+        """
+        Returns the process-wide SSLContext for this client's CA settings,
+        or None when certificate verification is disabled
+        """
+        return self._session_pool.shared_ssl_context()
+
+    def _checkout_session(self):
+        return self._session_pool.checkout()
+
+    def _checkin_session(self):
+        self._session_pool.checkin()
+
+    def _request_never_sent(self, error):
+        """
+        Returns whether `error` proves the request never reached Duo
+        """
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        if isinstance(error, requests.ConnectionError) and error.args:
+            reason = getattr(error.args[0], 'reason', None)
+            return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+        return False
+
+    def _is_retryable_error(self, error, idempotent):
+        policy = self._retry_policy
+        if policy is None or isinstance(error, self._non_retryable_exceptions):
+            return False
+        if not isinstance(error, policy.retryable_exceptions or self._retryable_exceptions):
+            return False
+        return idempotent or self._request_never_sent(error)
+
+    def _is_retryable_response(self, response, idempotent):
+        policy = self._retry_policy
+        if policy is None or not idempotent:
+            return False
+        return response.status_code in policy.retryable_status_codes
+
+    def _retry_delay(self, attempt, expires_at, retryable):
+        """
+        Returns the seconds to wait before retrying, or None if the failed
+        attempt must not be retried
+        """
+        policy = self._retry_policy
+        if not retryable or attempt >= policy.max_attempts:
+            return None
+        delay = policy.backoff(attempt)
+        if expires_at is not None and time.monotonic() + delay >= expires_at:
+            return None
+        return delay
+
+    def _post(self, url, expires_at=None, idempotent=True, **kwargs):
+        """
+        POSTs to a Duo endpoint through the client's circuit breaker, retrying
+        transient failures according to the client's retry policy
+
+        Arguments:
+
+        url             -- Endpoint to POST to
+        expires_at      -- (Optional) time.monotonic() value the call must finish by
+        idempotent      -- False if the request must not be repeated once it may
+                           have reached Duo
+
+        Raises:
+
+        DuoCircuitOpenException if the circuit breaker rejects the call
+        DuoTimeoutException if the request times out or `expires_at` passes
+        """
+        breaker = self._circuit_breaker
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            response = self._post_with_retries(url, expires_at, idempotent, **kwargs)
+        except Exception as e:
+            if breaker is not None:
+                self._record_error(breaker, e)
+            raise
+        if breaker is not None:
+            breaker.record_response(response)
+        self._session_pool.capture_tls_sessions()
+        return response
+
+    def _record_error(self, breaker, error):
+        """
+        Counts a failed call against the circuit breaker unless the caller's
+        deadline, rather than Duo, ended it
+        """
+        if isinstance(error, self._transport_exceptions) and not isinstance(error, DuoDeadlineExceededException):
+            breaker.record_failure()
+        else:
+            breaker.record_abandoned()
+
+    def _timed_out_at_deadline(self, error, timeout):
+        """
+        Returns whether the requests timeout `error` fired at a timeout that
+        _request_timeouts shortened to the caller's deadline
+        """
+        connect_timeout, read_timeout = timeout
+        if isinstance(error, requests.ConnectTimeout):
+            return connect_timeout != self._connect_timeout
+        return read_timeout != self._read_timeout
+
+    def _post_with_retries(self, url, expires_at, idempotent, **kwargs):
+        attempt = 1
+        while True:
+            timeout = self._request_timeouts(expires_at)
+            session = self._checkout_session()
+            try:
+                response = session.post(url, timeout=timeout, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(attempt, expires_at, self._is_retryable_error(e, idempotent))
+                if delay is None:
+                    if isinstance(e, requests.Timeout):
+                        if self._timed_out_at_deadline(e, timeout):
+                            raise DuoDeadlineExceededException(e)
+                        raise DuoTimeoutException(e)
+                    raise
+            else:
+                delay = self._retry_delay(attempt, expires_at,
+                                          self._is_retryable_response(response, idempotent))
+                if delay is None:
+                    return response
+                response.close()
+            finally:
+                self._checkin_session()
+            time.sleep(delay)
+            attempt += 1
+
+    def _validate_create_auth_url_inputs(self, username, state, nonce=None):
+        if nonce and (MINIMUM_STATE_LENGTH >= len(nonce) or len(nonce) >= MAXIMUM_STATE_LENGTH):
+            raise DuoException(ERR_NONCE_LEN)
+        if not state or not (MINIMUM_STATE_LENGTH <= len(state) <= MAXIMUM_STATE_LENGTH):
+            raise DuoException(ERR_STATE_LEN)
+        if not username:
+            raise DuoException(ERR_USERNAME)
+
+    def _create_jwt_args(self, endpoint):
+        jwt_args = {
+            'iss': self._client_id,
+            'sub': self._client_id,
+            'aud': endpoint,
+            'exp': time.time() + self._clamped_expiry_duration,
+            'jti': self._generate_rand_alphanumeric(JTI_LENGTH)
+        }
+
+        return jwt_args
+
+    def __init__(self, client_id, client_secret, host,
+                 redirect_uri, duo_certs=DEFAULT_CA_CERT_PATH, use_duo_code_attribute=True, http_proxy=None,
+                 exp_seconds=FIVE_MINUTES_IN_SECONDS, disable_ca_pinning=False,
+                 pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 pool_block=False, pool_idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT,
+                 health_check_ttl=None, health_check_failure_ttl=DEFAULT_HEALTH_CHECK_FAILURE_TTL,
+                 health_check_stale_ttl=DEFAULT_HEALTH_CHECK_STALE_TTL,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 retry_policy=None, circuit_breaker=None, tls_session_resumption=True,
+                 assertion_pool_size=0, session_pool=None,
+                 token_exchange_cache_ttl=None,
+                 token_exchange_cache_size=DEFAULT_TOKEN_EXCHANGE_CACHE_SIZE, observers=None,
+                 collect_stats=False, tracer=None):
+        """
+        Initializes instance of Client class
+
+        Arguments:
+
+        client_id                -- Client ID for the application in Duo
+        client_secret            -- Client secret for the application in Duo
+        host                     -- Duo api host
+        redirect_uri             -- Uri to redirect to after a successful auth
+        duo_certs                -- (Optional) Provide custom CA certs
+        use_duo_code_attribute   -- (Optional: default true) Flag to use `duo_code` instead of `code` for returned authorization parameter
+        http_proxy               -- (Optional) HTTP proxy to tunnel requests through
+        exp_seconds              -- (Optional) The number of seconds used for JWT expiry. Must be be at most 5 minutes.
+        disable_ca_pinning       -- (Optional: default false) If True, uses the system's default
+                                    trusted CA certificates instead of Duo's bundled CA certificates.
+                                    TLS verification remains active. Cannot be used together with
+                                    custom duo_certs.
+        pool_connections         -- (Optional) Number of per-host connection pools to keep
+        pool_maxsize             -- (Optional) Maximum number of keep-alive connections per host
+        pool_block               -- (Optional: default false) If True, requests wait for a free
+                                    connection instead of exceeding pool_maxsize for a host
+        pool_idle_timeout        -- (Optional) Seconds a pool may sit unused before its connections
+                                    are closed. None keeps idle connections indefinitely.
+        health_check_ttl         -- (Optional) Seconds to cache a successful health_check result.
+                                    None (the default) sends every health check to Duo.
+        health_check_failure_ttl -- (Optional) Seconds to replay a failed health_check before
+                                    asking Duo again. Only used with health_check_ttl.
+        health_check_stale_ttl   -- (Optional) Seconds past health_check_ttl that a healthy result
+                                    is still returned while it is refreshed in the background.
+                                    Only used with health_check_ttl.
+        connect_timeout          -- (Optional) Seconds allowed to connect to Duo. None waits forever.
+        read_timeout             -- (Optional) Seconds allowed between bytes received from Duo.
+                                    None waits forever.
+        retry_policy             -- (Optional) RetryPolicy for transient failures. None (the default)
+                                    makes a single attempt per call.
+        circuit_breaker          -- (Optional) CircuitBreaker wrapping the health check and token
+                                    calls. May be shared by clients for the same host.
+        tls_session_resumption   -- (Optional: default true) Resume cached TLS sessions per API
+                                    host instead of doing a full handshake on every new connection
+        assertion_pool_size      -- (Optional) Number of client assertions kept minted ahead of time
+                                    per endpoint by a background thread. 0 (the default) mints
+                                    each assertion when its request is built.
+        session_pool             -- (Optional) SessionPool shared with other clients for the same
+                                    host and CA settings. The pool's own settings then replace
+                                    the pool_* and tls_session_resumption arguments, and close()
+                                    leaves the pool open for its owner to close.
+        token_exchange_cache_ttl -- (Optional) Seconds a verified exchange_authorization_code_for_2fa_result
+                                    result is replayed for a duplicate callback with the same duo_code,
+                                    username and nonce, for example DEFAULT_TOKEN_EXCHANGE_CACHE_TTL.
+                                    None (the default) or 0 disables the cache; concurrent duplicates
+                                    still share one request to Duo. Enabling it weakens the guarantee
+                                    that a duo_code is redeemed once: anyone replaying a captured
+                                    callback URL within the TTL logs in without Duo being asked.
+                                    Signed states (generate_signed_state) do not prevent this, as they
+                                    can themselves be replayed, so only enable the cache when each
+                                    callback is also checked against the browser's own session.
+        token_exchange_cache_size -- (Optional) Exchange results kept before the oldest is dropped.
+                                    Only used with token_exchange_cache_ttl.
+        observers                -- (Optional) Callables receiving a PhaseEvent for each timed phase
+                                    of health checks, auth url creation and token exchanges; see
+                                    add_observer
+        collect_stats            -- (Optional) True keeps latency histograms and counts of this
+                                    client's calls for stats(). A ClientStats may be passed instead
+                                    to aggregate several clients.
+        tracer                   -- (Optional) Tracer opening a span for each health check and token
+                                    exchange sent to Duo, with child spans for signing the client
+                                    assertion and verifying the id_token, and propagating the
+                                    trace context in the request headers. See OpenTelemetryTracer.
+                                    None (the default) records nothing.
+        """
+
+        self._validate_init_config(client_id,
+                                   client_secret,
+                                   host,
+                                   redirect_uri,
+                                   exp_seconds)
+        self._validate_pool_config(pool_connections, pool_maxsize, pool_idle_timeout)
+        self._validate_health_check_cache_config(health_check_ttl,
+                                                 health_check_failure_ttl,
+                                                 health_check_stale_ttl)
+        self._validate_token_exchange_cache_config(token_exchange_cache_ttl, token_exchange_cache_size)
+        self._validate_timeout_config(connect_timeout, read_timeout)
+
+        self._client_id = client_id
+        self._client_secret = client_secret
+        self._jwt_signer = HS512Signer(client_secret)
+        self._api_host = host
+        self._redirect_uri = redirect_uri
+        self._use_duo_code_attribute = use_duo_code_attribute
+        self._disable_ca_pinning = disable_ca_pinning
+        self._duo_certs = self._resolve_duo_certs(duo_certs, disable_ca_pinning)
+
+        if http_proxy is not None:
+            self._http_proxy = {'https': http_proxy}
+        else:
+            self._http_proxy = None
+        self._exp_seconds = exp_seconds
+
+        if session_pool is None:
+            session_pool = SessionPool(self._duo_certs, pool_connections, pool_maxsize,
+                                       pool_block=pool_block,
+                                       pool_idle_timeout=pool_idle_timeout,
+                                       tls_session_resumption=tls_session_resumption)
+            self._owns_session_pool = True
+        else:
+            if session_pool.duo_certs != self._duo_certs:
+                raise DuoException(ERR_SESSION_POOL_CERTS)
+            self._owns_session_pool = False
+        self._session_pool = session_pool
+
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        self._retry_policy = retry_policy
+        self._circuit_breaker = circuit_breaker
+
+        self._validate_assertion_pool_config(assertion_pool_size)
+        self._assertion_pools = {}
+        if assertion_pool_size:
+            for endpoint in (OAUTH_V1_TOKEN_ENDPOINT.format(host),
+                             OAUTH_V1_HEALTH_CHECK_ENDPOINT.format(host)):
+                self._assertion_pools[endpoint] = ClientAssertionPool(
+                    partial(self._mint_client_assertion, endpoint), size=assertion_pool_size)
+
+        self._token_exchange_cache_ttl = token_exchange_cache_ttl
+        self._token_exchange_cache_size = token_exchange_cache_size
+        if observers:
+            self._observers = tuple(observers)
+        if tracer is not None:
+            self._tracer = tracer
+        if collect_stats:
+            self._stats = ClientStats() if collect_stats is True else collect_stats
+            self.add_observer(self._stats)
+        if health_check_ttl is not None:
+            self._health_check_cache = HealthCheckCache(health_check_ttl,
+                                                        health_check_failure_ttl,
+                                                        health_check_stale_ttl)
+        else:
+            self._health_check_cache = None
+
+    def close(self):
+        """
+        Closes the pooled connections held by this client and stops its
+        assertion refillers.
+
+        The client remains usable; a later call opens new connections. A
+        session pool passed in by the caller is left open.
+        """
+        for assertion_pool in self._assertion_pools.values():
+            assertion_pool.stop()
+        if self._owns_session_pool:
+            self._session_pool.close()
+
+    def tls_session_stats(self):
+        """
+        Returns counts of TLS handshakes made by this client's connection pool
+
+        Returns:
+
+        {'resumed': <int>, 'full': <int>}, or None if session resumption is disabled
+        """
+        tls_sessions = self._session_pool.tls_sessions
+        if tls_sessions is None:
+            return None
+        return tls_sessions.stats()
+
+    def stats(self):
+        """
+        Returns latency percentiles and counts of the calls this client
+        made, or None unless the client was created with collect_stats
+
+        Returns:
+
+        {operation: {outcome: {phase: {'count': <int>, 'sum': <float>,
+        'mean': <float>, 'max': <float>, 'p50': <float>, 'p95': <float>,
+        'p99': <float>}}}}, with durations in seconds. Operations, phases
+        and outcomes are those reported to observers; see add_observer.
+        A ClientStats shared by clients for the same host reports their
+        combined calls.
+        """
+        if self._stats is None:
+            return None
+        return self._stats.snapshot(host=self._api_host)
+
+    def add_observer(self, observer):
+        """
+        Registers a callable receiving a PhaseEvent for each timed phase
+        of this client's calls.
+
+        Each health check and token exchange sent to Duo reports its sign,
+        request and verify phases, the connect and tls phases of any
+        connection it opened, and its total. create_auth_url reports sign
+        and total. Events are delivered when the call ends, from the calling
+        thread, and all carry the call's endpoint, HTTP status code (None if
+        no response was received) and outcome: 'ok', 'timeout',
+        'circuit_open', 'invalid_token', 'username_mismatch',
+        'nonce_mismatch', the OAuth error code Duo returned (such as
+        'invalid_grant'), or 'error'. Exceptions raised by observers are
+        ignored. Without observers calls are not timed at all.
+        """
+        self._observers = self._observers + (observer,)
+
+    def remove_observer(self, observer):
+        """
+        Unregisters an observer added with add_observer
+        """
+        self._observers = tuple(registered for registered in self._observers if registered != observer)
+
+    def _call_timer(self, operation, endpoint_format, phase=PHASE_SIGN):
+        """
+        Returns a CallTimer for a call, or a no-op stand-in without observers
+        """
+        observers = self._observers
+        if not observers:
+            return NULL_TIMER
+        return CallTimer(observers, operation, endpoint_format.format(self._api_host), phase)
+
+    def _http_span(self, endpoint_format):
+        """
+        Starts the client span of a POST to a Duo endpoint
+        """
+        tracer = self._tracer
+        if tracer is NOOP_TRACER:
+            return NOOP_SPAN
+        endpoint = endpoint_format.format(self._api_host)
+        return tracer.start_span('POST ' + urlsplit(endpoint).path, kind=SPAN_KIND_CLIENT, attributes={
+            'http.request.method': 'POST',
+            'url.full': endpoint,
+            'server.address': self._api_host,
+            'server.port': 443,
+        })
+
+    def _call_failed(self, timer, span, status_code, error):
+        """
+        Reports a failed call to the observers and its span
+        """
+        outcome = self._outcome(error)
+        timer.finish(status_code, outcome)
+        span.set_error(outcome, error)
+
+    def _observed_post(self, timer, url, **kwargs):
+        """
+        Calls _post, timing it as the request phase of `timer`
+        """
+        timer.begin(PHASE_REQUEST)
+        observed = timer.observe()
+        try:
+            return self._post(url, **kwargs)
+        finally:
+            timer.unobserve(observed)
+
+    def _outcome(self, error):
+        """
+        Returns the outcome reported to observers for a failed call
+        """
+        if isinstance(error, DuoTimeoutException):
+            return OUTCOME_TIMEOUT
+        if isinstance(error, DuoCircuitOpenException):
+            return OUTCOME_CIRCUIT_OPEN
+        detail = error.args[0] if isinstance(error, DuoException) and error.args else None
+        if isinstance(detail, dict) and isinstance(detail.get('error'), str):
+            return detail['error']
+        if isinstance(detail, InvalidTokenError):
+            return OUTCOME_INVALID_TOKEN
+        if detail == ERR_USERNAME:
+            return OUTCOME_USERNAME_MISMATCH
+        if detail == ERR_NONCE:
+            return OUTCOME_NONCE_MISMATCH
+        return OUTCOME_ERROR
+
+    def warm(self, connections=1, deadline=None):
+        """
+        Prepares the client for its first login in this process.
+
+        Builds the helpers the client otherwise creates on first use, mints
+        any pooled client assertions, and opens up to `connections` pooled
+        connections to Duo by sending that many concurrent health checks, so
+        the TLS handshakes are done ahead of time. Pre-fork servers should
+        call it in each worker after forking, e.g. from gunicorn's post_fork
+        hook, since connections are never shared with a forked child.
+
+        Arguments:
+
+        connections     -- (Optional) Connections to open, capped at pool_maxsize
+        deadline        -- (Optional) Maximum number of seconds the warm-up may take
+
+        Raises:
+
+        DuoException if a health check fails
+        DuoTimeoutException if Duo does not answer in time
+        DuoCircuitOpenException if calls to Duo are suspended
+        """
+        expires_at = self._deadline_expiry(deadline)
+        connections = self._prepare_warm(connections)
+        if connections == 1:
+            self._check_health(expires_at)
+        elif connections:
+            with ThreadPoolExecutor(max_workers=connections) as executor:
+                checks = [executor.submit(self._check_health, expires_at) for _ in range(connections)]
+                for check in checks:
+                    check.result()
+
+    def _prepare_warm(self, connections):
+        """
+        Builds the lazily created helpers and fills the assertion pools
+
+        Returns:
+
+        The number of connections to open
+        """
+        if connections < 0:
+            raise DuoException(ERR_WARM_CONNECTIONS)
+        self._auth_url_template
+        self._health_check_flight
+        self._id_token_verifier
+        self._state_token_signer
+        self._token_exchange_flight
+        self._token_exchange_cache
+        for assertion_pool in self._assertion_pools.values():
+            assertion_pool.refill()
+        return min(connections, self._session_pool.pool_maxsize)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def generate_state(self):
+        """
+        Return a random string of 36 characters
+        """
+        return self._generate_rand_alphanumeric(STATE_LENGTH)
+
+    def generate_signed_state(self, username, nonce=None, ttl=DEFAULT_SIGNED_STATE_TTL):
+        """
+        Return a state that carries the username and nonce, signed with a key
+        derived from the client secret, so the callback can be checked with
+        verify_signed_state instead of a server-side lookup
+
+        Arguments:
+
+        username        -- Name of the user authenticating with Duo
+        nonce           -- (Optional) Nonce passed to create_auth_url
+        ttl             -- (Optional) Seconds the state stays valid
+
+        Raises:
+
+        DuoException if the username is missing or the state would be longer
+        than MAXIMUM_STATE_LENGTH
+
+        Unlike a state kept in a StateStore, a signed state can be replayed
+        until it expires.
+        """
+        if not username:
+            raise DuoException(ERR_USERNAME)
+        if ttl <= 0:
+            raise DuoException(ERR_SIGNED_STATE_TTL)
+        state = self._state_token_signer.issue(username, nonce, ttl)
+        if len(state) > MAXIMUM_STATE_LENGTH:
+            raise DuoException(ERR_SIGNED_STATE_TOO_LONG)
+        return state
+
+    def verify_signed_state(self, state):
+        """
+        Verifies a state returned to the callback by Duo
+
+        Arguments:
+
+        state           -- State from generate_signed_state
+
+        Returns:
+
+        (username, nonce) to pass to exchange_authorization_code_for_2fa_result
+
+        Raises:
+
+        DuoException if the state is not signed by this client or has expired
+        """
+        try:
+            return self._state_token_signer.verify(state)
+        except ValueError as e:
+            raise DuoException(e)
+
+    def health_check(self, deadline=None):
+        """
+        Checks whether Duo is available.
+
+        Arguments:
+
+        deadline        -- (Optional) Maximum number of seconds the call may take
+
+        Returns:
+
+        {'response': {'timestamp': <int:unix timestamp>}, 'stat': 'OK'}
+
+        Raises:
+
+        DuoException on error for invalid credentials
+        or problem connecting to Duo
+        DuoTimeoutException if Duo does not answer in time
+        DuoCircuitOpenException if calls to Duo are suspended
+
+        Concurrent calls share one in-flight request, sent with the client's
+        own timeouts; `deadline` only limits how long this caller waits for
+        it. When the client was created with health_check_ttl the result may
+        be served from memory; see __init__ for the cache settings.
+        """
+        share = partial(self._coalesced_health_check, deadline)
+        if self._health_check_cache is not None:
+            return self._health_check_cache.get(self._check_health, share)
+        return share(self._check_health)
+
+    def _coalesced_health_check(self, deadline, check):
+        """
+        Runs `check`, or waits up to `deadline` seconds for the one already
+        in flight for this client's host
+        """
+        try:
+            return self._health_check_flight.do(self._api_host, check, deadline)
+        except TimeoutError:
+            raise DuoDeadlineExceededException(ERR_DEADLINE_EXCEEDED)
+
+    def _check_health(self, expires_at=None):
+        """
+        Sends a health check to Duo, bypassing any cached result
+        """
+        timer = self._call_timer(OPERATION_HEALTH_CHECK, OAUTH_V1_HEALTH_CHECK_ENDPOINT)
+        with self._http_span(OAUTH_V1_HEALTH_CHECK_ENDPOINT) as span:
+            with self._tracer.start_span(SPAN_SIGN, parent=span):
+                health_check_endpoint, all_args = self._build_health_check_request()
+            status_code = None
+            try:
+                response = self._observed_post(timer, health_check_endpoint,
+                                               expires_at=expires_at,
+                                               data=all_args,
+                                               headers=span.inject({}),
+                                               verify=self._duo_certs,
+                                               proxies=self._http_proxy)
+                status_code = response.status_code
+                span.set_attribute('http.response.status_code', status_code)
+                timer.begin(PHASE_VERIFY)
+                res = self._parse_health_check_response(response)
+            except self._passthrough_exceptions as e:
+                self._call_failed(timer, span, status_code, e)
+                raise
+            except Exception as e:
+                self._call_failed(timer, span, status_code, e)
+                raise DuoException(e)
+
+        timer.finish(status_code, OUTCOME_OK)
+        return res
+
+    def _build_health_check_request(self):
+        """
+        Returns the health check endpoint and the signed form arguments to POST to it
+        """
+        health_check_endpoint = OAUTH_V1_HEALTH_CHECK_ENDPOINT.format(self._api_host)
+
+        all_args = {
+            'client_assertion': self._client_assertion(health_check_endpoint),
+            'client_id': self._client_id
+        }
+        return health_check_endpoint, all_args
+
+    def _mint_client_assertion(self, endpoint):
+        """
+        Returns a new signed client assertion for `endpoint` and its exp claim
+        """
+        jwt_args = self._create_jwt_args(endpoint)
+        return self._jwt_signer.encode(jwt_args), jwt_args['exp']
+
+    def _client_assertion(self, endpoint):
+        """
+        Returns an unused client assertion for `endpoint`, from its pool when one is ready
+        """
+        assertion_pool = self._assertion_pools.get(endpoint)
+        if assertion_pool is not None:
+            assertion = assertion_pool.take()
+            if assertion is not None:
+                return assertion
+        return self._mint_client_assertion(endpoint)[0]
+
+    def _parse_health_check_response(self, response):
+        res = json.loads(response.content)
+        if res['stat'] != 'OK':
+            raise DuoException(res)
+        return res
+
+    def create_auth_url(self, username, state, nonce=None):
+        """Generate uri to Duo's prompt
+
+        Arguments:
+
+        username        -- username trying to authenticate with Duo
+        state           -- Randomly generated character string of at least 16
+                           and at most 1024 characters returned to the integration by Duo after 2FA
+        nonce           -- Randomly generated character string of at least 16
+                           and at most 1024 characters used as the nonce for the underlying OIDC flow
+
+        Returns:
+
+        Authorization uri to redirect to for the Duo prompt
+        """
+
+        self._validate_create_auth_url_inputs(username, state, nonce=nonce)
+
+        timer = self._call_timer(OPERATION_CREATE_AUTH_URL, OAUTH_V1_AUTHORIZE_ENDPOINT)
+        exp = time.time() + self._clamped_expiry_duration
+        auth_url = self._auth_url_template.render(username, state, exp, nonce=nonce)
+        timer.finish(None, OUTCOME_OK)
+        return auth_url
+
+    def create_auth_urls(self, items, processes=None, chunk_size=DEFAULT_AUTH_URL_CHUNK_SIZE):
+        """Generate uris to Duo's prompt for many users
+
+        Arguments:
+
+        items           -- Iterable of (username, state) or (username, state, nonce)
+                           tuples, each validated as in create_auth_url
+        processes       -- (Optional) Number of worker processes rendering the uris.
+                           By default they are rendered in the calling thread.
+        chunk_size      -- (Optional) Number of uris sharing one timestamp and,
+                           with `processes`, sent to a worker as one job
+
+        Returns:
+
+        Iterator over the authorization uris, in the order of `items`. Items
+        are read and uris rendered as the iterator is consumed, and each chunk
+        is stamped when it is read, so no uri expires later than one built by
+        create_auth_url at that moment.
+
+        Raises:
+
+        DuoException for an invalid configuration immediately, and for the
+        first invalid item when the iterator reaches its chunk
+        """
+        if chunk_size < 1 or (processes is not None and processes < 1):
+            raise DuoException(ERR_AUTH_URL_BATCH_CONFIG)
+        chunks = self._auth_url_chunks(items, chunk_size)
+        if processes is not None:
+            return render_in_processes(self._auth_url_template, chunks, processes)
+        return self._render_auth_url_chunks(chunks)
+
+    def _auth_url_chunks(self, items, chunk_size):
+        """
+        Yields (exp, [(username, state, nonce), ...]) for validated chunks of `items`
+        """
+        items = iter(items)
+        while True:
+            chunk = []
+            for item in itertools.islice(items, chunk_size):
+                if not isinstance(item, (tuple, list)) or len(item) not in (2, 3):
+                    raise DuoException(ERR_AUTH_URL_ITEM)
+                username, state = item[0], item[1]
+                nonce = item[2] if len(item) == 3 else None
+                self._validate_create_auth_url_inputs(username, state, nonce=nonce)
+                chunk.append((username, state, nonce))
+            if not chunk:
+                return
+            yield time.time() + self._clamped_expiry_duration, chunk
+
+    def _render_auth_url_chunks(self, chunks):
+        render_chunk = self._auth_url_template.render_chunk
+        for exp, chunk in chunks:
+            yield from render_chunk(exp, chunk)
+
+    def exchange_authorization_code_for_2fa_result(self, duoCode, username, nonce=None, deadline=None):
+        """
+        Exchange the duo_code for a token with Duo to determine
+        if the auth was successful.
+
+        Argument:
+
+        duoCode         -- Authentication session transaction id
+                           returned by Duo
+        username        -- Name of the user authenticating with Duo
+        nonce           -- Random 36B string used to associate
+                           a session with an ID token
+        deadline        -- (Optional) Maximum number of seconds the call may take
+
+        Return:
+
+        A token with meta-data about the auth
+
+        Raises:
+
+        DuoException on error for invalid duo_codes, invalid credentials,
+        or problems connecting to Duo
+        DuoTimeoutException if Duo does not answer in time
+        DuoCircuitOpenException if calls to Duo are suspended
+
+        Concurrent calls with the same duoCode, username and nonce share one
+        request to Duo, sent with the client's own timeouts; `deadline` only
+        limits how long this caller waits for it. If the client was created with a
+        token_exchange_cache_ttl, a verified result is also replayed for a
+        short while; see __init__ for the cache settings and their risks.
+        """
+        if not duoCode:
+            raise DuoException(ERR_CODE)
+
+        key = token_exchange_key(duoCode, username, nonce)
+        cache = self._token_exchange_cache
+        if cache is not None:
+            decoded_token = cache.get(key)
+            if decoded_token is not None:
+                return decoded_token
+        try:
+            decoded_token = self._token_exchange_flight.do(
+                key, partial(self._exchange_code, key, duoCode, username, nonce), deadline)
+        except TimeoutError:
+            raise DuoDeadlineExceededException(ERR_DEADLINE_EXCEEDED)
+        # Coalesced callers each get their own copy of the shared result
+        return copy.deepcopy(decoded_token)
+
+    def _exchange_code(self, key, duoCode, username, nonce=None):
+        """
+        Exchanges the duo_code with Duo, bypassing any cached result, and
+        caches the verified id_token
+        """
+        timer = self._call_timer(OPERATION_TOKEN_EXCHANGE, OAUTH_V1_TOKEN_ENDPOINT)
+        with self._http_span(OAUTH_V1_TOKEN_ENDPOINT) as span:
+            with self._tracer.start_span(SPAN_SIGN, parent=span):
+                token_endpoint, all_args = self._build_token_request(duoCode)
+            status_code = None
+            try:
+                try:
+                    response = self._observed_post(timer, token_endpoint,
+                                                   idempotent=False,
+                                                   params=all_args,
+                                                   headers=span.inject({"user-agent":
+                                                                        self._user_agent()}),
+                                                   verify=self._duo_certs,
+                                                   proxies=self._http_proxy)
+                except self._passthrough_exceptions:
+                    raise
+                except Exception as e:
+                    raise DuoException(e)
+
+                status_code = response.status_code
+                span.set_attribute('http.response.status_code', status_code)
+                timer.begin(PHASE_VERIFY)
+                with self._tracer.start_span(SPAN_VERIFY, parent=span):
+                    decoded_token = self._process_token_response(response, username, nonce)
+            except Exception as e:
+                self._call_failed(timer, span, status_code, e)
+                raise
+
+        timer.finish(status_code, OUTCOME_OK)
+        if self._token_exchange_cache is not None:
+            self._token_exchange_cache.put(key, decoded_token)
+        return decoded_token
+
+    def _build_token_request(self, duoCode):
+        """
+        Returns the token endpoint and the signed query arguments to POST to it
+        """
+        token_endpoint = OAUTH_V1_TOKEN_ENDPOINT.format(self._api_host)
+
+        all_args = {
+            'grant_type': 'authorization_code',
+            'code': duoCode,
+            'redirect_uri': self._redirect_uri,
+            'client_id': self._client_id,
+            'client_assertion_type': CLIENT_ASSERT_TYPE,
+            'client_assertion': self._client_assertion(token_endpoint)
+        }
+        return token_endpoint, all_args
+
+    def _user_agent(self):
+        ca_pinning_status = "disabled" if self._disable_ca_pinning else "enabled"
+        return ("duo_universal_python/{version} "
+                "python/{python_version} {os_name} "
+                "ca_bundle/{ca_bundle_version} "
+                "(ca_pinning={ca_pinning_status})").format(version=__version__,
+                                                           python_version=platform.python_version(),
+                                                           os_name=platform.platform(),
+                                                           ca_bundle_version=CA_BUNDLE_VERSION,
+                                                           ca_pinning_status=ca_pinning_status)
+
+    def _process_token_response(self, response, username, nonce=None):
+        """
+        Verifies the token endpoint response and the id_token it carries
+
+        Arguments:
+
+        response        -- Response from the token endpoint
+        username        -- Name of the user authenticating with Duo
+        nonce           -- Nonce expected in the id_token, if any
+
+        Return:
+
+        The decoded id_token
+
+        Raises:
+
+        DuoException if Duo returned an error or the id_token is invalid
+        """
+        if response.status_code != SUCCESS_STATUS_CODE:
+            error_message = json.loads(response.content)
+            raise DuoException(error_message)
+
+        try:
+            decoded_token = self._id_token_verifier.verify(response.json()['id_token'])
+        except Exception as e:
+            raise DuoException(e)
+
+        if ('preferred_username' not in decoded_token or not decoded_token['preferred_username'] == username):
+            raise DuoException(ERR_USERNAME)
+        if nonce and ('nonce' not in decoded_token or not decoded_token['nonce'] == nonce):
+            raise DuoException(ERR_NONCE)
+
+        return decoded_token
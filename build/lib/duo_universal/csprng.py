@@ -0,0 +1,79 @@
+import os
+import string
+import threading
+
+from duo_universal.fork import reset_in_forked_child
+
+ALPHANUMERIC = string.ascii_letters + string.digits
+# Bytes read from os.urandom per refill
+DEFAULT_BLOCK_SIZE = 4096
+
+
+class BufferedRandomString:
+    """
+    Generates random strings over an alphabet from buffered os.urandom blocks.
+
+    Each refill reads one block and maps it in a single bytes.translate
+    call: bytes below the largest multiple of the alphabet size map to
+    alphabet[byte % size], and the rest are dropped, so every character is
+    drawn uniformly. Calls are serialized by a lock. The buffer is dropped
+    in a forked child, so parent and child never hand out the same bytes.
+    """
+
+    def __init__(self, alphabet=ALPHANUMERIC, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        Arguments:
+
+        alphabet        -- ASCII characters to draw from, at most 256
+        block_size      -- Bytes read from os.urandom per refill
+        """
+        size = len(alphabet)
+        limit = 256 - 256 % size
+        self._table = bytes(ord(alphabet[b % size]) if b < limit else 0 for b in range(256))
+        self._rejected = bytes(range(limit, 256))
+        self._block_size = block_size
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._buffer = b''
+        self._position = 0
+        self._pid = os.getpid()
+
+    def _after_fork_in_child(self):
+        # Another thread may have held the lock when the process forked
+        self._lock = threading.Lock()
+        self._reset()
+
+    def generate(self, length):
+        """
+        Returns a random string of `length` characters from the alphabet
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            end = self._position + length
+            if end > len(self._buffer):
+                pending = [self._buffer[self._position:]]
+                available = len(pending[0])
+                while available < length:
+                    chunk = os.urandom(max(self._block_size, length)).translate(self._table, self._rejected)
+                    pending.append(chunk)
+                    available += len(chunk)
+                self._buffer = b''.join(pending)
+                self._position = 0
+                end = length
+            result = self._buffer[self._position:end]
+            self._position = end
+        return result.decode('ascii')
+
+
+_alphanumeric = BufferedRandomString()
+reset_in_forked_child(_alphanumeric)
+
+
+def random_alphanumeric(length):
+    """
+    Returns a cryptographically random string of `length` ASCII letters and digits
+    """
+    return _alphanumeric.generate(length)
@@ -0,0 +1,276 @@
+import asyncio
+import collections
+import threading
+import time
+from functools import partial
+
+from duo_universal.fork import reset_in_forked_child
+
+FRESH = 'fresh'
+STALE = 'stale'
+MISS = 'miss'
+# Seconds between health checks sent by a HealthMonitor
+DEFAULT_MONITOR_INTERVAL = 10
+
+HealthStatus = collections.namedtuple(
+    'HealthStatus', ['healthy', 'consecutive_failures', 'last_success', 'last_error'])
+
+
+class HealthCheckCache:
+    """
+    In-memory cache for health check results.
+
+    Successful results are served for `ttl` seconds. Once stale they are
+    still served for up to `stale_ttl` more seconds while a single
+    background refresh runs. Failures are negatively cached for
+    `failure_ttl` seconds and are never served stale.
+
+    Only outcomes of the health check itself are stored. A caller giving up
+    because of its own deadline says nothing about Duo and is never cached.
+    """
+
+    def __init__(self, ttl, failure_ttl, stale_ttl):
+        """
+        Arguments:
+
+        ttl             -- Seconds a successful result is considered fresh
+        failure_ttl     -- Seconds a failed result is replayed before retrying
+        stale_ttl       -- Seconds past `ttl` a successful result may be served
+                           while it is refreshed in the background
+        """
+        self._ttl = ttl
+        self._failure_ttl = failure_ttl
+        self._stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        self._result = None
+        self._error = None
+        self._fresh_until = 0
+        self._stale_until = 0
+        self._refreshing = False
+        self._background_tasks = set()
+        reset_in_forked_child(self)
+
+    def _after_fork_in_child(self):
+        # A refresh running in the parent never finishes here
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._background_tasks = set()
+
+    def _store(self, result=None, error=None):
+        now = time.monotonic()
+        with self._lock:
+            self._result = result
+            self._error = error
+            if error is None:
+                self._fresh_until = now + self._ttl
+                self._stale_until = self._fresh_until + self._stale_ttl
+            else:
+                self._fresh_until = now + self._failure_ttl
+                self._stale_until = self._fresh_until
+            self._refreshing = False
+
+    def _lookup(self):
+        """
+        Returns (status, result, error, start_refresh) for the current entry
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now < self._fresh_until:
+                return FRESH, self._result, self._error, False
+            if now < self._stale_until:
+                start_refresh = not self._refreshing
+                self._refreshing = True
+                return STALE, self._result, None, start_refresh
+            return MISS, None, None, False
+
+    def _replay(self, result, error):
+        if error is not None:
+            # Raise a fresh instance so concurrent callers never share a traceback
+            raise type(error)(*error.args)
+        return result
+
+    def invalidate(self):
+        """
+        Drops the cached result so the next lookup goes to Duo
+        """
+        with self._lock:
+            self._result = None
+            self._error = None
+            self._fresh_until = 0
+            self._stale_until = 0
+
+    def _refresh(self, check):
+        try:
+            result = check()
+        except Exception as e:
+            self._store(error=e)
+            raise
+        self._store(result=result)
+        return result
+
+    def _quietly(self, refresh):
+        try:
+            refresh()
+        except Exception:
+            pass
+
+    def get(self, check, share=None):
+        """
+        Returns a cached health check result, calling `check` when needed
+
+        Arguments:
+
+        check           -- Callable performing the uncached health check
+        share           -- (Optional) Callable running the refresh passed to it,
+                           for example through a SingleFlight with the caller's
+                           deadline. Its own exceptions are raised but not cached.
+
+        Raises:
+
+        The exception raised by `check` or `share`, or a copy of the cached one
+        """
+        refresh = partial(self._refresh, check)
+        if share is not None:
+            refresh = partial(share, refresh)
+        status, result, error, start_refresh = self._lookup()
+        if status == FRESH:
+            return self._replay(result, error)
+        if status == STALE:
+            if start_refresh:
+                threading.Thread(target=self._quietly, args=(refresh,),
+                                 name='duo-health-check-refresh', daemon=True).start()
+            return result
+        return refresh()
+
+    async def _arefresh(self, check):
+        try:
+            result = await check()
+        except Exception as e:
+            self._store(error=e)
+            raise
+        self._store(result=result)
+        return result
+
+    async def _aquietly(self, refresh):
+        try:
+            await refresh()
+        except Exception:
+            pass
+
+    async def aget(self, check, share=None):
+        """
+        Awaitable counterpart of get() for coroutine `check` and `share` functions
+        """
+        refresh = partial(self._arefresh, check)
+        if share is not None:
+            refresh = partial(share, refresh)
+        status, result, error, start_refresh = self._lookup()
+        if status == FRESH:
+            return self._replay(result, error)
+        if status == STALE:
+            if start_refresh:
+                # Hold a reference so the event loop cannot drop the task early
+                task = asyncio.ensure_future(self._aquietly(refresh))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            return result
+        return await refresh()
+
+
+class HealthMonitor:
+    """
+    Polls Client.health_check() from a daemon thread.
+
+    The monitor thread is the only writer and publishes each outcome as a
+    new immutable HealthStatus, so is_healthy() and status() are a single
+    attribute read with no I/O or locking on the request path. A monitor
+    running when the process forks is restarted in the child.
+    """
+
+    def __init__(self, client, interval=DEFAULT_MONITOR_INTERVAL, failure_threshold=1,
+                 initially_healthy=True):
+        """
+        Arguments:
+
+        client              -- Client whose health_check() is polled
+        interval            -- Seconds between health checks
+        failure_threshold   -- Consecutive failures before Duo is reported unhealthy
+        initially_healthy   -- (Optional: default true) Status reported before the first check completes
+        """
+        self._client = client
+        self._interval = interval
+        self._failure_threshold = failure_threshold
+        self._status = HealthStatus(initially_healthy, 0, None, None)
+        self._stop_event = threading.Event()
+        self._thread = None
+        reset_in_forked_child(self)
+
+    def _after_fork_in_child(self):
+        running = self._thread is not None
+        self._stop_event = threading.Event()
+        self._thread = None
+        if running:
+            self.start()
+
+    def is_healthy(self):
+        """
+        Returns whether the most recent checks found Duo available
+        """
+        return self._status.healthy
+
+    def status(self):
+        """
+        Returns the latest HealthStatus snapshot
+        """
+        return self._status
+
+    def check_now(self):
+        """
+        Runs one health check and publishes its outcome
+
+        Returns:
+
+        The new HealthStatus
+        """
+        previous = self._status
+        try:
+            self._client.health_check()
+        except Exception as e:
+            failures = previous.consecutive_failures + 1
+            status = HealthStatus(failures < self._failure_threshold and previous.healthy,
+                                  failures, previous.last_success, e)
+        else:
+            status = HealthStatus(True, 0, time.time(), None)
+        self._status = status
+        return status
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.check_now()
+            self._stop_event.wait(self._interval)
+
+    def start(self):
+        """
+        Starts polling in a daemon thread; the first check runs immediately
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='duo-health-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stops polling and waits up to `timeout` seconds for the thread to exit
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
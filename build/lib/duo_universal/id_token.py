@@ -0,0 +1,174 @@
+import base64
+import binascii
+import json
+import re
+import time
+
+import jwt
+from jwt.exceptions import (
+    DecodeError,
+    ExpiredSignatureError,
+    ImmatureSignatureError,
+    InvalidAudienceError,
+    InvalidIssuedAtError,
+    InvalidIssuerError,
+    InvalidJTIError,
+    InvalidSignatureError,
+    InvalidSubjectError,
+    MissingRequiredClaimError,
+)
+
+from duo_universal.jwt_signer import HS512_HEADER_SEGMENT, HS512Signer, base64url_encode
+
+REQUIRED_CLAIMS = ('exp', 'iat')
+_BASE64URL_SEGMENT = re.compile(rb'[A-Za-z0-9_-]*')
+
+
+def _decode_segment(segment, name):
+    """
+    Decodes a base64url segment as strictly as PyJWT does
+    """
+    stripped = segment.rstrip(b'=')
+    padding = len(segment) - len(stripped)
+    if padding > 2 or (padding and len(segment) % 4 != 0):
+        raise DecodeError('Invalid {} padding'.format(name))
+    if len(stripped) % 4 == 1 or not _BASE64URL_SEGMENT.fullmatch(stripped):
+        raise DecodeError('Invalid {} padding'.format(name))
+    try:
+        decoded = base64.urlsafe_b64decode(stripped + b'=' * (-len(stripped) % 4))
+    except binascii.Error as err:
+        raise DecodeError('Invalid {} padding'.format(name)) from err
+    if base64url_encode(decoded) != stripped:
+        raise DecodeError('Invalid {} padding'.format(name))
+    return decoded
+
+
+class IdTokenVerifier:
+    """
+    Verifies HS512 id_tokens for one client.
+
+    Equivalent to calling jwt.decode with the client's audience, issuer,
+    leeway, HS512 and required exp/iat on every exchange, but the
+    parameters are fixed at construction and the signature is checked with
+    the client's pre-keyed HMAC. Tokens carrying any header other than
+    Duo's usual {"alg":"HS512","typ":"JWT"} are handed to jwt.decode, so
+    unusual tokens get exactly PyJWT's treatment. Errors are the PyJWT
+    exception classes jwt.decode would raise.
+    """
+
+    def __init__(self, secret, audience, issuer, leeway, signer=None):
+        """
+        Arguments:
+
+        secret          -- HMAC secret the id_tokens are signed with
+        audience        -- Required 'aud' claim
+        issuer          -- Required 'iss' claim
+        leeway          -- Seconds of clock skew tolerated for exp and iat
+        signer          -- (Optional) HS512Signer already keyed with `secret`
+        """
+        self._secret = secret
+        self._audience = audience
+        self._issuer = issuer
+        self._leeway = leeway
+        self._signer = signer if signer is not None else HS512Signer(secret)
+        self._header_segment = HS512_HEADER_SEGMENT
+
+    def _decode_with_pyjwt(self, token):
+        return jwt.decode(token,
+                          self._secret,
+                          audience=self._audience,
+                          issuer=self._issuer,
+                          leeway=self._leeway,
+                          algorithms=["HS512"],
+                          options={
+                              'require': list(REQUIRED_CLAIMS),
+                              'verify_iat': True
+                          })
+
+    def verify(self, token):
+        """
+        Returns the claims of `token` after checking its signature and claims
+
+        Raises:
+
+        jwt.exceptions.InvalidTokenError (or a subclass) if the token is invalid
+        """
+        if isinstance(token, str):
+            token = token.encode('utf-8')
+        if not isinstance(token, bytes):
+            raise DecodeError('Invalid token type. Token must be a {}'.format(bytes))
+        try:
+            signing_input, crypto_segment = token.rsplit(b'.', 1)
+            header_segment, payload_segment = signing_input.split(b'.', 1)
+        except ValueError as err:
+            raise DecodeError('Not enough segments') from err
+        if header_segment != self._header_segment:
+            return self._decode_with_pyjwt(token)
+
+        payload = _decode_segment(payload_segment, 'payload')
+        signature = _decode_segment(crypto_segment, 'crypto')
+        if not self._signer.verify(signing_input, signature):
+            raise InvalidSignatureError('Signature verification failed')
+
+        try:
+            claims = json.loads(payload)
+        except (ValueError, RecursionError) as e:
+            raise DecodeError('Invalid payload string: {}'.format(e)) from e
+        if not isinstance(claims, dict):
+            raise DecodeError('Invalid payload string: must be a json object')
+        self._validate_claims(claims)
+        return claims
+
+    def _validate_claims(self, claims):
+        for claim in REQUIRED_CLAIMS:
+            if claims.get(claim) is None:
+                raise MissingRequiredClaimError(claim)
+
+        now = time.time()
+        leeway = self._leeway
+        try:
+            iat = int(claims['iat'])
+        except (ValueError, TypeError, OverflowError):
+            raise InvalidIssuedAtError('Issued At claim (iat) must be an integer.') from None
+        if iat > now + leeway:
+            raise ImmatureSignatureError('The token is not yet valid (iat)')
+
+        if 'nbf' in claims:
+            try:
+                nbf = int(claims['nbf'])
+            except (ValueError, TypeError, OverflowError):
+                raise DecodeError('Not Before claim (nbf) must be an integer.') from None
+            if nbf > now + leeway:
+                raise ImmatureSignatureError('The token is not yet valid (nbf)')
+
+        try:
+            exp = int(claims['exp'])
+        except (ValueError, TypeError, OverflowError):
+            raise DecodeError('Expiration Time claim (exp) must be an integer.') from None
+        if exp <= now - leeway:
+            raise ExpiredSignatureError('Signature has expired')
+
+        if 'iss' not in claims:
+            raise MissingRequiredClaimError('iss')
+        if not isinstance(claims['iss'], str):
+            raise InvalidIssuerError('Payload Issuer (iss) must be a string')
+        if claims['iss'] != self._issuer:
+            raise InvalidIssuerError('Invalid issuer')
+
+        self._validate_audience(claims)
+
+        if 'sub' in claims and not isinstance(claims['sub'], str):
+            raise InvalidSubjectError('Subject must be a string')
+        if 'jti' in claims and not isinstance(claims['jti'], str):
+            raise InvalidJTIError('JWT ID must be a string')
+
+    def _validate_audience(self, claims):
+        audience_claims = claims.get('aud')
+        if not audience_claims:
+            raise MissingRequiredClaimError('aud')
+        if isinstance(audience_claims, str):
+            audience_claims = [audience_claims]
+        if not isinstance(audience_claims, list) or any(not isinstance(c, str) for c in audience_claims):
+            raise InvalidAudienceError('Invalid claim format in token')
+        if self._audience not in audience_claims:
+            raise InvalidAudienceError("Audience doesn't match")
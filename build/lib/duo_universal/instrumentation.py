@@ -0,0 +1,142 @@
+import collections
+import contextvars
+import time
+
+OPERATION_HEALTH_CHECK = 'health_check'
+OPERATION_CREATE_AUTH_URL = 'create_auth_url'
+OPERATION_TOKEN_EXCHANGE = 'token_exchange'
+
+# Minting the client assertion or request JWT
+PHASE_SIGN = 'sign'
+# DNS lookup and TCP connect of a new connection
+PHASE_CONNECT = 'connect'
+# TLS handshake of a new connection
+PHASE_TLS = 'tls'
+# Sending the request and waiting for Duo's response, including retries
+# but not the connect and tls phases of new connections
+PHASE_REQUEST = 'request'
+# Parsing the response and verifying the id_token
+PHASE_VERIFY = 'verify'
+# The whole call
+PHASE_TOTAL = 'total'
+
+OUTCOME_OK = 'ok'
+OUTCOME_ERROR = 'error'
+OUTCOME_TIMEOUT = 'timeout'
+OUTCOME_CIRCUIT_OPEN = 'circuit_open'
+OUTCOME_INVALID_TOKEN = 'invalid_token'
+OUTCOME_USERNAME_MISMATCH = 'username_mismatch'
+OUTCOME_NONCE_MISMATCH = 'nonce_mismatch'
+
+PhaseEvent = collections.namedtuple(
+    'PhaseEvent', ['operation', 'phase', 'duration', 'endpoint', 'status_code', 'outcome'])
+
+# The CallTimer of the call being made in the current thread or task, if observed
+observed_call = contextvars.ContextVar('duo_universal_observed_call', default=None)
+
+
+class CallTimer:
+    """
+    Times the phases of one observed call and reports them as PhaseEvents.
+
+    Phases run back to back: begin() ends the current phase and starts the
+    next. Phases nested in the current one, such as the connect and tls
+    phases of a connection opened during the request, are reported with
+    add() and excluded from the enclosing phase. Nothing is reported until
+    finish(), so every event carries the call's status code and outcome.
+    """
+    __slots__ = ('_observers', '_operation', '_endpoint', '_start', '_phase', '_phase_start',
+                 '_nested', '_phases')
+
+    def __init__(self, observers, operation, endpoint, phase):
+        """
+        Arguments:
+
+        observers       -- Callables receiving each PhaseEvent
+        operation       -- Name of the Client operation being timed
+        endpoint        -- Duo endpoint the call targets
+        phase           -- Phase the call starts in
+        """
+        self._observers = observers
+        self._operation = operation
+        self._endpoint = endpoint
+        self._start = self._phase_start = time.perf_counter()
+        self._phase = phase
+        self._nested = 0.0
+        self._phases = []
+
+    def _end_phase(self, now):
+        self._phases.append((self._phase, now - self._phase_start - self._nested))
+        self._nested = 0.0
+
+    def begin(self, phase):
+        """
+        Ends the current phase and starts `phase`
+        """
+        now = time.perf_counter()
+        self._end_phase(now)
+        self._phase = phase
+        self._phase_start = now
+
+    def add(self, phase, duration):
+        """
+        Records a phase of `duration` seconds nested in the current one
+        """
+        self._phases.append((phase, duration))
+        self._nested += duration
+
+    def observe(self):
+        """
+        Makes this the observed call of the current thread or task
+
+        Returns:
+
+        A token for unobserve()
+        """
+        return observed_call.set(self)
+
+    def unobserve(self, token):
+        observed_call.reset(token)
+
+    def finish(self, status_code, outcome):
+        """
+        Ends the current phase and reports every phase and the total
+
+        Exceptions raised by observers are ignored, so instrumentation never
+        fails a login.
+        """
+        now = time.perf_counter()
+        self._end_phase(now)
+        self._phases.append((PHASE_TOTAL, now - self._start))
+        for phase, duration in self._phases:
+            event = PhaseEvent(self._operation, phase, duration, self._endpoint, status_code, outcome)
+            for observer in self._observers:
+                try:
+                    observer(event)
+                except Exception:
+                    pass
+
+
+class _NullTimer:
+    """
+    Stands in for a CallTimer when a client has no observers
+    """
+    __slots__ = ()
+
+    def begin(self, phase):
+        pass
+
+    def add(self, phase, duration):
+        pass
+
+    def observe(self):
+        return None
+
+    def unobserve(self, token):
+        pass
+
+    def finish(self, status_code, outcome):
+        pass
+
+
+NULL_TIMER = _NullTimer()
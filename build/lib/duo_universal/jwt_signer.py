@@ -0,0 +1,71 @@
+import base64
+import hashlib
+import hmac
+import json
+
+HS512_HEADER = {'alg': 'HS512', 'typ': 'JWT'}
+
+
+def base64url_encode(data):
+    return base64.urlsafe_b64encode(data).replace(b'=', b'')
+
+
+# PyJWT serializes the header compactly with sorted keys
+HS512_HEADER_SEGMENT = base64url_encode(
+    json.dumps(HS512_HEADER, separators=(',', ':'), sort_keys=True).encode('utf-8'))
+
+
+class HS512Signer:
+    """
+    Signs HS512 JWTs with output byte-identical to
+    jwt.encode(payload, secret, algorithm='HS512').
+
+    The header segment is encoded once per process and the HMAC is keyed
+    once per signer; each signature works on a copy of the keyed HMAC, so
+    a signer can be shared between threads.
+    """
+    # One signer per client, and a ClientRegistry may hold many clients
+    __slots__ = ('_secret', '_hmac')
+
+    def __init__(self, secret):
+        """
+        Arguments:
+
+        secret          -- HMAC secret as str or bytes
+        """
+        if isinstance(secret, str):
+            secret = secret.encode('utf-8')
+        self._secret = secret
+        self._hmac = hmac.new(secret, digestmod='sha512')
+
+    def __reduce__(self):
+        # HMAC objects cannot be pickled; rebuild from the key instead
+        return (type(self), (self._secret,))
+
+    def sign(self, signing_input):
+        """
+        Returns the raw HS512 signature of `signing_input` bytes
+        """
+        mac = self._hmac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def encode_segment(self, payload_segment):
+        """
+        Returns the compact JWT for an already base64url-encoded payload segment
+        """
+        signing_input = HS512_HEADER_SEGMENT + b'.' + payload_segment
+        return (signing_input + b'.' + base64url_encode(self.sign(signing_input))).decode('utf-8')
+
+    def encode(self, payload):
+        """
+        Returns the compact HS512 JWT for the `payload` claims dict
+        """
+        json_payload = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return self.encode_segment(base64url_encode(json_payload))
+
+    def verify(self, signing_input, signature):
+        """
+        Returns whether `signature` is the HS512 signature of `signing_input`
+        """
+        return hmac.compare_digest(signature, self.sign(signing_input))
@@ -0,0 +1,235 @@
+import array
+import math
+import threading
+from urllib.parse import urlsplit
+
+from duo_universal.fork import reset_in_forked_child
+from duo_universal.instrumentation import PHASE_TOTAL
+
+# Histogram buckets per power of two; quantiles are within about 3% of the true value
+HISTOGRAM_SUB_BUCKETS = 16
+# Durations are bucketed from 2**HISTOGRAM_MIN_EXPONENT (about 1 us) to
+# 2**HISTOGRAM_MAX_EXPONENT (256 s) seconds and clamped outside that range
+HISTOGRAM_MIN_EXPONENT = -20
+HISTOGRAM_MAX_EXPONENT = 8
+_BUCKET_COUNT = (HISTOGRAM_MAX_EXPONENT - HISTOGRAM_MIN_EXPONENT) * HISTOGRAM_SUB_BUCKETS
+# Quantiles reported by stats snapshots and the Prometheus exporter
+QUANTILES = (0.5, 0.95, 0.99)
+# Prefix of the metric names written by prometheus_text
+DEFAULT_METRIC_PREFIX = 'duo_universal'
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed histogram of durations in seconds.
+
+    Each power of two is split into HISTOGRAM_SUB_BUCKETS equal buckets, so
+    the relative error of a quantile is the same from microseconds to
+    minutes and recording is a frexp and an increment. The exact minimum,
+    maximum and sum are kept alongside the buckets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = array.array('Q', bytes(8 * _BUCKET_COUNT))
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    @staticmethod
+    def _bucket(duration):
+        mantissa, exponent = math.frexp(duration)
+        # frexp(0.0) has exponent 0, which would land mid-range
+        if duration <= 0 or exponent <= HISTOGRAM_MIN_EXPONENT:
+            return 0
+        octave = exponent - HISTOGRAM_MIN_EXPONENT - 1
+        sub_bucket = int((mantissa - 0.5) * 2 * HISTOGRAM_SUB_BUCKETS)
+        return min(octave * HISTOGRAM_SUB_BUCKETS + sub_bucket, _BUCKET_COUNT - 1)
+
+    @staticmethod
+    def _bucket_midpoint(index):
+        octave, sub_bucket = divmod(index, HISTOGRAM_SUB_BUCKETS)
+        exponent = octave + HISTOGRAM_MIN_EXPONENT + 1
+        width = math.ldexp(1 / (2 * HISTOGRAM_SUB_BUCKETS), exponent)
+        return math.ldexp(0.5, exponent) + (sub_bucket + 0.5) * width
+
+    def record(self, duration):
+        index = self._bucket(duration)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += duration
+            if duration < self.min:
+                self.min = duration
+            if duration > self.max:
+                self.max = duration
+
+    def merge(self, other):
+        """
+        Adds the recorded durations of `other` to this histogram
+        """
+        with other._lock:
+            counts = array.array('Q', other._counts)
+            count, total, low, high = other.count, other.sum, other.min, other.max
+        with self._lock:
+            for index, bucket_count in enumerate(counts):
+                if bucket_count:
+                    self._counts[index] += bucket_count
+            self.count += count
+            self.sum += total
+            self.min = min(self.min, low)
+            self.max = max(self.max, high)
+
+    def quantiles(self, quantiles=QUANTILES):
+        """
+        Returns the estimated duration at each quantile, or None when empty
+        """
+        with self._lock:
+            counts = array.array('Q', self._counts)
+            count, low, high = self.count, self.min, self.max
+        if not count:
+            return [None for _ in quantiles]
+        results = []
+        for quantile in quantiles:
+            rank = max(math.ceil(quantile * count), 1)
+            if rank == 1 or rank >= count:
+                # The extremes are known exactly
+                results.append(low if rank == 1 else high)
+                continue
+            seen = 0
+            for index, bucket_count in enumerate(counts):
+                seen += bucket_count
+                if seen >= rank:
+                    break
+            if index == 0:
+                # The lowest bucket also holds zero and underflowing durations
+                results.append(low)
+                continue
+            results.append(min(max(self._bucket_midpoint(index), low), high))
+        return results
+
+    def summary(self):
+        """
+        Returns {'count', 'sum', 'mean', 'max', 'p50', 'p95', 'p99'} with durations in seconds
+        """
+        p50, p95, p99 = self.quantiles()
+        with self._lock:
+            count, total, high = self.count, self.sum, self.max
+        return {
+            'count': count,
+            'sum': total,
+            'mean': total / count if count else None,
+            'max': high if count else None,
+            'p50': p50,
+            'p95': p95,
+            'p99': p99,
+        }
+
+
+class ClientStats:
+    """
+    Client observer keeping a LatencyHistogram per operation, endpoint,
+    outcome and phase.
+
+    Pass collect_stats=True to Client to give it its own, or the same
+    ClientStats to several clients (ClientRegistry does) to aggregate them.
+    A forked child starts with empty histograms, so each worker reports
+    only its own calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        reset_in_forked_child(self)
+
+    def _after_fork_in_child(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def __call__(self, event):
+        key = (event.operation, event.endpoint, event.outcome, event.phase)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        histogram.record(event.duration)
+
+    def series(self):
+        """
+        Returns a list of ((operation, endpoint, outcome, phase), LatencyHistogram) pairs
+        """
+        with self._lock:
+            return sorted(self._histograms.items(), key=lambda item: item[0])
+
+    def snapshot(self, host=None):
+        """
+        Returns latency summaries as {operation: {outcome: {phase: summary}}}
+
+        Arguments:
+
+        host            -- (Optional) Only include calls to this API host.
+                           None merges the calls to every host.
+
+        Each summary is a LatencyHistogram.summary() dict; the 'total'
+        phase counts the calls themselves.
+        """
+        merged = {}
+        for (operation, endpoint, outcome, phase), histogram in self.series():
+            if host is not None and urlsplit(endpoint).hostname != host.lower():
+                continue
+            key = (operation, outcome, phase)
+            if key not in merged:
+                merged[key] = LatencyHistogram()
+            merged[key].merge(histogram)
+        snapshot = {}
+        for (operation, outcome, phase), histogram in merged.items():
+            snapshot.setdefault(operation, {}).setdefault(outcome, {})[phase] = histogram.summary()
+        return snapshot
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(**labels):
+    return ','.join('{}="{}"'.format(name, _escape_label(value)) for name, value in labels.items())
+
+
+def prometheus_text(*stats, prefix=DEFAULT_METRIC_PREFIX):
+    """
+    Renders ClientStats in the Prometheus text exposition format
+
+    Arguments:
+
+    stats           -- ClientStats to export
+    prefix          -- (Optional) Prefix of the metric names
+
+    Returns:
+
+    A string with a <prefix>_calls_total counter per operation, endpoint
+    and outcome, and a <prefix>_call_duration_seconds summary per
+    operation, endpoint, outcome and phase with the QUANTILES
+    """
+    counter = '{}_calls_total'.format(prefix)
+    summary = '{}_call_duration_seconds'.format(prefix)
+    series = [item for client_stats in stats for item in client_stats.series()]
+    lines = [
+        '# HELP {} Calls to Duo by operation, endpoint and outcome.'.format(counter),
+        '# TYPE {} counter'.format(counter),
+    ]
+    for (operation, endpoint, outcome, phase), histogram in series:
+        if phase == PHASE_TOTAL:
+            labels = _labels(operation=operation, endpoint=endpoint, outcome=outcome)
+            lines.append('{}{{{}}} {}'.format(counter, labels, histogram.count))
+    lines.extend([
+        '# HELP {} Duration of calls to Duo and of their phases.'.format(summary),
+        '# TYPE {} summary'.format(summary),
+    ])
+    for (operation, endpoint, outcome, phase), histogram in series:
+        labels = _labels(operation=operation, endpoint=endpoint, outcome=outcome, phase=phase)
+        for quantile, value in zip(QUANTILES, histogram.quantiles()):
+            lines.append('{}{{{},quantile="{}"}} {!r}'.format(summary, labels, quantile, value))
+        lines.append('{}_sum{{{}}} {!r}'.format(summary, labels, histogram.sum))
+        lines.append('{}_count{{{}}} {}'.format(summary, labels, histogram.count))
+    return '\n'.join(lines) + '\n'
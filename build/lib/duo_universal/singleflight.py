@@ -0,0 +1,137 @@
+import asyncio
+import contextvars
+import threading
+from functools import partial
+
+from duo_universal.fork import reset_in_forked_child
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls: while a call for a key is in flight, other
+    threads asking for the same key wait for it and receive its result or
+    exception instead of starting their own. A caller's timeout only limits
+    how long that caller waits; the shared call always runs to completion.
+    Calls in flight when the process forks are forgotten in the child.
+    """
+    # One per client, and a ClientRegistry may hold many clients
+    __slots__ = ('_lock', '_calls', '__weakref__')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        reset_in_forked_child(self)
+
+    def _after_fork_in_child(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, timeout=None):
+        """
+        Runs `func` unless a call for `key` is already in flight, then
+        returns (or raises) that call's outcome
+
+        Arguments:
+
+        key             -- Hashable identifying equivalent calls
+        func            -- Callable taking no arguments
+        timeout         -- (Optional) Seconds this caller waits for the
+                           outcome before raising TimeoutError. A caller
+                           starting the call with a timeout runs `func` in a
+                           daemon thread, so the call carries on for the
+                           other callers after it gives up.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if leader:
+            if timeout is None:
+                return self._run(key, call, func)
+            # Copy the context so the call keeps the caller's trace and observers
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=(self._run_quietly, key, call, func),
+                             name='duo-single-flight', daemon=True).start()
+
+        if not call.done.wait(timeout):
+            raise TimeoutError(key)
+        if call.error is not None:
+            # Raise a fresh instance so concurrent callers never share a traceback
+            raise type(call.error)(*call.error.args) from call.error
+        return call.result
+
+    def _run(self, key, call, func):
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def _run_quietly(self, key, call, func):
+        try:
+            self._run(key, call, func)
+        except BaseException:
+            # Handed to the callers through `call`
+            pass
+
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of SingleFlight for coroutine functions.
+
+    The shared call runs as a task, so a waiter that is cancelled or times
+    out does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        reset_in_forked_child(self)
+
+    def _after_fork_in_child(self):
+        # The tasks belong to the parent's event loop
+        self._tasks = {}
+
+    async def do(self, key, func, timeout=None):
+        """
+        Awaits `func()` unless a call for `key` is already in flight, then
+        returns (or raises) that call's outcome
+
+        Arguments:
+
+        key             -- Hashable identifying equivalent calls
+        func            -- Coroutine function taking no arguments
+        timeout         -- (Optional) Seconds to wait before raising asyncio.TimeoutError
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(partial(self._forget, key))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except Exception as e:
+            if task.done() and not task.cancelled() and task.exception() is e:
+                # Raise a fresh instance so concurrent callers never share a traceback
+                raise type(e)(*e.args) from e
+            raise
+
+    def _forget(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter gave up
+            task.exception()
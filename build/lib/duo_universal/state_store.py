@@ -0,0 +1,170 @@
+import abc
+import collections
+import json
+import threading
+import time
+
+from duo_universal.client import DuoException
+from duo_universal.fork import reset_in_forked_child
+
+# Seconds a saved state stays redeemable; matches the longest request JWT expiry
+DEFAULT_STATE_TTL = 300
+# Number of independently locked shards in an InMemoryStateStore
+DEFAULT_STATE_SHARDS = 16
+# Key prefix used by RemoteStateStore
+DEFAULT_STATE_KEY_PREFIX = 'duo_universal:state:'
+
+ERR_STATE_EXISTS = 'A value is already saved for this state.'
+ERR_STATE_STORE_CONFIG = 'State stores need a positive TTL, at least one shard and a positive size limit.'
+
+
+class StateStore(abc.ABC):
+    """
+    Server-side storage for the values an integration needs between
+    create_auth_url and the Duo callback, keyed by the state.
+
+    Each state is single use: take() returns its value once and removes it,
+    and entries are never returned after their TTL.
+    """
+
+    @abc.abstractmethod
+    def put(self, state, value, ttl=None):
+        """
+        Saves `value` for `state`
+
+        Arguments:
+
+        state           -- State passed to create_auth_url
+        value           -- JSON-serializable value, e.g. {'username': ..., 'nonce': ...}
+        ttl             -- (Optional) Seconds the value stays redeemable. Defaults to the store's TTL.
+
+        Raises:
+
+        DuoException if a value is already saved for `state`
+        """
+
+    @abc.abstractmethod
+    def take(self, state):
+        """
+        Returns and removes the value saved for `state`, or None if there is
+        none or it has expired
+        """
+
+
+class _Shard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # state -> (expires_at, value); OrderedDict pops its oldest entry in O(1)
+        self.entries = collections.OrderedDict()
+
+
+class InMemoryStateStore(StateStore):
+    """
+    StateStore for a single process.
+
+    States are spread over independently locked shards so concurrent
+    requests rarely contend. put() and take() are O(1); put() also drops
+    expired entries from the front of its shard, and the oldest entry once a
+    shard holds max_entries / shards values.
+    """
+
+    def __init__(self, ttl=DEFAULT_STATE_TTL, shards=DEFAULT_STATE_SHARDS, max_entries=None):
+        """
+        Arguments:
+
+        ttl             -- (Optional) Default seconds a saved state stays redeemable
+        shards          -- (Optional) Number of lock-striped shards
+        max_entries     -- (Optional) Upper bound on saved states. None is unbounded.
+        """
+        if ttl <= 0 or shards < 1 or (max_entries is not None and max_entries < 1):
+            raise DuoException(ERR_STATE_STORE_CONFIG)
+        self._ttl = ttl
+        self._shards = [_Shard() for _ in range(shards)]
+        self._shard_limit = None if max_entries is None else max(max_entries // shards, 1)
+        reset_in_forked_child(self)
+
+    def _after_fork_in_child(self):
+        for shard in self._shards:
+            shard.lock = threading.Lock()
+
+    def _shard(self, state):
+        return self._shards[hash(state) % len(self._shards)]
+
+    def __len__(self):
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def put(self, state, value, ttl=None):
+        now = time.monotonic()
+        expires_at = now + (self._ttl if ttl is None else ttl)
+        shard = self._shard(state)
+        with shard.lock:
+            entries = shard.entries
+            existing = entries.get(state)
+            if existing is not None and existing[0] > now:
+                raise DuoException(ERR_STATE_EXISTS)
+            entries.pop(state, None)
+            self._evict(entries, now)
+            entries[state] = (expires_at, value)
+
+    def _evict(self, entries, now):
+        """
+        Drops expired entries at the front of a shard and the oldest beyond its limit
+        """
+        while entries:
+            oldest = next(iter(entries))
+            if entries[oldest][0] > now and (self._shard_limit is None or len(entries) < self._shard_limit):
+                return
+            entries.popitem(last=False)
+
+    def take(self, state):
+        shard = self._shard(state)
+        with shard.lock:
+            entry = shard.entries.pop(state, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+
+class RemoteStateStore(StateStore):
+    """
+    StateStore shared by every node of a deployment through a key-value
+    server, so the callback may land on any node.
+
+    `connection` is any object with redis-py's set(name, value, px=, nx=)
+    and getdel(name) methods, such as a redis.Redis for Redis 6.2 or later.
+    put() uses SET NX PX, so a state can only be saved once, and take() uses
+    GETDEL, so it can only be redeemed once across all nodes. Values are
+    stored as JSON.
+    """
+
+    def __init__(self, connection, ttl=DEFAULT_STATE_TTL, key_prefix=DEFAULT_STATE_KEY_PREFIX):
+        """
+        Arguments:
+
+        connection      -- Client for the key-value server
+        ttl             -- (Optional) Default seconds a saved state stays redeemable
+        key_prefix      -- (Optional) Prefix namespacing the state keys
+        """
+        if ttl <= 0:
+            raise DuoException(ERR_STATE_STORE_CONFIG)
+        self._connection = connection
+        self._ttl = ttl
+        self._key_prefix = key_prefix
+
+    def put(self, state, value, ttl=None):
+        ttl_ms = max(int((self._ttl if ttl is None else ttl) * 1000), 1)
+        try:
+            saved = self._connection.set(self._key_prefix + state, json.dumps(value), px=ttl_ms, nx=True)
+        except Exception as e:
+            raise DuoException(e)
+        if not saved:
+            raise DuoException(ERR_STATE_EXISTS)
+
+    def take(self, state):
+        try:
+            raw = self._connection.getdel(self._key_prefix + state)
+        except Exception as e:
+            raise DuoException(e)
+        if raw is None:
+            return None
+        return json.loads(raw)
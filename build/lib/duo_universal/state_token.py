@@ -0,0 +1,80 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+from duo_universal.csprng import random_alphanumeric
+
+# Random characters in each token so that states never repeat
+STATE_TOKEN_RANDOM_LENGTH = 16
+STATE_TOKEN_KEY_CONTEXT = b'duo_universal signed state v1'
+
+ERR_STATE_TOKEN_INVALID = 'The state is not a valid signed state.'
+ERR_STATE_TOKEN_EXPIRED = 'The signed state has expired.'
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+class StateTokenSigner:
+    """
+    Issues and verifies self-contained state values.
+
+    A token is base64url(JSON [exp, username, nonce, random]) + '.' +
+    base64url(HMAC-SHA256), keyed with a key derived from the client secret
+    so it never doubles as a JWT signature. Tokens are verified locally and
+    need no storage, but, unlike a StateStore, cannot be made single use.
+    Errors are raised as ValueError with one of the ERR_STATE_TOKEN_* messages.
+    """
+
+    def __init__(self, secret):
+        """
+        Arguments:
+
+        secret          -- Client secret the token key is derived from
+        """
+        if isinstance(secret, str):
+            secret = secret.encode('utf-8')
+        key = hmac.new(secret, STATE_TOKEN_KEY_CONTEXT, hashlib.sha256).digest()
+        self._hmac = hmac.new(key, digestmod=hashlib.sha256)
+
+    def _mac(self, payload):
+        mac = self._hmac.copy()
+        mac.update(payload)
+        return mac.digest()
+
+    def issue(self, username, nonce, ttl):
+        """
+        Returns a token binding `username` and `nonce` that expires in `ttl` seconds
+        """
+        claims = [int(time.time() + ttl), username, nonce, random_alphanumeric(STATE_TOKEN_RANDOM_LENGTH)]
+        payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+        return payload + '.' + _b64encode(self._mac(payload.encode('ascii')))
+
+    def verify(self, token):
+        """
+        Returns (username, nonce) bound into `token`
+
+        Raises:
+
+        ValueError if the token was not issued with this key or has expired
+        """
+        try:
+            payload, signature = token.split('.')
+            expected = _b64encode(self._mac(payload.encode('ascii')))
+            signature_ok = hmac.compare_digest(signature.encode('ascii'), expected.encode('ascii'))
+        except (AttributeError, ValueError):
+            raise ValueError(ERR_STATE_TOKEN_INVALID)
+        if not signature_ok:
+            raise ValueError(ERR_STATE_TOKEN_INVALID)
+        # The payload is authentic, so it is one this signer produced
+        exp, username, nonce, _ = json.loads(_b64decode(payload))
+        if exp <= time.time():
+            raise ValueError(ERR_STATE_TOKEN_EXPIRED)
+        return username, nonce
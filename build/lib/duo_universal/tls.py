@@ -0,0 +1,248 @@
+import ssl
+import threading
+import time
+import weakref
+from requests.adapters import HTTPAdapter
+from requests.certs import where as default_ca_bundle
+from urllib3.connection import HTTPSConnection
+from urllib3.connectionpool import HTTPSConnectionPool
+from urllib3.util.ssl_ import create_urllib3_context
+
+from duo_universal.instrumentation import PHASE_CONNECT, PHASE_TLS, observed_call
+
+_ssl_contexts = {}
+_ssl_contexts_lock = threading.Lock()
+
+
+def _new_ssl_context(**locations):
+    # Same defaults urllib3 would use, including its TLS 1.2 minimum, but
+    # with session tickets allowed so TLS 1.2 sessions can be resumed
+    context = create_urllib3_context()
+    if locations:
+        context.load_verify_locations(**locations)
+    context.options &= ~ssl.OP_NO_TICKET
+    return context
+
+
+def get_ssl_context(ca_certs=None):
+    """
+    Returns the process-wide SSLContext trusting the given CA bundle
+
+    The bundle is parsed the first time it is requested; later calls, from
+    any client or connection pool, share the same context. Callers must
+    treat the returned context as read-only.
+
+    Arguments:
+
+    ca_certs        -- (Optional) Path to a PEM CA bundle. None selects the
+                       default bundle used by requests.
+    """
+    if ca_certs is None:
+        ca_certs = default_ca_bundle()
+    context = _ssl_contexts.get(ca_certs)
+    if context is None:
+        with _ssl_contexts_lock:
+            context = _ssl_contexts.get(ca_certs)
+            if context is None:
+                context = _new_ssl_context(cafile=ca_certs)
+                _ssl_contexts[ca_certs] = context
+    return context
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    """
+    HTTPSConnection reporting the connect and tls phases of each new
+    connection to the observed call, if any
+    """
+    _connect_seconds = 0.0
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            self._connect_seconds = time.perf_counter() - start
+
+    def connect(self):
+        call = observed_call.get()
+        if call is None:
+            return super().connect()
+        self._connect_seconds = 0.0
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            elapsed = time.perf_counter() - start
+            call.add(PHASE_CONNECT, self._connect_seconds)
+            call.add(PHASE_TLS, elapsed - self._connect_seconds)
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class SSLContextAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connections are all built from one pre-loaded SSLContext.
+
+    requests normally hands urllib3 the CA bundle path, and urllib3 loads
+    it into a fresh context for every new connection. This adapter passes
+    the shared context instead and clears the bundle path so nothing is
+    reloaded. Its HTTPS connections report their setup time to observed
+    calls.
+
+    requests 2.32 and later ask the adapter for each pool's settings, so
+    only verified requests get the shared context. Older releases have no
+    such hook and use it for every pool of the adapter.
+    """
+
+    def __init__(self, ssl_context=None, **kwargs):
+        self._ssl_context = ssl_context
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self._ssl_context is not None:
+            kwargs['ssl_context'] = self._ssl_context
+        super().init_poolmanager(*args, **kwargs)
+        self._use_timed_connections(self.poolmanager)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        if self._ssl_context is not None:
+            proxy_kwargs['ssl_context'] = self._ssl_context
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        self._use_timed_connections(manager)
+        return manager
+
+    def _use_timed_connections(self, manager):
+        pool_classes = dict(manager.pool_classes_by_scheme)
+        pool_classes['https'] = TimedHTTPSConnectionPool
+        manager.pool_classes_by_scheme = pool_classes
+
+    if hasattr(HTTPAdapter, 'build_connection_pool_key_attributes'):
+        def build_connection_pool_key_attributes(self, request, verify, cert=None):
+            host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+            if self._ssl_context is not None and verify is not False:
+                pool_kwargs['ssl_context'] = self._ssl_context
+                pool_kwargs.pop('ca_certs', None)
+                pool_kwargs.pop('ca_cert_dir', None)
+            return host_params, pool_kwargs
+
+    def cert_verify(self, conn, url, verify, cert):
+        super().cert_verify(conn, url, verify, cert)
+        if self._ssl_context is not None and verify is not False:
+            conn.ca_certs = None
+            conn.ca_cert_dir = None
+
+
+class TLSSessionCache:
+    """
+    Remembers the latest TLS session per server name so new connections can
+    resume it, and counts resumed versus full handshakes.
+
+    TLS 1.3 servers send session tickets after the handshake, so sockets
+    whose session has no ticket yet are tracked by weak reference and read
+    again by capture() once a response has been received on them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._pending = {}
+        self._resumed = 0
+        self._full = 0
+
+    def session_for(self, server_hostname):
+        """
+        Returns the session to offer when connecting to `server_hostname`, if any
+        """
+        return self._sessions.get(server_hostname)
+
+    def record(self, server_hostname, sock):
+        """
+        Counts the handshake just completed on `sock` and tracks its session
+        """
+        with self._lock:
+            if sock.session_reused:
+                self._resumed += 1
+            else:
+                self._full += 1
+            self._pending[server_hostname] = weakref.ref(sock)
+            self._store_session(server_hostname, sock)
+
+    def _store_session(self, server_hostname, sock):
+        session = sock.session
+        if session is not None:
+            self._sessions[server_hostname] = session
+            if session.has_ticket:
+                self._pending.pop(server_hostname, None)
+
+    def capture(self):
+        """
+        Picks up session tickets that arrived on recently opened sockets
+        """
+        if not self._pending:
+            return
+        with self._lock:
+            for server_hostname, socket_ref in list(self._pending.items()):
+                sock = socket_ref()
+                if sock is None:
+                    del self._pending[server_hostname]
+                    continue
+                self._store_session(server_hostname, sock)
+
+    def _after_fork_in_child(self):
+        # Cached sessions stay resumable; sockets and counts are the parent's
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._resumed = 0
+        self._full = 0
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self._pending.clear()
+
+    def stats(self):
+        """
+        Returns {'resumed': <int>, 'full': <int>} handshake counts
+        """
+        with self._lock:
+            return {'resumed': self._resumed, 'full': self._full}
+
+
+class SessionResumingSSLContext:
+    """
+    Wraps a shared SSLContext so sockets it creates resume sessions from a
+    TLSSessionCache. Every other attribute is read from the wrapped
+    context, which keeps the loaded trust store shared between clients.
+
+    urllib3 sets verify_mode and check_hostname on its context for every
+    connection. Writes that match the shared context change nothing; any
+    other write moves this wrapper onto a private copy, so the shared
+    context is never modified.
+    """
+
+    def __init__(self, context, session_cache):
+        object.__setattr__(self, '_context', context)
+        object.__setattr__(self, '_shared_context', context)
+        object.__setattr__(self, '_session_cache', session_cache)
+
+    def wrap_socket(self, sock, server_hostname=None, **kwargs):
+        session = self._session_cache.session_for(server_hostname)
+        if session is not None and 'session' not in kwargs:
+            kwargs['session'] = session
+        ssl_sock = self._context.wrap_socket(sock, server_hostname=server_hostname, **kwargs)
+        self._session_cache.record(server_hostname, ssl_sock)
+        return ssl_sock
+
+    def __getattr__(self, name):
+        return getattr(self._context, name)
+
+    def __setattr__(self, name, value):
+        if getattr(self._context, name) == value:
+            return
+        if self._context is self._shared_context:
+            trusted = b''.join(self._context.get_ca_certs(binary_form=True))
+            private = _new_ssl_context(cadata=trusted) if trusted else _new_ssl_context()
+            object.__setattr__(self, '_context', private)
+        setattr(self._context, name, value)
@@ -0,0 +1,93 @@
+import collections
+import copy
+import hashlib
+import json
+import threading
+import time
+
+from duo_universal.fork import reset_in_forked_child
+
+# Suggested seconds to replay a verified token exchange result for a duplicate callback
+DEFAULT_TOKEN_EXCHANGE_CACHE_TTL = 30
+# Token exchange results kept before the oldest is dropped
+DEFAULT_TOKEN_EXCHANGE_CACHE_SIZE = 1024
+
+
+def token_exchange_key(duo_code, username, nonce):
+    """
+    Returns the cache and single-flight key for one token exchange
+
+    Only a digest is kept, so the cache never holds a usable duo_code.
+    """
+    return hashlib.sha256(json.dumps([duo_code, username, nonce]).encode('utf-8')).digest()
+
+
+class TokenExchangeCache:
+    """
+    Bounded in-memory cache of verified id_tokens, keyed by token_exchange_key.
+
+    Browsers and load balancers sometimes deliver the same Duo callback
+    twice; the second exchange of a duo_code always fails upstream, so the
+    first result is replayed instead. Entries expire after `ttl` seconds or
+    when the id_token itself expires, whichever comes first, and the oldest
+    entry is dropped once `max_entries` are held. Only successful exchanges
+    are cached.
+
+    Replaying a result lets the same callback log in more than once, so
+    Client only uses a cache when token_exchange_cache_ttl is set.
+    """
+
+    def __init__(self, ttl=DEFAULT_TOKEN_EXCHANGE_CACHE_TTL, max_entries=DEFAULT_TOKEN_EXCHANGE_CACHE_SIZE):
+        """
+        Arguments:
+
+        ttl             -- Seconds a result is replayed
+        max_entries     -- Results kept before the oldest is dropped
+        """
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        reset_in_forked_child(self)
+
+    def _after_fork_in_child(self):
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns a copy of the cached token for `key`, or None
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, token = entry
+            if now >= expires_at:
+                del self._entries[key]
+                return None
+        return copy.deepcopy(token)
+
+    def put(self, key, token):
+        """
+        Caches a verified id_token for `key`
+        """
+        ttl = self._ttl
+        exp = token.get('exp')
+        if isinstance(exp, (int, float)):
+            ttl = min(ttl, exp - time.time())
+        if ttl <= 0:
+            return
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (expires_at, copy.deepcopy(token))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,135 @@
+from duo_universal.version import __version__
+
+try:
+    from opentelemetry import propagate
+    from opentelemetry import trace as otel_trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # pragma: no cover - exercised only without the tracing extra
+    otel_trace = None
+
+SPAN_KIND_CLIENT = 'client'
+SPAN_KIND_INTERNAL = 'internal'
+# Child spans of each round trip to Duo
+SPAN_SIGN = 'duo sign client assertion'
+SPAN_VERIFY = 'duo verify id_token'
+
+ERR_OPENTELEMETRY_MISSING = ('OpenTelemetryTracer requires opentelemetry-api. '
+                             'Install it with `pip install duo_universal[tracing]`.')
+
+
+class NoOpSpan:
+    """
+    Span that records nothing.
+
+    Spans returned by a tracer's start_span() provide these methods and are
+    context managers that end the span, marking it failed if an exception
+    escapes.
+    """
+    __slots__ = ()
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_error(self, error_type, exception=None):
+        """
+        Marks the span failed with a low-cardinality `error_type`
+        """
+        pass
+
+    def inject(self, headers):
+        """
+        Adds the trace context headers for this span to `headers` and returns it
+        """
+        return headers
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+NOOP_SPAN = NoOpSpan()
+
+
+class NoOpTracer:
+    """
+    Default tracer of Client: every span is NOOP_SPAN.
+
+    A tracer provides start_span(name, kind, attributes, parent), where
+    `parent` is a span from the same tracer, or None to continue the trace
+    active in the caller's context.
+    """
+    __slots__ = ()
+
+    def start_span(self, name, kind=SPAN_KIND_INTERNAL, attributes=None, parent=None):
+        return NOOP_SPAN
+
+
+NOOP_TRACER = NoOpTracer()
+
+
+class _OpenTelemetrySpan:
+    __slots__ = ('_span', '_failed')
+
+    def __init__(self, span):
+        self._span = span
+        self._failed = False
+
+    def set_attribute(self, key, value):
+        self._span.set_attribute(key, value)
+
+    def set_error(self, error_type, exception=None):
+        self._failed = True
+        self._span.set_attribute('error.type', error_type)
+        if exception is not None:
+            self._span.record_exception(exception)
+        self._span.set_status(Status(StatusCode.ERROR, error_type))
+
+    def inject(self, headers):
+        propagate.inject(headers, context=otel_trace.set_span_in_context(self._span))
+        return headers
+
+    def end(self):
+        self._span.end()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_value is not None and not self._failed:
+            self.set_error(exc_type.__qualname__, exc_value)
+        self.end()
+
+
+class OpenTelemetryTracer:
+    """
+    Tracer recording spans with the OpenTelemetry API.
+
+    Spans without an explicit parent join the span active in the caller's
+    OpenTelemetry context, so Duo round trips appear inside the
+    application's own traces, and the configured propagator (W3C trace
+    context by default) writes the outbound headers.
+    """
+
+    def __init__(self, tracer_provider=None):
+        """
+        Arguments:
+
+        tracer_provider -- (Optional) OpenTelemetry TracerProvider. None uses
+                           the globally configured provider.
+        """
+        if otel_trace is None:
+            raise ImportError(ERR_OPENTELEMETRY_MISSING)
+        self._tracer = otel_trace.get_tracer('duo_universal', __version__, tracer_provider=tracer_provider)
+
+    def start_span(self, name, kind=SPAN_KIND_INTERNAL, attributes=None, parent=None):
+        context = None
+        if parent is not None:
+            context = otel_trace.set_span_in_context(parent._span)
+        span_kind = SpanKind.CLIENT if kind == SPAN_KIND_CLIENT else SpanKind.INTERNAL
+        return _OpenTelemetrySpan(self._tracer.start_span(name, context=context, kind=span_kind,
+                                                          attributes=attributes))
@@ -7,10 +7,15 @@ import traceback
 from flask import Flask, request, redirect, session, render_template
 
 from duo_universal.client import Client, DuoException
+from duo_universal.metrics import ClientStats, prometheus_text
+from duo_universal.state_store import InMemoryStateStore
 
 
 app = Flask(__name__)
 app.secret_key = os.urandom(32)
+# Single-process demo; multi-node deployments would use a RemoteStateStore
+state_store = InMemoryStateStore()
+client_stats = ClientStats()
 
 
 @app.route("/", methods=['GET'])
@@ -18,6 +23,11 @@ def login():
     return render_template("login.html", message="This is a demo")
 
 
+# Only routed when expose_metrics is set in duo.conf
+def metrics():
+    return prometheus_text(client_stats), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+
 @app.route("/", methods=['POST'])
 def login_post():
     """
@@ -47,8 +57,9 @@ def login_post():
 
     # Generate random string to act as a state for the exchange
     state = duo_client.generate_state()
+    # The session ties the state to this browser; the store makes it single use
     session['state'] = state
-    session['username'] = username
+    state_store.put(state, {'username': username})
     prompt_uri = duo_client.create_auth_url(username, state)
 
     # Redirect to prompt URI which will redirect to the client's redirect URI
@@ -65,20 +76,21 @@ def duo_callback():
     # Get authorization token to trade for 2FA
     code = request.args.get('duo_code')
 
-    if 'state' in session and 'username' in session:
-        saved_state = session['state']
-        username = session['username']
-    else:
-        # For flask, if url used to get to login.html is not localhost,
-        # (ex: 127.0.0.1) then the sessions will be different
-        # and the localhost session does not have the state
+    # Ensure the state was issued to this browser.
+    # For flask, if url used to get to login.html is not localhost,
+    # (ex: 127.0.0.1) then the sessions will be different
+    # and the localhost session does not have the state
+    saved_state = session.pop('state', None)
+    if saved_state is None or state != saved_state:
         return render_template("login.html",
-                               message="No saved state please login again")
+                               message="Duo state does not match saved state, please login again")
 
-    # Ensure nonce matches from initial request
-    if state != saved_state:
+    # Redeem the saved state; reused or expired states are rejected
+    saved = state_store.take(state)
+    if saved is None:
         return render_template("login.html",
-                               message="Duo state does not match saved state")
+                               message="Duo state does not match saved state, please login again")
+    username = saved['username']
 
     decoded_token = duo_client.exchange_authorization_code_for_2fa_result(code, username)
 
@@ -115,6 +127,8 @@ try:
         redirect_uri=config[config_section]['redirect_uri'],
         duo_certs=config[config_section].get('duo_certs', None),
         http_proxy=config[config_section].get('http_proxy', None),
+        health_check_ttl=config[config_section].getfloat('health_check_ttl', None),
+        collect_stats=client_stats,
     )
 except DuoException as e:
     print("*** Duo config error. Verify the values in duo.conf are correct ***")
@@ -122,6 +136,10 @@ except DuoException as e:
 
 duo_failmode = config[config_section]['failmode']
 
+# /metrics is unauthenticated, so it stays off unless explicitly enabled
+if config[config_section].getboolean('expose_metrics', False):
+    app.add_url_rule("/metrics", view_func=metrics, methods=['GET'])
+
 
 if __name__ == '__main__':
     app.run(host="localhost", port=8080)
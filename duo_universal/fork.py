@@ -0,0 +1,26 @@
+import os
+import weakref
+
+_registered = weakref.WeakSet()
+
+
+def reset_in_forked_child(obj):
+    """
+    Registers `obj` so its _after_fork_in_child() runs in every forked child
+
+    Pre-fork servers (gunicorn, uWSGI) often build clients before forking
+    their workers. A child inherits the parent's sockets, locks that another
+    thread may have held, and none of its threads, so each registered
+    object drops or rebuilds that state in the child. Objects are held by
+    weak reference and need no unregistering.
+    """
+    _registered.add(obj)
+
+
+def _after_fork_in_child():
+    for obj in list(_registered):
+        obj._after_fork_in_child()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,161 @@
+import collections
+import threading
+
+from duo_universal.async_client import AsyncClient
+from duo_universal.client import (
+    Client,
+    DEFAULT_POOL_CONNECTIONS,
+    DEFAULT_POOL_IDLE_TIMEOUT,
+    DEFAULT_POOL_MAXSIZE,
+    DuoException,
+)
+from duo_universal.fork import reset_in_forked_child
+from duo_universal.metrics import ClientStats
+from duo_universal.session_pool import SessionPool
+from duo_universal.singleflight import SingleFlight
+
+# Clients kept by a ClientRegistry before the least recently used is dropped
+DEFAULT_MAX_CLIENTS = 10000
+
+ERR_UNKNOWN_TENANT = 'No Duo application is configured for this tenant.'
+ERR_MAX_CLIENTS = 'A client registry must hold at least one client.'
+ERR_ASYNC_CLIENT_CLASS = 'ClientRegistry shares requests connection pools, which AsyncClient does not use.'
+
+
+class ClientRegistry:
+    """
+    Builds a Client per tenant on first use and keeps the most recently used
+    ones, for processes serving many Duo applications.
+
+    Clients for the same API host and CA settings share one SessionPool,
+    so a few connection pools serve every tenant and each cached client
+    only holds its own credentials and signing key. Concurrent first
+    requests for a tenant build a single client.
+
+    The shared pools are requests sessions, so the registry builds Client
+    or its subclasses but not AsyncClient, whose httpx connections could
+    not be shared.
+    """
+
+    def __init__(self, loader, max_clients=DEFAULT_MAX_CLIENTS, client_class=Client,
+                 pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 pool_block=False, pool_idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT,
+                 tls_session_resumption=True, collect_stats=False):
+        """
+        Arguments:
+
+        loader                  -- Callable taking a tenant key and returning the keyword
+                                   arguments for its Client (client_id, client_secret, host,
+                                   redirect_uri, ...), or None for an unknown tenant
+        max_clients             -- (Optional) Number of clients kept before the least
+                                   recently used is closed and dropped
+        client_class            -- (Optional) Client class to build; AsyncClient is rejected
+        pool_connections, pool_maxsize, pool_block, pool_idle_timeout, tls_session_resumption
+                                -- (Optional) Settings of the shared per-host session
+                                   pools; see Client.__init__
+        collect_stats           -- (Optional) Whether the clients record their calls in
+                                   one shared ClientStats, available as `stats`
+        """
+        if max_clients < 1:
+            raise DuoException(ERR_MAX_CLIENTS)
+        if issubclass(client_class, AsyncClient):
+            raise DuoException(ERR_ASYNC_CLIENT_CLASS)
+        self._loader = loader
+        self._max_clients = max_clients
+        self._client_class = client_class
+        self._pool_settings = {
+            'pool_connections': pool_connections,
+            'pool_maxsize': pool_maxsize,
+            'pool_block': pool_block,
+            'pool_idle_timeout': pool_idle_timeout,
+            'tls_session_resumption': tls_session_resumption,
+        }
+        self._lock = threading.Lock()
+        self._clients = collections.OrderedDict()
+        self._session_pools = {}
+        self._builds = SingleFlight()
+        self.stats = ClientStats() if collect_stats else None
+        reset_in_forked_child(self)
+
+    def _after_fork_in_child(self):
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._clients)
+
+    def __contains__(self, key):
+        return key in self._clients
+
+    def get(self, key):
+        """
+        Returns the client for tenant `key`, building it on first use
+
+        Raises:
+
+        DuoException if the loader knows no such tenant or its settings are invalid
+        """
+        with self._lock:
+            duo_client = self._clients.get(key)
+            if duo_client is not None:
+                self._clients.move_to_end(key)
+                return duo_client
+        return self._builds.do(key, lambda: self._build(key))
+
+    def _build(self, key):
+        kwargs = self._loader(key)
+        if kwargs is None:
+            raise DuoException(ERR_UNKNOWN_TENANT)
+        duo_certs = Client._resolve_duo_certs(kwargs.get('duo_certs'),
+                                              kwargs.get('disable_ca_pinning', False))
+        if self.stats is not None:
+            kwargs = dict(kwargs, collect_stats=self.stats)
+        duo_client = self._client_class(session_pool=self.session_pool(kwargs['host'], duo_certs),
+                                        **kwargs)
+        with self._lock:
+            self._clients[key] = duo_client
+            evicted = []
+            while len(self._clients) > self._max_clients:
+                evicted.append(self._clients.popitem(last=False)[1])
+        for old_client in evicted:
+            old_client.close()
+        return duo_client
+
+    def session_pool(self, host, duo_certs):
+        """
+        Returns the SessionPool shared by clients for `host` with the given CA settings
+        """
+        pool_key = (host.lower(), duo_certs)
+        with self._lock:
+            pool = self._session_pools.get(pool_key)
+            if pool is None:
+                pool = self._session_pools[pool_key] = SessionPool(duo_certs, **self._pool_settings)
+            return pool
+
+    def evict(self, key):
+        """
+        Drops and closes the client for `key`, e.g. after its secret is rotated
+        """
+        with self._lock:
+            duo_client = self._clients.pop(key, None)
+        if duo_client is not None:
+            duo_client.close()
+
+    def close(self):
+        """
+        Closes every cached client and shared connection pool
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+            pools = list(self._session_pools.values())
+            self._clients.clear()
+            self._session_pools.clear()
+        for duo_client in clients:
+            duo_client.close()
+        for pool in pools:
+            pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,139 @@
+import threading
+import time
+
+import requests
+
+from duo_universal.fork import reset_in_forked_child
+from duo_universal.tls import (
+    SessionResumingSSLContext,
+    SSLContextAdapter,
+    TLSSessionCache,
+    get_async_ssl_context,
+    get_ssl_context,
+)
+
+
+class SessionPool:
+    """
+    Lazily created requests.Session holding pooled connections to Duo.
+
+    Each Client builds its own pool unless one is passed in. Clients for the
+    same API host and CA settings may share a pool, so they reuse the same
+    connections and resumable TLS sessions; the owner of a shared pool
+    closes it. A forked child drops the connections inherited from its
+    parent and opens its own.
+    """
+
+    def __init__(self, duo_certs, pool_connections, pool_maxsize, pool_block=False,
+                 pool_idle_timeout=None, tls_session_resumption=True):
+        """
+        Arguments:
+
+        duo_certs               -- CA bundle path, True for the default bundle, or
+                                   False to skip certificate verification
+        pool_connections        -- Number of per-host connection pools kept by the session
+        pool_maxsize            -- Maximum number of connections kept alive per host
+        pool_block              -- Whether requests wait for a free connection when the pool is full
+        pool_idle_timeout       -- Seconds the session may sit unused before its idle
+                                   connections are dropped. None keeps them.
+        tls_session_resumption  -- Whether new connections resume cached TLS sessions
+        """
+        self.duo_certs = duo_certs
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.pool_idle_timeout = pool_idle_timeout
+        self.tls_sessions = TLSSessionCache() if tls_session_resumption else None
+        self._session = None
+        self._lock = threading.Lock()
+        self._last_used = time.monotonic()
+        self._in_flight = 0
+        reset_in_forked_child(self)
+
+    def _after_fork_in_child(self):
+        # The inherited sockets are shared with the parent and must not be
+        # used or shut down here; dropping them only closes this process's
+        # descriptors.
+        self._lock = threading.Lock()
+        self._session = None
+        self._in_flight = 0
+        self._last_used = time.monotonic()
+        if self.tls_sessions is not None:
+            self.tls_sessions._after_fork_in_child()
+
+    def shared_ssl_context(self):
+        """
+        Returns the process-wide SSLContext for the pool's CA settings,
+        or None when certificate verification is disabled
+        """
+        return self._resolve_ssl_context(get_ssl_context)
+
+    def shared_async_ssl_context(self):
+        """
+        Returns the process-wide SSLContext httpx clients use for the pool's
+        CA settings, or None when certificate verification is disabled
+        """
+        return self._resolve_ssl_context(get_async_ssl_context)
+
+    def _resolve_ssl_context(self, factory):
+        if self.duo_certs is False:
+            return None
+        if self.duo_certs is True:
+            return factory()
+        return factory(self.duo_certs)
+
+    def build_session(self):
+        """
+        Creates the requests session holding the connection pool
+        """
+        session = requests.Session()
+        ssl_context = self.shared_ssl_context()
+        if ssl_context is not None and self.tls_sessions is not None:
+            ssl_context = SessionResumingSSLContext(ssl_context, self.tls_sessions)
+        adapter = SSLContextAdapter(ssl_context=ssl_context,
+                                    pool_connections=self.pool_connections,
+                                    pool_maxsize=self.pool_maxsize,
+                                    pool_block=self.pool_block)
+        session.mount('https://', adapter)
+        return session
+
+    def checkout(self):
+        """
+        Returns the session for an outbound request, creating it on first use
+        and dropping connections that have sat idle too long
+        """
+        with self._lock:
+            if self._session is None:
+                self._session = self.build_session()
+            elif self._in_flight == 0 and self._idle_expired():
+                # Clearing the adapters closes every idle connection; the
+                # session itself stays usable and reconnects on demand.
+                self._session.close()
+            self._in_flight += 1
+            return self._session
+
+    def _idle_expired(self):
+        if self.pool_idle_timeout is None:
+            return False
+        return time.monotonic() - self._last_used > self.pool_idle_timeout
+
+    def checkin(self):
+        """
+        Marks a request made with a checked out session as finished
+        """
+        with self._lock:
+            self._in_flight -= 1
+            self._last_used = time.monotonic()
+
+    def capture_tls_sessions(self):
+        if self.tls_sessions is not None:
+            self.tls_sessions.capture()
+
+    def close(self):
+        """
+        Closes the pooled connections; a later checkout opens new ones
+        """
+        with self._lock:
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+from functools import partial
+
+from duo_universal.fork import reset_in_forked_child
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls: while a call for a key is in flight, other
+    threads asking for the same key wait for it and receive its result or
+    exception instead of starting their own. The call runs in the thread
+    that started it, so it should keep to that caller's own deadline; a
+    waiter's timeout only limits how long the waiter waits for it, and a
+    waiter may run the call again itself when it failed only because the
+    caller that started it ran out of time. Calls in flight when the process forks are forgotten in the child.
+    """
+    # One per client, and a ClientRegistry may hold many clients
+    __slots__ = ('_lock', '_calls', '__weakref__')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        reset_in_forked_child(self)
+
+    def _after_fork_in_child(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, timeout=None, takeover=None):
+        """
+        Runs `func` unless a call for `key` is already in flight, then
+        returns (or raises) that call's outcome
+
+        Arguments:
+
+        key             -- Hashable identifying equivalent calls
+        func            -- Callable taking no arguments, run in this thread
+                           when no call for `key` is in flight
+        timeout         -- (Optional) Seconds this caller waits for a call
+                           already in flight before raising TimeoutError
+        takeover        -- (Optional) Predicate on the exception raised by a
+                           call this caller waited for. When it returns True
+                           the caller runs `func` itself (or joins another
+                           waiter that did) instead of raising it.
+        """
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+
+            if leader:
+                return self._run(key, call, func)
+            remaining = None if expires_at is None else max(expires_at - time.monotonic(), 0)
+            if not call.done.wait(remaining):
+                raise TimeoutError(key)
+            if call.error is None:
+                return call.result
+            if takeover is None or not takeover(call.error):
+                # Raise a fresh instance so concurrent callers never share a traceback
+                raise type(call.error)(*call.error.args) from call.error
+
+    def _run(self, key, call, func):
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of SingleFlight for coroutine functions.
+
+    The shared call runs as a task, so a caller that is cancelled or a
+    waiter that times out does not cancel it for the others. As with
+    SingleFlight, `timeout` only bounds callers joining a call in flight.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        reset_in_forked_child(self)
+
+    def _after_fork_in_child(self):
+        # The tasks belong to the parent's event loop
+        self._tasks = {}
+
+    async def do(self, key, func, timeout=None, takeover=None):
+        """
+        Awaits `func()` unless a call for `key` is already in flight, then
+        returns (or raises) that call's outcome
+
+        Arguments:
+
+        key             -- Hashable identifying equivalent calls
+        func            -- Coroutine function taking no arguments
+        timeout         -- (Optional) Seconds to wait for a call already in
+                           flight before raising asyncio.TimeoutError
+        takeover        -- (Optional) Predicate as in SingleFlight.do
+        """
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        while True:
+            task = self._tasks.get(key)
+            leader = task is None or task.done()
+            remaining = None
+            if leader:
+                task = asyncio.ensure_future(func())
+                self._tasks[key] = task
+                task.add_done_callback(partial(self._forget, key))
+            elif expires_at is not None:
+                # `func` keeps to the leader's own deadline, so only waiters are bounded here
+                remaining = max(expires_at - time.monotonic(), 0)
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), remaining)
+            except Exception as e:
+                if not (task.done() and not task.cancelled() and task.exception() is e):
+                    raise
+                if leader or takeover is None or not takeover(e):
+                    # Raise a fresh instance so concurrent callers never share a traceback
+                    raise type(e)(*e.args) from e
+
+    def _forget(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter gave up
+            task.exception()
@@ -54,5 +54,9 @@ setup(
         'License :: OSI Approved :: BSD License'
     ],
     install_requires=install_requires,
+    extras_require={
+        'async': ['httpx>=0.26.0'],
+        'tracing': ['opentelemetry-api>=1.0'],
+    },
     tests_require=tests_require
 )
@@ -0,0 +1,155 @@
+from duo_universal import client
+from duo_universal.assertion_pool import ClientAssertionPool
+from mock import MagicMock, patch
+import itertools
+import jwt
+import time
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+DUO_CODE = "deadbeefdeadbeefdeadbeefdeadbeef"
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met")
+        time.sleep(0.005)
+
+
+class TestClientAssertionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.counter = itertools.count()
+        self.lifetime = 300
+
+    def mint(self):
+        return "assertion-{}".format(next(self.counter)), time.time() + self.lifetime
+
+    def test_first_take_starts_refiller(self):
+        """
+        Test that the pool is empty until used, then fills in the background
+        """
+        pool = ClientAssertionPool(self.mint, size=3)
+        self.addCleanup(pool.stop)
+        self.assertIsNone(pool.take())
+        wait_for(lambda: len(pool) == 3)
+        self.assertEqual(pool.take(), "assertion-0")
+        wait_for(lambda: len(pool) == 3)
+
+    def test_assertions_handed_out_once(self):
+        """
+        Test that no assertion is returned twice
+        """
+        pool = ClientAssertionPool(self.mint, size=2)
+        self.addCleanup(pool.stop)
+        pool.refill()
+        taken = [pool.take() for _ in range(2)]
+        self.assertEqual(taken, ["assertion-0", "assertion-1"])
+        wait_for(lambda: len(pool) == 2)
+        self.assertNotIn(pool.take(), taken)
+
+    def test_expiring_assertions_evicted(self):
+        """
+        Test that assertions close to expiry are dropped instead of returned
+        """
+        pool = ClientAssertionPool(self.mint, size=2, min_remaining=60)
+        self.addCleanup(pool.stop)
+        pool.refill()
+        with patch('time.time', MagicMock(return_value=time.time() + 250)):
+            self.assertIsNone(pool.take())
+
+    def test_short_lifetime_never_pooled(self):
+        """
+        Test that assertions that would already be expiring are not kept
+        """
+        self.lifetime = 30
+        pool = ClientAssertionPool(self.mint, size=2, min_remaining=60)
+        self.assertFalse(pool.refill())
+        self.assertEqual(len(pool), 0)
+
+    def test_stop_clears_and_restarts(self):
+        """
+        Test that stop drops unused assertions and the pool can be reused
+        """
+        pool = ClientAssertionPool(self.mint, size=2)
+        self.addCleanup(pool.stop)
+        pool.take()
+        wait_for(lambda: len(pool) == 2)
+        pool.stop()
+        self.assertEqual(len(pool), 0)
+        self.assertIsNone(pool._thread)
+        pool.take()
+        wait_for(lambda: len(pool) == 2)
+
+    def test_mint_failure_does_not_spin(self):
+        """
+        Test that a failing mint leaves the pool empty without stopping take()
+        """
+        mint = MagicMock(side_effect=ValueError("broken"))
+        pool = ClientAssertionPool(mint, size=2)
+        self.addCleanup(pool.stop)
+        self.assertIsNone(pool.take())
+        wait_for(lambda: mint.call_count == 1)
+        time.sleep(0.05)
+        self.assertEqual(mint.call_count, 1)
+
+
+class TestClientAssertionPooling(unittest.TestCase):
+
+    def test_disabled_by_default(self):
+        """
+        Test that clients mint assertions inline unless a pool size is given
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        self.assertEqual(duo_client._assertion_pools, {})
+
+    def test_token_request_uses_pool(self):
+        """
+        Test that token requests take valid, unique assertions from the pool
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI, assertion_pool_size=2)
+        self.addCleanup(duo_client.close)
+        token_endpoint = client.OAUTH_V1_TOKEN_ENDPOINT.format(HOST)
+        pool = duo_client._assertion_pools[token_endpoint]
+        pool.refill()
+        pooled = pool._entries[0][0]
+        _, all_args = duo_client._build_token_request(DUO_CODE)
+        self.assertEqual(all_args['client_assertion'], pooled)
+
+        jtis = set()
+        for _ in range(5):
+            _, all_args = duo_client._build_token_request(DUO_CODE)
+            claims = jwt.decode(all_args['client_assertion'], CLIENT_SECRET, algorithms=['HS512'],
+                                audience=token_endpoint)
+            jtis.add(claims['jti'])
+        self.assertEqual(len(jtis), 5)
+
+    def test_close_stops_refillers(self):
+        """
+        Test that close stops the refiller threads
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI, assertion_pool_size=2)
+        duo_client._build_health_check_request()
+        pool = duo_client._assertion_pools[client.OAUTH_V1_HEALTH_CHECK_ENDPOINT.format(HOST)]
+        thread = pool._thread
+        duo_client.close()
+        self.assertFalse(thread.is_alive())
+
+    def test_invalid_config(self):
+        """
+        Test that negative sizes and too short expiries are rejected
+        """
+        with self.assertRaises(client.DuoException):
+            client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI, assertion_pool_size=-1)
+        with self.assertRaises(client.DuoException):
+            client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI, exp_seconds=30,
+                          assertion_pool_size=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+from duo_universal import client
+from duo_universal.async_client import AsyncClient
+import asyncio
+import httpx
+import jwt
+import time
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+DUO_CODE = "deadbeefdeadbeefdeadbeefdeadbeef"
+USERNAME = "username"
+WRONG_USERNAME = "wrong_username"
+NONCE = "abcdefghijklmnopqrstuvwxyzabcdef"
+
+SUCCESS_CHECK = {
+    'response': {'timestamp': 1573068322},
+    'stat': 'OK'
+}
+ERROR_WRONG_DUO_CODE = {
+    'error': 'invalid_grant',
+    'error_description': 'The provided authorization grant is invalid.'
+}
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestAsyncClient(unittest.TestCase):
+
+    def setUp(self):
+        self.client = AsyncClient(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        self.requests = []
+        self.id_token_claims = {
+            "aud": CLIENT_ID,
+            "exp": time.time() + client.FIVE_MINUTES_IN_SECONDS,
+            "iat": time.time(),
+            "iss": client.OAUTH_V1_TOKEN_ENDPOINT.format(HOST),
+            "preferred_username": USERNAME,
+            "nonce": NONCE,
+        }
+
+    def _use_transport(self, handler):
+        def recording_handler(request):
+            self.requests.append(request)
+            return handler(request)
+
+        self.client._build_async_session = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(recording_handler))
+
+    def _id_token_response(self, request):
+        id_token = jwt.encode(self.id_token_claims, CLIENT_SECRET, algorithm='HS512')
+        return httpx.Response(200, json={'id_token': id_token})
+
+    def test_health_check_success(self):
+        """
+        Test that an awaited health check returns Duo's response
+        """
+        self._use_transport(lambda request: httpx.Response(200, json=SUCCESS_CHECK))
+        result = run(self.client.health_check())
+        self.assertEqual(result, SUCCESS_CHECK)
+        self.assertEqual(self.requests[0].url.path, "/oauth/v1/health_check")
+
+    def test_health_check_failure(self):
+        """
+        Test that a failed health check raises DuoException
+        """
+        self._use_transport(lambda request: httpx.Response(200, json={'stat': 'FAIL'}))
+        with self.assertRaises(client.DuoException):
+            run(self.client.health_check())
+
+    def test_health_check_connection_error(self):
+        """
+        Test that transport errors surface as DuoException
+        """
+        def handler(request):
+            raise httpx.ConnectError("Failed to establish a new connection")
+
+        self._use_transport(handler)
+        with self.assertRaises(client.DuoException):
+            run(self.client.health_check())
+
+    def test_exchange_success(self):
+        """
+        Test that an awaited exchange returns the verified id_token
+        """
+        self._use_transport(self._id_token_response)
+        result = run(self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, NONCE))
+        self.assertEqual(result['preferred_username'], USERNAME)
+        self.assertEqual(self.requests[0].url.params['code'], DUO_CODE)
+        self.assertIn('duo_universal_python/', self.requests[0].headers['user-agent'])
+
+    def test_exchange_no_duo_code(self):
+        """
+        Test that a missing duo_code is rejected before any request
+        """
+        with self.assertRaises(client.DuoException):
+            run(self.client.exchange_authorization_code_for_2fa_result(None, USERNAME))
+        self.assertEqual(self.requests, [])
+
+    def test_exchange_wrong_username(self):
+        """
+        Test that the id_token username is checked
+        """
+        self._use_transport(self._id_token_response)
+        with self.assertRaises(client.DuoException):
+            run(self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, WRONG_USERNAME))
+
+    def test_exchange_error_response(self):
+        """
+        Test that a non-200 token response raises DuoException
+        """
+        self._use_transport(lambda request: httpx.Response(400, json=ERROR_WRONG_DUO_CODE))
+        with self.assertRaises(client.DuoException):
+            run(self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME))
+
+    def test_session_reused_and_closed(self):
+        """
+        Test that calls share one pooled session and aclose releases it
+        """
+        self._use_transport(lambda request: httpx.Response(200, json=SUCCESS_CHECK))
+
+        async def check_twice():
+            async with self.client:
+                await self.client.health_check()
+                session = self.client._async_session
+                await self.client.health_check()
+                self.assertIs(session, self.client._async_session)
+            self.assertIsNone(self.client._async_session)
+
+        run(check_twice())
+        self.assertEqual(len(self.requests), 2)
+
+    def test_sync_close_rejected(self):
+        """
+        Test that the sync close() and with statement point callers to aclose()
+        """
+        with self.assertRaises(client.DuoException):
+            self.client.close()
+        with self.assertRaises(client.DuoException):
+            with self.client:
+                pass
+
+    def test_shares_client_validation(self):
+        """
+        Test that AsyncClient validates its configuration like Client
+        """
+        with self.assertRaises(client.DuoException):
+            AsyncClient(CLIENT_ID, CLIENT_SECRET[:-1], HOST, REDIRECT_URI)
+
+
+if __name__ == '__main__':
+    unittest.main()
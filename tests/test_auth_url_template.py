@@ -0,0 +1,84 @@
+from urllib.parse import urlencode
+from duo_universal import client
+from mock import MagicMock, patch
+import jwt
+import unittest
+import warnings
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com/duo-callback?next=/home&lang=fr"
+STATE = "deadbeefdeadbeefdeadbeefdeadbeefdead"
+NONCE = "nonce+with/special=chars&more"
+
+
+def legacy_auth_url(duo_client, username, state, nonce, exp):
+    """
+    create_auth_url as it was written before the template
+    """
+    jwt_args = {
+        'scope': 'openid',
+        'redirect_uri': duo_client._redirect_uri,
+        'client_id': duo_client._client_id,
+        'iss': duo_client._client_id,
+        'aud': client.API_HOST_URI_FORMAT.format(duo_client._api_host),
+        'exp': exp,
+        'state': state,
+        'response_type': 'code',
+        'duo_uname': username,
+        'use_duo_code_attribute': duo_client._use_duo_code_attribute,
+    }
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        request_jwt = jwt.encode(jwt_args, CLIENT_SECRET, algorithm='HS512')
+    all_args = {
+        'response_type': 'code',
+        'client_id': duo_client._client_id,
+        'request': request_jwt,
+    }
+    if nonce:
+        all_args['nonce'] = nonce
+    return "{}?{}".format(client.OAUTH_V1_AUTHORIZE_ENDPOINT.format(duo_client._api_host),
+                          urlencode(all_args))
+
+
+class TestAuthUrlTemplate(unittest.TestCase):
+
+    @patch('time.time', MagicMock(return_value=1573068322.123456))
+    def test_matches_legacy_implementation(self):
+        """
+        Test that templated URLs are identical to fully serialized ones
+        """
+        exp = 1573068322.123456 + client.FIVE_MINUTES_IN_SECONDS
+        for use_duo_code_attribute in (True, False):
+            duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                       use_duo_code_attribute=use_duo_code_attribute)
+            for username in ("user1", "ünïcödé 用户", 'quote"back\\slash'):
+                for nonce in (None, NONCE):
+                    with self.subTest(use_duo_code_attribute=use_duo_code_attribute,
+                                      username=username, nonce=nonce):
+                        self.assertEqual(duo_client.create_auth_url(username, STATE, nonce),
+                                         legacy_auth_url(duo_client, username, STATE, nonce, exp))
+
+    def test_request_jwt_claims(self):
+        """
+        Test that the request JWT carries the per-user claims
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        template = duo_client._auth_url_template
+        url = template.render("user1", STATE, 302, nonce=NONCE)
+        request_jwt = url.split('&request=')[1].split('&')[0]
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            claims = jwt.decode(request_jwt, CLIENT_SECRET, algorithms=['HS512'],
+                                audience=client.API_HOST_URI_FORMAT.format(HOST),
+                                options={'verify_exp': False})
+        self.assertEqual(claims['duo_uname'], "user1")
+        self.assertEqual(claims['state'], STATE)
+        self.assertEqual(claims['exp'], 302)
+        self.assertEqual(claims['redirect_uri'], REDIRECT_URI)
+
+
+if __name__ == '__main__':
+    unittest.main()
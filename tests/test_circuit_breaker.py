@@ -0,0 +1,193 @@
+from mock import MagicMock, patch
+from duo_universal import client
+from duo_universal.async_client import AsyncClient
+import asyncio
+import httpx
+import requests
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+DUO_CODE = "deadbeefdeadbeefdeadbeefdeadbeef"
+USERNAME = "username"
+SUCCESS_CONTENT = b'{"stat": "OK", "response": {"timestamp": 1}}'
+ERROR_NETWORK_CONNECTION_FAILED = "Failed to establish a new connection"
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = 1000.0
+        patcher = patch('time.monotonic', side_effect=lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = client.CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    def _fail(self, times):
+        for _ in range(times):
+            self.breaker.before_call()
+            self.breaker.record_failure()
+
+    def test_opens_after_threshold(self):
+        """
+        Test that consecutive failures open the circuit
+        """
+        self._fail(1)
+        self.assertEqual(self.breaker.state, client.CircuitBreaker.CLOSED)
+        self._fail(1)
+        self.assertEqual(self.breaker.state, client.CircuitBreaker.OPEN)
+        with self.assertRaises(client.DuoCircuitOpenException):
+            self.breaker.before_call()
+
+    def test_success_resets_failures(self):
+        """
+        Test that a success between failures keeps the circuit closed
+        """
+        self._fail(1)
+        self.breaker.record_success()
+        self._fail(1)
+        self.assertEqual(self.breaker.state, client.CircuitBreaker.CLOSED)
+
+    def test_half_open_trial_closes(self):
+        """
+        Test that a successful trial after the cool-down closes the circuit
+        """
+        self._fail(2)
+        self.clock += 10
+        self.assertEqual(self.breaker.state, client.CircuitBreaker.HALF_OPEN)
+        self.breaker.before_call()
+        with self.assertRaises(client.DuoCircuitOpenException):
+            self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, client.CircuitBreaker.CLOSED)
+
+    def test_half_open_failure_reopens(self):
+        """
+        Test that a failed trial opens the circuit for another cool-down
+        """
+        self._fail(2)
+        self.clock += 10
+        self._fail(1)
+        self.assertEqual(self.breaker.state, client.CircuitBreaker.OPEN)
+        self.clock += 9
+        self.assertEqual(self.breaker.state, client.CircuitBreaker.OPEN)
+
+    def test_server_errors_count_as_failures(self):
+        """
+        Test that 5xx responses fail and 4xx responses succeed
+        """
+        self.breaker.record_response(MagicMock(status_code=400))
+        self.breaker.record_response(MagicMock(status_code=502))
+        self.breaker.record_response(MagicMock(status_code=503))
+        self.assertEqual(self.breaker.state, client.CircuitBreaker.OPEN)
+
+    def test_abandoned_call_frees_trial(self):
+        """
+        Test that an abandoned trial neither counts nor keeps its slot
+        """
+        self._fail(2)
+        self.clock += 10
+        self.breaker.before_call()
+        self.breaker.record_abandoned()
+        self.assertEqual(self.breaker.state, client.CircuitBreaker.HALF_OPEN)
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, client.CircuitBreaker.CLOSED)
+
+    def test_invalid_config(self):
+        """
+        Test that a zero failure threshold is rejected
+        """
+        with self.assertRaises(client.DuoException):
+            client.CircuitBreaker(failure_threshold=0)
+
+
+class TestClientCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                    circuit_breaker=client.CircuitBreaker(failure_threshold=2))
+
+    @patch('requests.Session.post')
+    def test_open_circuit_fails_fast(self, requests_mock):
+        """
+        Test that once open, calls fail without touching the network
+        """
+        requests_mock.side_effect = requests.ConnectionError(ERROR_NETWORK_CONNECTION_FAILED)
+        for _ in range(2):
+            with self.assertRaises(client.DuoException):
+                self.client.health_check()
+        with self.assertRaises(client.DuoCircuitOpenException):
+            self.client.health_check()
+        with self.assertRaises(client.DuoCircuitOpenException):
+            self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
+        self.assertEqual(requests_mock.call_count, 2)
+
+    @patch('requests.Session.post')
+    def test_expired_deadline_not_counted(self, requests_mock):
+        """
+        Test that calls whose deadline passed before sending do not trip the breaker
+        """
+        for _ in range(3):
+            with self.assertRaises(client.DuoDeadlineExceededException):
+                self.client._post(client.OAUTH_V1_HEALTH_CHECK_ENDPOINT.format(HOST), expires_at=0)
+        self.assertEqual(self.client._circuit_breaker.state, client.CircuitBreaker.CLOSED)
+        requests_mock.assert_not_called()
+
+    @patch('requests.Session.post')
+    def test_deadline_capped_timeout_not_counted(self, requests_mock):
+        """
+        Test that read timeouts shortened by a caller's deadline do not trip the breaker
+        """
+        requests_mock.side_effect = requests.ReadTimeout("timed out")
+        for _ in range(3):
+            with self.assertRaises(client.DuoDeadlineExceededException):
+                self.client.warm(deadline=1)
+        self.assertEqual(self.client._circuit_breaker.state, client.CircuitBreaker.CLOSED)
+        with self.assertRaises(client.DuoTimeoutException) as cm:
+            self.client.warm()
+        self.assertNotIsInstance(cm.exception, client.DuoDeadlineExceededException)
+        with self.assertRaises(client.DuoTimeoutException):
+            self.client.warm()
+        self.assertEqual(self.client._circuit_breaker.state, client.CircuitBreaker.OPEN)
+
+    @patch('requests.Session.post')
+    def test_client_errors_keep_circuit_closed(self, requests_mock):
+        """
+        Test that invalid_grant responses do not trip the breaker
+        """
+        requests_mock.return_value = MagicMock(status_code=400, content=b'{"error": "invalid_grant"}')
+        for _ in range(3):
+            with self.assertRaises(client.DuoException):
+                self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
+        self.assertEqual(self.client._circuit_breaker.state, client.CircuitBreaker.CLOSED)
+
+    def test_async_open_circuit_fails_fast(self):
+        """
+        Test that AsyncClient honors the breaker
+        """
+        duo_client = AsyncClient(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                 circuit_breaker=client.CircuitBreaker(failure_threshold=1))
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503)
+
+        duo_client._build_async_session = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(handler))
+
+        async def check_twice():
+            with self.assertRaises(client.DuoException):
+                await duo_client.health_check()
+            with self.assertRaises(client.DuoCircuitOpenException):
+                await duo_client.health_check()
+
+        asyncio.run(check_twice())
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
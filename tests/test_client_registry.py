@@ -0,0 +1,183 @@
+from duo_universal import client
+from duo_universal.async_client import AsyncClient
+from duo_universal.registry import ClientRegistry, ERR_ASYNC_CLIENT_CLASS
+from mock import MagicMock, patch
+import threading
+import time
+import unittest
+
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+OTHER_HOST = "api-YYYYYYY.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+SUCCESS_CHECK = b'{"stat": "OK", "response": {"timestamp": 1}}'
+
+
+def tenant(key, **kwargs):
+    settings = dict(client_id="DI{:018d}".format(key), client_secret=CLIENT_SECRET, host=HOST,
+                    redirect_uri=REDIRECT_URI)
+    settings.update(kwargs)
+    return settings
+
+
+class TestClientRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.loader = MagicMock(side_effect=lambda key: tenant(key) if key < 100 else None)
+        self.registry = ClientRegistry(self.loader, max_clients=3)
+        self.addCleanup(self.registry.close)
+
+    def test_builds_lazily_and_caches(self):
+        """
+        Test that a tenant's client is built once, on first use
+        """
+        self.loader.assert_not_called()
+        duo_client = self.registry.get(1)
+        self.assertIsInstance(duo_client, client.Client)
+        self.assertEqual(duo_client._client_id, "DI{:018d}".format(1))
+        self.assertIs(self.registry.get(1), duo_client)
+        self.loader.assert_called_once_with(1)
+
+    def test_unknown_tenant(self):
+        """
+        Test that a tenant unknown to the loader raises DuoException
+        """
+        with self.assertRaises(client.DuoException):
+            self.registry.get(100)
+        self.assertNotIn(100, self.registry)
+
+    def test_invalid_tenant_settings(self):
+        """
+        Test that invalid tenant settings raise DuoException
+        """
+        registry = ClientRegistry(lambda key: tenant(key, client_secret="short"))
+        with self.assertRaises(client.DuoException):
+            registry.get(1)
+
+    def test_lru_eviction(self):
+        """
+        Test that the least recently used client is closed and dropped
+        """
+        first = self.registry.get(1)
+        self.registry.get(2)
+        self.registry.get(3)
+        self.registry.get(1)
+        with patch.object(client.Client, 'close') as close_mock:
+            self.registry.get(4)
+            close_mock.assert_called_once_with()
+        self.assertEqual(len(self.registry), 3)
+        self.assertNotIn(2, self.registry)
+        self.assertIs(self.registry.get(1), first)
+
+    def test_shared_session_pool_per_host(self):
+        """
+        Test that tenants on one host share a pool and other hosts get their own
+        """
+        loader = MagicMock(side_effect=lambda key: tenant(key, host=OTHER_HOST if key == 3 else HOST))
+        registry = ClientRegistry(loader)
+        self.addCleanup(registry.close)
+        pools = [registry.get(key)._session_pool for key in (1, 2, 3)]
+        self.assertIs(pools[0], pools[1])
+        self.assertIsNot(pools[0], pools[2])
+        # The parsed CA bundle is still shared across hosts
+        self.assertIs(pools[0].shared_ssl_context(), pools[2].shared_ssl_context())
+
+    def test_pool_per_ca_setting(self):
+        """
+        Test that tenants with different CA settings do not share a pool
+        """
+        registry = ClientRegistry(lambda key: tenant(key, duo_certs="DISABLE") if key == 2 else tenant(key))
+        self.addCleanup(registry.close)
+        self.assertIsNot(registry.get(1)._session_pool, registry.get(2)._session_pool)
+
+    @patch('requests.Session.post')
+    def test_requests_share_session(self, requests_mock):
+        """
+        Test that requests from different tenants go through one session
+        """
+        requests_mock.return_value = MagicMock(content=SUCCESS_CHECK)
+        self.registry.get(1).health_check()
+        self.registry.get(2).health_check()
+        self.assertEqual(len(requests_mock.call_args_list), 2)
+        self.assertIsNotNone(self.registry.get(1)._session_pool._session)
+
+    def test_client_close_keeps_shared_pool(self):
+        """
+        Test that closing one tenant's client leaves the shared pool open
+        """
+        duo_client = self.registry.get(1)
+        pool = duo_client._session_pool
+        pool.checkout()
+        pool.checkin()
+        duo_client.close()
+        self.assertIsNotNone(pool._session)
+        self.registry.close()
+        self.assertIsNone(pool._session)
+        self.assertEqual(len(self.registry), 0)
+
+    def test_evict(self):
+        """
+        Test that evict drops a tenant so it is rebuilt with fresh settings
+        """
+        first = self.registry.get(1)
+        self.registry.evict(1)
+        self.assertIsNot(self.registry.get(1), first)
+        self.assertEqual(self.loader.call_count, 2)
+
+    def test_concurrent_first_use_builds_once(self):
+        """
+        Test that concurrent first requests for a tenant share one build
+        """
+        def slow_loader(key):
+            time.sleep(0.05)
+            return tenant(key)
+
+        loader = MagicMock(side_effect=slow_loader)
+        registry = ClientRegistry(loader)
+        self.addCleanup(registry.close)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get(1))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        loader.assert_called_once_with(1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_client_class(self):
+        """
+        Test that the registry can build another Client class
+        """
+        class TenantClient(client.Client):
+            pass
+
+        registry = ClientRegistry(tenant, client_class=TenantClient)
+        self.addCleanup(registry.close)
+        self.assertIsInstance(registry.get(1), TenantClient)
+
+    def test_async_client_rejected(self):
+        """
+        Test that AsyncClient, which cannot share the pools, is rejected
+        """
+        with self.assertRaises(client.DuoException) as cm:
+            ClientRegistry(tenant, client_class=AsyncClient)
+        self.assertEqual(str(cm.exception), ERR_ASYNC_CLIENT_CLASS)
+
+    def test_invalid_max_clients(self):
+        """
+        Test that a registry must hold at least one client
+        """
+        with self.assertRaises(client.DuoException):
+            ClientRegistry(tenant, max_clients=0)
+
+    def test_mismatched_pool_certs(self):
+        """
+        Test that a client refuses a shared pool with other CA settings
+        """
+        pool = self.registry.session_pool(HOST, False)
+        with self.assertRaises(client.DuoException):
+            client.Client(session_pool=pool, **tenant(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
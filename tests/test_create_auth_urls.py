@@ -0,0 +1,90 @@
+from duo_universal import client
+from mock import MagicMock, patch
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+STATE = "deadbeefdeadbeefdeadbeefdeadbeefdead"
+NONCE = "abcdefghijklmnopqrstuvwxyzabcdef"
+
+
+class TestCreateAuthUrls(unittest.TestCase):
+
+    def setUp(self):
+        self.client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        self.items = [("user{}".format(i), STATE + str(i), NONCE if i % 2 else None)
+                      for i in range(25)]
+
+    @patch('time.time', MagicMock(return_value=2))
+    def test_matches_create_auth_url(self):
+        """
+        Test that bulk urls equal those from create_auth_url, in order
+        """
+        expected = [self.client.create_auth_url(*item) for item in self.items]
+        self.assertEqual(list(self.client.create_auth_urls(self.items, chunk_size=4)), expected)
+
+    @patch('time.time', MagicMock(return_value=2))
+    def test_two_item_tuples(self):
+        """
+        Test that items without a nonce may be (username, state) pairs
+        """
+        urls = list(self.client.create_auth_urls([("user1", STATE)]))
+        self.assertEqual(urls, [self.client.create_auth_url("user1", STATE)])
+
+    def test_one_timestamp_per_chunk(self):
+        """
+        Test that each chunk reads the clock once
+        """
+        with patch('time.time', MagicMock(return_value=2)) as mock_time:
+            list(self.client.create_auth_urls(self.items, chunk_size=10))
+        self.assertEqual(mock_time.call_count, 3)
+
+    def test_lazy(self):
+        """
+        Test that items are read only as urls are consumed
+        """
+        consumed = []
+
+        def items():
+            for item in self.items:
+                consumed.append(item)
+                yield item
+
+        urls = self.client.create_auth_urls(items(), chunk_size=5)
+        self.assertEqual(consumed, [])
+        next(urls)
+        self.assertEqual(len(consumed), 5)
+
+    def test_invalid_item(self):
+        """
+        Test that invalid items raise DuoException
+        """
+        for item in [("user1", "short"), (None, STATE), ("user1", STATE, "short"),
+                     ("user1",), "user1", ("user1", STATE, NONCE, "extra")]:
+            with self.subTest(item=item):
+                with self.assertRaises(client.DuoException):
+                    list(self.client.create_auth_urls([item]))
+
+    def test_invalid_batch_config(self):
+        """
+        Test that a bad chunk size or process count is rejected immediately
+        """
+        with self.assertRaises(client.DuoException):
+            self.client.create_auth_urls(self.items, chunk_size=0)
+        with self.assertRaises(client.DuoException):
+            self.client.create_auth_urls(self.items, processes=0)
+
+    @patch('time.time', MagicMock(return_value=2))
+    def test_process_pool(self):
+        """
+        Test that worker processes render the same urls, in order
+        """
+        expected = [self.client.create_auth_url(*item) for item in self.items]
+        urls = list(self.client.create_auth_urls(self.items, processes=2, chunk_size=3))
+        self.assertEqual(urls, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
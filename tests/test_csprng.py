@@ -0,0 +1,92 @@
+from duo_universal import csprng
+from mock import patch
+import collections
+import os
+import threading
+import unittest
+
+
+class TestBufferedRandomString(unittest.TestCase):
+
+    def test_length_and_alphabet(self):
+        """
+        Test that strings have the requested length and use only the alphabet
+        """
+        generator = csprng.BufferedRandomString(block_size=64)
+        for length in (1, 16, 36, 63, 64, 65, 1000):
+            with self.subTest(length=length):
+                value = generator.generate(length)
+                self.assertEqual(len(value), length)
+                self.assertTrue(set(value) <= set(csprng.ALPHANUMERIC))
+
+    def test_rejects_biased_bytes(self):
+        """
+        Test that bytes above the largest multiple of the alphabet size are dropped
+        """
+        generator = csprng.BufferedRandomString(alphabet='ab', block_size=4)
+        self.assertEqual(csprng.BufferedRandomString('abc')._rejected, bytes([255]))
+        with patch('os.urandom', side_effect=[bytes([0, 1, 2, 3])]):
+            self.assertEqual(generator.generate(4), 'abab')
+        generator = csprng.BufferedRandomString(alphabet='abc', block_size=4)
+        with patch('os.urandom', side_effect=[bytes([255, 0, 255, 4]), bytes([5, 255, 255, 255])]):
+            self.assertEqual(generator.generate(3), 'abc')
+
+    def test_uniform(self):
+        """
+        Test that every character is drawn about equally often
+        """
+        counts = collections.Counter(csprng.BufferedRandomString().generate(62 * 2000))
+        self.assertEqual(set(counts), set(csprng.ALPHANUMERIC))
+        self.assertLess(max(counts.values()) - min(counts.values()), 400)
+
+    def test_threads_never_share_output(self):
+        """
+        Test that concurrent callers receive distinct strings
+        """
+        generator = csprng.BufferedRandomString(block_size=256)
+        results = []
+
+        def generate():
+            results.extend(generator.generate(36) for _ in range(500))
+
+        threads = [threading.Thread(target=generate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(results)), 2000)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires os.fork')
+    def test_forked_child_draws_fresh_bytes(self):
+        """
+        Test that a forked child does not reuse the parent's buffered bytes
+        """
+        csprng.random_alphanumeric(16)
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            os.write(write_end, csprng.random_alphanumeric(36).encode('ascii'))
+            os._exit(0)
+        os.close(write_end)
+        parent_value = csprng.random_alphanumeric(36)
+        with os.fdopen(read_end, 'rb') as child_output:
+            child_value = child_output.read().decode('ascii')
+        os.waitpid(pid, 0)
+        self.assertEqual(len(child_value), 36)
+        self.assertNotEqual(parent_value, child_value)
+
+    def test_pid_change_drops_buffer(self):
+        """
+        Test that the buffer is discarded when the process id changes
+        """
+        generator = csprng.BufferedRandomString()
+        generator.generate(16)
+        generator._pid = -1
+        with patch('os.urandom', return_value=bytes(range(62)) * 2) as mock_urandom:
+            self.assertEqual(generator.generate(3), 'abc')
+        mock_urandom.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
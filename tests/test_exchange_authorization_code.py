@@ -69,7 +69,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
             self.client.exchange_authorization_code_for_2fa_result(NONE, USERNAME)
             self.assertEqual(e, client.ERR_DUO_CODE)
 
-    @patch('requests.post', MagicMock(
+    @patch('requests.Session.post', MagicMock(
         side_effect=requests.Timeout(ERROR_TIMEOUT)))
     def test_exchange_authorization_code_timeout_error(self):
         """
@@ -80,7 +80,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
             self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
             self.assertEqual(e, ERROR_TIMEOUT)
 
-    @patch('requests.post', MagicMock(
+    @patch('requests.Session.post', MagicMock(
         side_effect=requests.ConnectionError(ERROR_NETWORK_CONNECTION_FAILED)))
     def test_exchange_authorization_code_duo_down_error(self):
         """
@@ -91,7 +91,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
             self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
             self.assertEqual(e, ERROR_NETWORK_CONNECTION_FAILED)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     @patch('json.loads')
     def test_exchange_authorization_code_wrong_client_id(self,
                                                          mock_json_loads,
@@ -106,7 +106,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
             self.client_wrong_client_id.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
             self.assertEqual(e['error'], 'invalid_grant')
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     @patch('json.loads')
     def test_exchange_authorization_code_wrong_duo_code(self,
                                                         mock_json_loads,
@@ -121,7 +121,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
             self.client.exchange_authorization_code_for_2fa_result(WRONG_DUO_CODE, USERNAME)
             self.assertEqual(e['error'], 'invalid_client')
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_exchange_authorization_code_wrong_cert(self, requests_mock):
         """
         Test that a wrong Duo Cert causes the client to throw a DuoException
@@ -131,8 +131,8 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
             self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
             self.assertEqual(e, WRONG_CERT_ERROR)
 
-    @patch('requests.post')
-    @patch('jwt.decode')
+    @patch('requests.Session.post')
+    @patch('duo_universal.id_token.IdTokenVerifier.verify')
     def test_exchange_authorization_code_success(self, mock_jwt, mock_post):
         """
         Test that a successful authorization duo_code exchange
@@ -143,7 +143,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
         output = self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
         self.assertEqual(output, self.jwt_decode)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_exchange_authorization_nonce(self, mock_post):
         """
         Test that a good nonce succeeds
@@ -152,7 +152,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
         output = self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, NONCE)
         self.assertEqual(output, self.jwt_decode)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_invalid_token_signature_failure(self, mock_post):
         """
         Test that an altered token fails signature validation
@@ -163,7 +163,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
         with self.assertRaises(client.DuoException):
             self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_invalid_signing_key_failure(self, mock_post):
         """
         Test that a token signed with the wrong secret throws an error
@@ -175,7 +175,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
             self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
             self.assertEqual(e.message, "Signature verification failed")
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_exchange_authorization_wrong_preferred_username(self, mock_post):
         """
         Test that a wrong preferred name throws an error
@@ -184,7 +184,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
         with self.assertRaises(client.DuoException):
             self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_exchange_authorization_wrong_aud(self, mock_post):
         """
         Test that a wrong audience throws an error
@@ -193,7 +193,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
         with self.assertRaises(client.DuoException):
             self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_exchange_authorization_no_aud(self, mock_post):
         """
         Test that no audience throws an error
@@ -202,7 +202,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
         with self.assertRaises(client.DuoException):
             self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_exchange_authorization_wrong_iss(self, mock_post):
         """
         Test that a wrong issuer throws an error
@@ -211,7 +211,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
         with self.assertRaises(client.DuoException):
             self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_exchange_authorization_no_preferred_username(self, mock_post):
         """
         Test that no preferred name throws an error
@@ -220,7 +220,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
         with self.assertRaises(client.DuoException):
             self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_exchange_authorization_no_iat(self, mock_post):
         """
         Test that no iat throws an error
@@ -229,7 +229,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
         with self.assertRaises(client.DuoException):
             self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_exchange_authorization_no_exp(self, mock_post):
         """
         Test that no expiration throws an error
@@ -238,7 +238,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
         with self.assertRaises(client.DuoException):
             self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_exchange_authorization_past_exp(self, mock_post):
         """
         Test that an expired auth throws an error
@@ -247,7 +247,7 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
         with self.assertRaises(client.DuoException):
             self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_exchange_authorization_wrong_nonce(self, mock_post):
         """
         Test that a wrong nonce throws an error
@@ -256,8 +256,8 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
         with self.assertRaises(client.DuoException):
             self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, NONCE)
 
-    @patch('requests.post')
-    @patch('jwt.decode')
+    @patch('requests.Session.post')
+    @patch('duo_universal.id_token.IdTokenVerifier.verify')
     def test_exchange_authorization_no_nonce(self, mock_jwt, mock_post):
         """
         Test that a no nonce when one is expected throws an error
@@ -267,8 +267,8 @@ class TestExchangeAuthCodeInputs(unittest.TestCase):
         with self.assertRaises(client.DuoException):
             self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, NONCE)
 
-    @patch('requests.post')
-    @patch('jwt.decode')
+    @patch('requests.Session.post')
+    @patch('duo_universal.id_token.IdTokenVerifier.verify')
     def test_exchange_authorization_no_username(self, mock_jwt, mock_post):
         """
         Test that a no username throws an error
@@ -0,0 +1,232 @@
+from duo_universal import client, fork
+from duo_universal.async_client import AsyncClient
+from duo_universal.health import HealthMonitor
+from mock import MagicMock, patch
+import asyncio
+import httpx
+import json
+import os
+import threading
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+SUCCESS_CHECK = {'response': {'timestamp': 1}, 'stat': 'OK'}
+
+
+def run_in_child(func):
+    """
+    Forks, runs `func` in the child and returns its JSON-encodable result
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            result = func()
+        except BaseException as e:
+            result = {'error': repr(e)}
+        with os.fdopen(write_fd, 'w') as pipe:
+            json.dump(result, pipe)
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        output = pipe.read()
+    os.waitpid(pid, 0)
+    return json.loads(output)
+
+
+class TestForkReset(unittest.TestCase):
+
+    def setUp(self):
+        self.client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                    assertion_pool_size=2, health_check_ttl=10,
+                                    circuit_breaker=client.CircuitBreaker())
+        self.addCleanup(self.client.close)
+
+    def reset_in_child(self, root):
+        """
+        Runs the fork reset of every registered object reachable from `root`,
+        leaving the rest of the test process alone
+        """
+        reachable = set()
+        pending = [root]
+        while pending:
+            obj = pending.pop()
+            if id(obj) in reachable:
+                continue
+            reachable.add(id(obj))
+            pending.extend(getattr(obj, '__dict__', {}).values())
+            if isinstance(obj, dict):
+                pending.extend(obj.values())
+        for obj in list(fork._registered):
+            if id(obj) in reachable:
+                obj._after_fork_in_child()
+
+    def test_inherited_state_dropped(self):
+        """
+        Test that connections, pooled assertions and in-flight calls are dropped
+        """
+        session_pool = self.client._session_pool
+        session_pool.checkout()
+        token_pool = self.client._assertion_pools[client.OAUTH_V1_TOKEN_ENDPOINT.format(HOST)]
+        token_pool.refill()
+        self.client._health_check_flight._calls[HOST] = object()
+        self.client._health_check_cache._refreshing = True
+        lock = session_pool._lock
+        lock.acquire()
+
+        self.reset_in_child(self.client)
+
+        self.assertIsNone(session_pool._session)
+        self.assertEqual(session_pool._in_flight, 0)
+        self.assertIsNot(session_pool._lock, lock)
+        self.assertEqual(len(token_pool), 0)
+        self.assertIsNone(token_pool._thread)
+        self.assertEqual(self.client._health_check_flight._calls, {})
+        self.assertFalse(self.client._health_check_cache._refreshing)
+        self.assertEqual(self.client.tls_session_stats(), {'resumed': 0, 'full': 0})
+
+    def test_half_open_trials_forgotten(self):
+        """
+        Test that trial calls admitted in the parent do not block the child's breaker
+        """
+        breaker = client.CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        breaker.before_call()
+        with self.assertRaises(client.DuoCircuitOpenException):
+            breaker.before_call()
+        self.reset_in_child(breaker)
+        breaker.before_call()
+
+    def test_registered_weakly(self):
+        """
+        Test that registration does not keep clients alive
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        registered = len(fork._registered)
+        del duo_client
+        self.assertLess(len(fork._registered), registered)
+
+
+@unittest.skipUnless(hasattr(os, 'register_at_fork'), 'requires os.register_at_fork')
+class TestForkedChild(unittest.TestCase):
+
+    def test_child_rebuilds_client_state(self):
+        """
+        Test that a forked child gets fresh connections and assertions
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI, assertion_pool_size=2)
+        self.addCleanup(duo_client.close)
+        session = duo_client._session_pool.checkout()
+        duo_client._session_pool.checkin()
+        token_pool = duo_client._assertion_pools[client.OAUTH_V1_TOKEN_ENDPOINT.format(HOST)]
+        token_pool.refill()
+        parent_assertions = [assertion for assertion, exp in token_pool._entries]
+
+        def child():
+            child_session = duo_client._session_pool.checkout()
+            _, args = duo_client._build_token_request("code")
+            return {'new_session': child_session is not session,
+                    'fresh_assertion': args['client_assertion'] not in parent_assertions,
+                    'state': duo_client.generate_state()}
+
+        result = run_in_child(child)
+        self.assertEqual(result.get('error'), None)
+        self.assertTrue(result['new_session'])
+        self.assertTrue(result['fresh_assertion'])
+        self.assertNotEqual(result['state'], duo_client.generate_state())
+        self.assertEqual(len(token_pool), 2)
+
+    def test_child_restarts_monitor(self):
+        """
+        Test that a running HealthMonitor keeps polling in a forked child
+        """
+        monitored = MagicMock()
+        monitor = HealthMonitor(monitored, interval=60)
+        monitor.start()
+        self.addCleanup(monitor.stop)
+        idle_monitor = HealthMonitor(monitored)
+
+        def child():
+            return {'running': monitor._thread is not None and monitor._thread.is_alive(),
+                    'idle': idle_monitor._thread is None}
+
+        self.assertEqual(run_in_child(child), {'running': True, 'idle': True})
+
+
+class TestWarm(unittest.TestCase):
+
+    def setUp(self):
+        self.client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                    pool_maxsize=2, assertion_pool_size=2)
+        self.addCleanup(self.client.close)
+
+    @patch('requests.Session.post')
+    def test_warm_opens_connections(self, post_mock):
+        """
+        Test that warm sends concurrent health checks, up to pool_maxsize
+        """
+        both_started = threading.Barrier(2, timeout=5)
+
+        def post(*args, **kwargs):
+            both_started.wait()
+            return MagicMock(status_code=200, content=json.dumps(SUCCESS_CHECK).encode())
+
+        post_mock.side_effect = post
+        self.client.warm(connections=5)
+        self.assertEqual(post_mock.call_count, 2)
+
+    @patch('requests.Session.post')
+    def test_warm_builds_helpers(self, post_mock):
+        """
+        Test that warm builds lazy helpers and fills the assertion pools
+        """
+        self.client.warm(connections=0)
+        post_mock.assert_not_called()
+        self.assertIn('_id_token_verifier', self.client.__dict__)
+        self.assertIn('_auth_url_template', self.client.__dict__)
+        for assertion_pool in self.client._assertion_pools.values():
+            self.assertEqual(len(assertion_pool), 2)
+
+    @patch('requests.Session.post')
+    def test_warm_failure(self, post_mock):
+        """
+        Test that a failed warm-up health check raises DuoException
+        """
+        post_mock.return_value = MagicMock(status_code=200, content=b'{"stat": "FAIL"}')
+        with self.assertRaises(client.DuoException):
+            self.client.warm()
+
+    def test_warm_negative_connections(self):
+        """
+        Test that a negative connection count raises DuoException
+        """
+        with self.assertRaises(client.DuoException):
+            self.client.warm(connections=-1)
+
+    def test_async_warm(self):
+        """
+        Test that AsyncClient.warm opens connections on its httpx pool
+        """
+        duo_client = AsyncClient(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json=SUCCESS_CHECK)
+
+        duo_client._build_async_session = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        async def warm():
+            await duo_client.warm(connections=3)
+            await duo_client.aclose()
+
+        asyncio.run(warm())
+        self.assertEqual(len(requests), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
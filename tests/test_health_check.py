@@ -31,7 +31,7 @@ class TestHealthCheck(unittest.TestCase):
         self.client_wrong_client_id = client.Client(WRONG_CLIENT_ID, CLIENT_SECRET,
                                                     HOST, REDIRECT_URI)
 
-    @patch('requests.post', MagicMock(side_effect=requests.Timeout(ERROR_TIMEOUT)))
+    @patch('requests.Session.post', MagicMock(side_effect=requests.Timeout(ERROR_TIMEOUT)))
     def test_health_check_timeout_error(self):
         """
         Test health check failure due to a timeout
@@ -40,8 +40,8 @@ class TestHealthCheck(unittest.TestCase):
             self.client.health_check()
             self.assertEqual(e, ERROR_TIMEOUT)
 
-    @patch('requests.post', MagicMock(side_effect=requests.ConnectionError(
-                                      ERROR_NETWORK_CONNECTION_FAILED)))
+    @patch('requests.Session.post', MagicMock(side_effect=requests.ConnectionError(
+                                              ERROR_NETWORK_CONNECTION_FAILED)))
     def test_health_check_duo_down_error(self):
         """
         Test health check failure due to a connection error,
@@ -51,7 +51,7 @@ class TestHealthCheck(unittest.TestCase):
             self.client.health_check()
             self.assertEqual(e, ERROR_NETWORK_CONNECTION_FAILED)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     @patch('json.loads')
     def test_health_check_wrong_client_id(self, json_mock, requests_mock):
         """
@@ -62,7 +62,7 @@ class TestHealthCheck(unittest.TestCase):
         with self.assertRaises(client.DuoException):
             self.client_wrong_client_id.health_check()
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_health_check_bad_cert(self, requests_mock):
         """
         Test health check failure due to bad Duo Cert
@@ -72,7 +72,7 @@ class TestHealthCheck(unittest.TestCase):
             self.client.health_check()
             self.assertEqual(e, WRONG_CERT_ERROR)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     @patch('json.loads')
     def test_health_check_success(self, json_mock, requests_mock):
         """
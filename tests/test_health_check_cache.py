@@ -0,0 +1,167 @@
+from mock import MagicMock, patch
+from duo_universal import client
+from duo_universal.async_client import AsyncClient
+from duo_universal.health import HealthCheckCache
+import asyncio
+import threading
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+SUCCESS_CHECK = {'response': {'timestamp': 1}, 'stat': 'OK'}
+SUCCESS_CONTENT = b'{"stat": "OK", "response": {"timestamp": 1}}'
+
+
+class TestHealthCheckCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = 1000.0
+        patcher = patch('time.monotonic', side_effect=lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = HealthCheckCache(ttl=10, failure_ttl=2, stale_ttl=5)
+
+    def test_fresh_result_served_from_memory(self):
+        """
+        Test that a fresh result does not call the check again
+        """
+        check = MagicMock(return_value=SUCCESS_CHECK)
+        self.assertEqual(self.cache.get(check), SUCCESS_CHECK)
+        self.clock += 9
+        self.assertEqual(self.cache.get(check), SUCCESS_CHECK)
+        check.assert_called_once_with()
+
+    def test_stale_result_refreshed_in_background(self):
+        """
+        Test that a stale result is returned while one background refresh runs
+        """
+        release = threading.Event()
+        refreshed = threading.Event()
+        check = MagicMock(return_value=SUCCESS_CHECK)
+        self.cache.get(check)
+
+        def slow_check():
+            release.wait(5)
+            refreshed.set()
+            return {'stat': 'OK', 'response': {'timestamp': 2}}
+
+        self.clock += 12
+        self.assertEqual(self.cache.get(slow_check), SUCCESS_CHECK)
+        self.assertEqual(self.cache.get(check), SUCCESS_CHECK)
+        release.set()
+        refreshed.wait(5)
+        # The refresh stores its result just after slow_check returns
+        for _ in range(100):
+            if not self.cache._refreshing:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(self.cache.get(check)['response']['timestamp'], 2)
+        check.assert_called_once_with()
+
+    def test_expired_stale_window_refreshes_synchronously(self):
+        """
+        Test that a result past the stale window is fetched inline
+        """
+        check = MagicMock(return_value=SUCCESS_CHECK)
+        self.cache.get(check)
+        self.clock += 16
+        self.cache.get(check)
+        self.assertEqual(check.call_count, 2)
+
+    def test_failure_negatively_cached(self):
+        """
+        Test that a failure is replayed for failure_ttl and then retried
+        """
+        check = MagicMock(side_effect=client.DuoException('down'))
+        with self.assertRaises(client.DuoException):
+            self.cache.get(check)
+        with self.assertRaises(client.DuoException):
+            self.cache.get(check)
+        self.assertEqual(check.call_count, 1)
+        self.clock += 3
+        with self.assertRaises(client.DuoException):
+            self.cache.get(check)
+        self.assertEqual(check.call_count, 2)
+
+    def test_uncached_exception_not_stored(self):
+        """
+        Test that a check cut short by its caller's deadline is retried by the next caller
+        """
+        cache = HealthCheckCache(ttl=10, failure_ttl=2, stale_ttl=5,
+                                 uncached_exceptions=(client.DuoDeadlineExceededException,))
+        check = MagicMock(side_effect=[client.DuoDeadlineExceededException('late'), SUCCESS_CHECK])
+        with self.assertRaises(client.DuoDeadlineExceededException):
+            cache.get(check)
+        self.assertEqual(cache.get(check), SUCCESS_CHECK)
+        self.assertEqual(check.call_count, 2)
+
+    def test_invalidate(self):
+        """
+        Test that invalidate forces the next call to Duo
+        """
+        check = MagicMock(return_value=SUCCESS_CHECK)
+        self.cache.get(check)
+        self.cache.invalidate()
+        self.cache.get(check)
+        self.assertEqual(check.call_count, 2)
+
+
+class TestClientHealthCheckCache(unittest.TestCase):
+
+    @patch('requests.Session.post')
+    def test_uncached_by_default(self, requests_mock):
+        """
+        Test that every health check goes to Duo unless a TTL is configured
+        """
+        requests_mock.return_value = MagicMock(content=SUCCESS_CONTENT)
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        duo_client.health_check()
+        duo_client.health_check()
+        self.assertEqual(requests_mock.call_count, 2)
+
+    @patch('requests.Session.post')
+    def test_cached_with_ttl(self, requests_mock):
+        """
+        Test that a configured TTL serves repeated health checks from memory
+        """
+        requests_mock.return_value = MagicMock(content=SUCCESS_CONTENT)
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                   health_check_ttl=60)
+        self.assertEqual(duo_client.health_check(), SUCCESS_CHECK)
+        self.assertEqual(duo_client.health_check(), SUCCESS_CHECK)
+        requests_mock.assert_called_once()
+
+    def test_negative_ttl(self):
+        """
+        Test that negative cache durations are rejected
+        """
+        with self.assertRaises(client.DuoException):
+            client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                          health_check_ttl=10, health_check_failure_ttl=-1)
+
+    def test_async_client_cached_with_ttl(self):
+        """
+        Test that AsyncClient shares the cached mode
+        """
+        duo_client = AsyncClient(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                 health_check_ttl=60)
+        calls = []
+
+        async def check(expires_at=None):
+            calls.append(1)
+            return SUCCESS_CHECK
+
+        duo_client._check_health = check
+
+        async def check_twice():
+            await duo_client.health_check()
+            return await duo_client.health_check()
+
+        self.assertEqual(asyncio.run(check_twice()), SUCCESS_CHECK)
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
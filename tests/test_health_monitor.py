@@ -0,0 +1,73 @@
+from mock import MagicMock
+from duo_universal import client
+from duo_universal.health import HealthMonitor
+import threading
+import unittest
+
+SUCCESS_CHECK = {'response': {'timestamp': 1}, 'stat': 'OK'}
+
+
+class TestHealthMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.health_check.return_value = SUCCESS_CHECK
+
+    def test_initially_healthy(self):
+        """
+        Test the status reported before any check has run
+        """
+        self.assertTrue(HealthMonitor(self.client).is_healthy())
+        self.assertFalse(HealthMonitor(self.client, initially_healthy=False).is_healthy())
+
+    def test_success_records_last_success(self):
+        """
+        Test that a passing check resets failures and records the time
+        """
+        monitor = HealthMonitor(self.client, initially_healthy=False)
+        status = monitor.check_now()
+        self.assertTrue(monitor.is_healthy())
+        self.assertEqual(status.consecutive_failures, 0)
+        self.assertIsNotNone(status.last_success)
+
+    def test_failure_threshold(self):
+        """
+        Test that Duo is reported unhealthy only after enough consecutive failures
+        """
+        monitor = HealthMonitor(self.client, failure_threshold=2)
+        monitor.check_now()
+        self.client.health_check.side_effect = client.DuoException('down')
+        monitor.check_now()
+        self.assertTrue(monitor.is_healthy())
+        status = monitor.check_now()
+        self.assertFalse(monitor.is_healthy())
+        self.assertEqual(status.consecutive_failures, 2)
+        self.assertIsInstance(status.last_error, client.DuoException)
+        self.assertIsNotNone(status.last_success)
+
+    def test_recovers_after_success(self):
+        """
+        Test that one passing check restores a healthy status
+        """
+        monitor = HealthMonitor(self.client)
+        self.client.health_check.side_effect = client.DuoException('down')
+        monitor.check_now()
+        self.assertFalse(monitor.is_healthy())
+        self.client.health_check.side_effect = None
+        monitor.check_now()
+        self.assertTrue(monitor.is_healthy())
+
+    def test_background_thread_polls(self):
+        """
+        Test that the daemon thread polls until stopped
+        """
+        polled = threading.Event()
+        self.client.health_check.side_effect = lambda: polled.set()
+        with HealthMonitor(self.client, interval=60) as monitor:
+            self.assertTrue(polled.wait(5))
+            self.assertTrue(monitor._thread.daemon)
+        self.assertIsNone(monitor._thread)
+
+
+if __name__ == '__main__':
+    unittest.main()
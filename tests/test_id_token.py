@@ -0,0 +1,151 @@
+from duo_universal import client
+from duo_universal.id_token import IdTokenVerifier
+from duo_universal.jwt_signer import HS512Signer
+from mock import patch
+import base64
+import json
+import jwt
+import time
+import unittest
+import warnings
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+WRONG_CLIENT_SECRET = "wrongclientidwrongclientidwrongclientidw"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+ISSUER = client.OAUTH_V1_TOKEN_ENDPOINT.format(HOST)
+
+
+def b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def encode(claims, secret=CLIENT_SECRET, headers=None):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return jwt.encode(claims, secret, algorithm='HS512', headers=headers)
+
+
+def encode_raw(header, claims):
+    """
+    Signs claims and a header that jwt.encode would refuse to produce
+    """
+    header_json = json.dumps(header, separators=(',', ':'), sort_keys=True)
+    signing_input = b64(header_json.encode()) + "." + b64(json.dumps(claims).encode())
+    signature = HS512Signer(CLIENT_SECRET).sign(signing_input.encode())
+    return signing_input + "." + b64(signature)
+
+
+class TestIdTokenVerifier(unittest.TestCase):
+
+    def setUp(self):
+        self.verifier = IdTokenVerifier(CLIENT_SECRET, CLIENT_ID, ISSUER, client.LEEWAY)
+        now = time.time()
+        self.claims = {
+            "aud": CLIENT_ID,
+            "exp": now + client.FIVE_MINUTES_IN_SECONDS,
+            "iat": now,
+            "iss": ISSUER,
+            "preferred_username": "username",
+        }
+
+    def pyjwt_decode(self, token):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return jwt.decode(token, CLIENT_SECRET, audience=CLIENT_ID, issuer=ISSUER,
+                              leeway=client.LEEWAY, algorithms=["HS512"],
+                              options={'require': ['exp', 'iat'], 'verify_iat': True})
+
+    def assert_same_outcome(self, token):
+        try:
+            expected = self.pyjwt_decode(token)
+        except jwt.InvalidTokenError as e:
+            with self.assertRaises(type(e)) as raised:
+                self.verifier.verify(token)
+            self.assertEqual(str(raised.exception), str(e))
+        else:
+            self.assertEqual(self.verifier.verify(token), expected)
+
+    def test_valid_token(self):
+        """
+        Test that a valid id_token verifies to its claims
+        """
+        self.assertEqual(self.verifier.verify(encode(self.claims)), self.claims)
+
+    @patch('jwt.decode')
+    def test_usual_header_skips_pyjwt(self, mock_decode):
+        """
+        Test that Duo's usual tokens are verified without calling jwt.decode
+        """
+        token = encode_raw({'alg': 'HS512', 'typ': 'JWT'}, self.claims)
+        self.assertEqual(self.verifier.verify(token), self.claims)
+        mock_decode.assert_not_called()
+
+    @patch('jwt.decode')
+    def test_rejected_token_checked_by_pyjwt(self, mock_decode):
+        """
+        Test that a token failing the fast checks gets jwt.decode's verdict
+        """
+        self.claims['iat'] = time.time() + 2 * client.LEEWAY
+        token = encode_raw({'alg': 'HS512', 'typ': 'JWT'}, self.claims)
+        self.assertIs(self.verifier.verify(token), mock_decode.return_value)
+        mock_decode.assert_called_once()
+
+    def test_claim_checks_match_pyjwt(self):
+        """
+        Test that claim violations raise what jwt.decode raises
+        """
+        now = time.time()
+        overrides = [
+            ('aud', "DIXXXXXXXXXXXXXXXXXY"), ('aud', [CLIENT_ID, "other"]), ('aud', ["other"]),
+            ('aud', 5), ('aud', [5]), ('aud', ""), ('aud', None),
+            ('iss', HOST), ('iss', 5), ('iss', None),
+            ('exp', 1), ('exp', "soon"), ('exp', None), ('exp', now - client.LEEWAY + 5),
+            ('iat', now + 2 * client.LEEWAY), ('iat', "now"), ('iat', None),
+            ('nbf', now + 2 * client.LEEWAY), ('nbf', "later"), ('nbf', now),
+            ('sub', 5), ('sub', "user"), ('jti', 5), ('jti', "id"),
+        ]
+        for key, value in overrides:
+            with self.subTest(key=key, value=value):
+                claims = dict(self.claims)
+                if value is None:
+                    claims.pop(key)
+                else:
+                    claims[key] = value
+                self.assert_same_outcome(encode_raw({'alg': 'HS512', 'typ': 'JWT'}, claims))
+
+    def test_token_format_checks_match_pyjwt(self):
+        """
+        Test that malformed tokens raise what jwt.decode raises
+        """
+        token = encode(self.claims)
+        header, payload, signature = token.split('.')
+        tokens = [
+            "", "abc", header + "." + payload,
+            header + "." + payload + "." + signature[:-2] + "AA",
+            header + "." + payload + "=." + signature,
+            header + "." + payload + "!." + signature,
+            header + "." + payload + "." + signature + "=",
+            encode(self.claims, WRONG_CLIENT_SECRET),
+            encode(self.claims, headers={'kid': 'key-1'}),
+            encode_raw({'alg': 'HS512', 'typ': 'JWT', 'kid': 5}, self.claims),
+        ]
+        for bad_payload in (b'[1, 2]', b'not json'):
+            signing_input = header + "." + b64(bad_payload)
+            tokens.append(signing_input + "." + b64(self.verifier._signer.sign(signing_input.encode())))
+        none_header = b64(json.dumps({'alg': 'none', 'typ': 'JWT'}).encode())
+        tokens.append(none_header + "." + payload + ".")
+        for token in tokens:
+            with self.subTest(token=token):
+                self.assert_same_outcome(token)
+
+    def test_rejects_non_string_token(self):
+        """
+        Test that a token that is not str or bytes raises DecodeError
+        """
+        with self.assertRaises(jwt.DecodeError):
+            self.verifier.verify(None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+from duo_universal import client, instrumentation, tls
+from duo_universal.async_client import AsyncClient
+from mock import MagicMock, patch
+from token_helpers import token_response
+from urllib3.connection import HTTPSConnection
+import asyncio
+import httpx
+import requests
+import time
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+WRONG_CLIENT_SECRET = "wrongclientidwrongclientidwrongclientidw"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+DUO_CODE = "deadbeefdeadbeefdeadbeefdeadbeef"
+USERNAME = "username"
+STATE = "deadbeefdeadbeefdeadbeefdeadbeefdead"
+SUCCESS_CHECK = b'{"stat": "OK", "response": {"timestamp": 1}}'
+TOKEN_ENDPOINT = client.OAUTH_V1_TOKEN_ENDPOINT.format(HOST)
+HEALTH_CHECK_ENDPOINT = client.OAUTH_V1_HEALTH_CHECK_ENDPOINT.format(HOST)
+
+
+class TestClientObservers(unittest.TestCase):
+
+    def setUp(self):
+        self.events = []
+        self.client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                    observers=[self.events.append])
+
+    def phases(self):
+        return [event.phase for event in self.events]
+
+    def assert_outcome(self, status_code, outcome):
+        for event in self.events:
+            self.assertEqual((event.status_code, event.outcome), (status_code, outcome))
+
+    def test_no_observers_not_timed(self):
+        """
+        Test that calls of a client without observers use the no-op timer
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        self.assertIs(duo_client._call_timer(instrumentation.OPERATION_HEALTH_CHECK,
+                                             client.OAUTH_V1_HEALTH_CHECK_ENDPOINT),
+                      instrumentation.NULL_TIMER)
+        self.assertNotIn('_observers', duo_client.__dict__)
+
+    @patch('requests.Session.post')
+    def test_health_check_phases(self, post_mock):
+        """
+        Test that a health check reports its sign, request, verify and total phases
+        """
+        post_mock.return_value = MagicMock(status_code=200, content=SUCCESS_CHECK)
+        self.client.health_check()
+        self.assertEqual(self.phases(), ['sign', 'request', 'verify', 'total'])
+        self.assert_outcome(200, 'ok')
+        for event in self.events:
+            self.assertEqual(event.operation, 'health_check')
+            self.assertEqual(event.endpoint, HEALTH_CHECK_ENDPOINT)
+            self.assertGreaterEqual(event.duration, 0)
+        total = self.events[-1].duration
+        self.assertAlmostEqual(sum(event.duration for event in self.events[:-1]), total, places=3)
+
+    @patch('requests.Session.post')
+    def test_health_check_failure(self, post_mock):
+        """
+        Test that a failed health check reports outcome error
+        """
+        post_mock.return_value = MagicMock(status_code=200, content=b'{"stat": "FAIL"}')
+        with self.assertRaises(client.DuoException):
+            self.client.health_check()
+        self.assert_outcome(200, 'error')
+
+    @patch('requests.Session.post', MagicMock(side_effect=requests.Timeout("timed out")))
+    def test_timeout_outcome(self):
+        """
+        Test that a timed out call reports no status code and outcome timeout
+        """
+        with self.assertRaises(client.DuoTimeoutException):
+            self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
+        self.assertEqual(self.phases(), ['sign', 'request', 'total'])
+        self.assert_outcome(None, 'timeout')
+
+    @patch('requests.Session.post')
+    def test_exchange_phases(self, post_mock):
+        """
+        Test that a token exchange reports its phases
+        """
+        post_mock.return_value = token_response()
+        self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
+        self.assertEqual(self.phases(), ['sign', 'request', 'verify', 'total'])
+        self.assert_outcome(200, 'ok')
+        self.assertEqual({event.endpoint for event in self.events}, {TOKEN_ENDPOINT})
+        self.assertEqual({event.operation for event in self.events}, {'token_exchange'})
+
+    @patch('requests.Session.post')
+    def test_exchange_outcomes(self, post_mock):
+        """
+        Test the outcome reported for each kind of failed exchange
+        """
+        cases = [
+            (MagicMock(status_code=400, content=b'{"error": "invalid_grant"}'), 400, 'invalid_grant'),
+            (token_response(preferred_username="other"), 200, 'username_mismatch'),
+            (token_response(secret=WRONG_CLIENT_SECRET), 200, 'invalid_token'),
+            (MagicMock(side_effect=requests.ConnectionError("refused")), None, 'error'),
+        ]
+        for response, status_code, outcome in cases:
+            with self.subTest(outcome=outcome):
+                del self.events[:]
+                if isinstance(response.side_effect, Exception):
+                    post_mock.return_value = None
+                    post_mock.side_effect = response.side_effect
+                else:
+                    post_mock.side_effect = None
+                    post_mock.return_value = response
+                with self.assertRaises(client.DuoException):
+                    self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
+                self.assert_outcome(status_code, outcome)
+
+    def test_create_auth_url(self):
+        """
+        Test that create_auth_url reports its sign phase
+        """
+        self.client.create_auth_url(USERNAME, STATE)
+        self.assertEqual(self.phases(), ['sign', 'total'])
+        self.assert_outcome(None, 'ok')
+        self.assertEqual(self.events[0].endpoint, client.OAUTH_V1_AUTHORIZE_ENDPOINT.format(HOST))
+
+    @patch('requests.Session.post')
+    def test_failing_observer_ignored(self, post_mock):
+        """
+        Test that an observer raising an exception does not fail the call
+        """
+        post_mock.return_value = MagicMock(status_code=200, content=SUCCESS_CHECK)
+        self.client.add_observer(MagicMock(side_effect=ValueError("observer bug")))
+        self.assertEqual(self.client.health_check()['stat'], 'OK')
+        self.assertEqual(len(self.events), 4)
+
+    def test_add_and_remove_observer(self):
+        """
+        Test that observers can be added and removed
+        """
+        observer = MagicMock()
+        self.client.add_observer(observer)
+        self.client.create_auth_url(USERNAME, STATE)
+        self.assertEqual(observer.call_count, 2)
+        self.client.remove_observer(observer)
+        self.client.remove_observer(self.events.append)
+        self.client.create_auth_url(USERNAME, STATE)
+        self.assertEqual(observer.call_count, 2)
+        self.assertEqual(len(self.events), 2)
+
+
+class TestConnectionPhases(unittest.TestCase):
+
+    def test_adapter_uses_timed_connections(self):
+        """
+        Test that sessions build connection pools with timed connections
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        session = duo_client._session_pool.build_session()
+        adapter = session.get_adapter("https://" + HOST)
+        pool = adapter.poolmanager.connection_from_url("https://" + HOST)
+        self.assertIsInstance(pool, tls.TimedHTTPSConnectionPool)
+
+    def test_connect_and_tls_reported(self):
+        """
+        Test that a new connection reports connect and tls phases to the observed call
+        """
+        def new_conn(connection):
+            time.sleep(0.01)
+            return MagicMock()
+
+        def connect(connection):
+            connection._new_conn()
+            time.sleep(0.02)
+
+        events = []
+        connection = tls.TimedHTTPSConnection(HOST)
+        with patch.object(HTTPSConnection, '_new_conn', new_conn), patch.object(HTTPSConnection, 'connect', connect):
+            # Unobserved connections report nothing
+            tls.TimedHTTPSConnection(HOST).connect()
+            timer = instrumentation.CallTimer([events.append], 'op', 'endpoint', 'request')
+            token = timer.observe()
+            try:
+                connection.connect()
+            finally:
+                timer.unobserve(token)
+        timer.finish(200, 'ok')
+        durations = {event.phase: event.duration for event in events}
+        self.assertEqual(sorted(durations), ['connect', 'request', 'tls', 'total'])
+        self.assertGreaterEqual(durations['connect'], 0.01)
+        self.assertGreaterEqual(durations['tls'], 0.02)
+        self.assertLess(durations['request'], 0.01)
+
+
+class TestAsyncClientObservers(unittest.TestCase):
+
+    def test_health_check_phases(self):
+        """
+        Test that AsyncClient reports the same phases as Client
+        """
+        events = []
+        duo_client = AsyncClient(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI, observers=[events.append])
+        duo_client._build_async_session = lambda: httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, content=SUCCESS_CHECK)))
+
+        async def check():
+            await duo_client.health_check()
+            await duo_client.aclose()
+
+        asyncio.run(check())
+        self.assertEqual([event.phase for event in events], ['sign', 'request', 'verify', 'total'])
+        self.assertEqual(events[-1].outcome, 'ok')
+        self.assertEqual(events[-1].status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+from duo_universal import client
+from duo_universal.jwt_signer import HS512Signer
+import jwt
+import threading
+import unittest
+import warnings
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+
+PAYLOADS = [
+    {},
+    {'iss': CLIENT_ID, 'sub': CLIENT_ID, 'aud': 'https://' + HOST, 'exp': 1573068622,
+     'jti': 'abcdefghijklmnopqrstuvwxyz0123456789'},
+    {'exp': 1573068622.5, 'iat': 1573068322.25},
+    {'duo_uname': 'ünïcödé 用户', 'use_duo_code_attribute': True, 'state': None},
+    {'nested': {'list': [1, 2.5, 'three', False]}},
+]
+
+
+def pyjwt_encode(payload, secret=CLIENT_SECRET):
+    with warnings.catch_warnings():
+        # PyJWT warns that a 40 byte secret is short for HS512
+        warnings.simplefilter('ignore')
+        return jwt.encode(payload, secret, algorithm='HS512')
+
+
+class TestHS512Signer(unittest.TestCase):
+
+    def test_matches_pyjwt(self):
+        """
+        Test that signed tokens are byte-identical to PyJWT's
+        """
+        signer = HS512Signer(CLIENT_SECRET)
+        for payload in PAYLOADS:
+            with self.subTest(payload=payload):
+                self.assertEqual(signer.encode(payload), pyjwt_encode(payload))
+
+    def test_bytes_secret(self):
+        """
+        Test that a bytes secret signs like the equivalent str secret
+        """
+        payload = PAYLOADS[1]
+        self.assertEqual(HS512Signer(CLIENT_SECRET.encode('utf-8')).encode(payload),
+                         HS512Signer(CLIENT_SECRET).encode(payload))
+
+    def test_tokens_verify_with_pyjwt(self):
+        """
+        Test that PyJWT verifies the signer's tokens
+        """
+        payload = {'aud': CLIENT_ID, 'sub': 'user'}
+        token = HS512Signer(CLIENT_SECRET).encode(payload)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            decoded = jwt.decode(token, CLIENT_SECRET, algorithms=['HS512'], audience=CLIENT_ID)
+        self.assertEqual(decoded, payload)
+
+    def test_shared_between_threads(self):
+        """
+        Test that concurrent signing with one signer stays correct
+        """
+        signer = HS512Signer(CLIENT_SECRET)
+        payloads = [{'jti': str(i)} for i in range(200)]
+        expected = [pyjwt_encode(payload) for payload in payloads]
+        results = [None] * len(payloads)
+
+        def sign(start):
+            for i in range(start, len(payloads), 4):
+                results[i] = signer.encode(payloads[i])
+
+        threads = [threading.Thread(target=sign, args=(start,)) for start in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, expected)
+
+    def test_client_requests_use_signer(self):
+        """
+        Test that client assertions are signed like PyJWT would sign them
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        _, all_args = duo_client._build_health_check_request()
+        claims = jwt.decode(all_args['client_assertion'], options={'verify_signature': False})
+        self.assertEqual(all_args['client_assertion'], pyjwt_encode(claims))
+
+
+if __name__ == '__main__':
+    unittest.main()
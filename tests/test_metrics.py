@@ -0,0 +1,213 @@
+from duo_universal import client
+from duo_universal.instrumentation import PhaseEvent
+from duo_universal.metrics import ClientStats, LatencyHistogram, prometheus_text
+from duo_universal.registry import ClientRegistry
+from mock import MagicMock, patch
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+OTHER_HOST = "api-YYYYYYY.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+SUCCESS_CHECK = b'{"stat": "OK", "response": {"timestamp": 1}}'
+TOKEN_ENDPOINT = client.OAUTH_V1_TOKEN_ENDPOINT.format(HOST)
+
+
+def event(duration, outcome='ok', phase='total', endpoint=TOKEN_ENDPOINT, status_code=200):
+    return PhaseEvent('token_exchange', phase, duration, endpoint, status_code, outcome)
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_quantiles(self):
+        """
+        Test that quantiles are within the bucket resolution of the true values
+        """
+        histogram = LatencyHistogram()
+        for millisecond in range(1, 1001):
+            histogram.record(millisecond / 1000)
+        for estimate, expected in zip(histogram.quantiles(), (0.5, 0.95, 0.99)):
+            self.assertAlmostEqual(estimate / expected, 1, delta=0.032)
+        summary = histogram.summary()
+        self.assertEqual(summary['count'], 1000)
+        self.assertAlmostEqual(summary['sum'], 500.5)
+        self.assertAlmostEqual(summary['mean'], 0.5005)
+        self.assertEqual(summary['max'], 1.0)
+
+    def test_empty(self):
+        """
+        Test the summary of a histogram without durations
+        """
+        summary = LatencyHistogram().summary()
+        self.assertEqual(summary['count'], 0)
+        self.assertIsNone(summary['p50'])
+        self.assertIsNone(summary['max'])
+
+    def test_out_of_range_clamped(self):
+        """
+        Test that durations outside the bucket range report their exact extremes
+        """
+        histogram = LatencyHistogram()
+        histogram.record(0)
+        histogram.record(1e-9)
+        histogram.record(1000)
+        self.assertEqual(histogram.quantiles((0.01, 1)), [0, 1000])
+
+    def test_zero_durations(self):
+        """
+        Test that zero durations fall in the lowest bucket
+        """
+        histogram = LatencyHistogram()
+        for _ in range(60):
+            histogram.record(0.0)
+        for _ in range(40):
+            histogram.record(5.0)
+        self.assertEqual(histogram.quantiles((0.5,)), [0.0])
+
+    def test_merge(self):
+        """
+        Test that merged histograms combine counts, sums and extremes
+        """
+        first, second = LatencyHistogram(), LatencyHistogram()
+        first.record(0.1)
+        second.record(0.3)
+        second.record(0.2)
+        first.merge(second)
+        self.assertEqual(first.count, 3)
+        self.assertAlmostEqual(first.sum, 0.6)
+        self.assertEqual((first.min, first.max), (0.1, 0.3))
+        self.assertAlmostEqual(first.quantiles((0.5,))[0], 0.2, delta=0.2 * 0.032)
+
+
+class TestClientStats(unittest.TestCase):
+
+    def test_snapshot(self):
+        """
+        Test that events are summarized per operation, outcome and phase
+        """
+        stats = ClientStats()
+        stats(event(0.1))
+        stats(event(0.2))
+        stats(event(0.05, phase='request'))
+        stats(event(0.3, outcome='invalid_grant', status_code=400))
+        snapshot = stats.snapshot()
+        self.assertEqual(sorted(snapshot['token_exchange']), ['invalid_grant', 'ok'])
+        self.assertEqual(snapshot['token_exchange']['ok']['total']['count'], 2)
+        self.assertEqual(snapshot['token_exchange']['ok']['request']['count'], 1)
+        self.assertEqual(snapshot['token_exchange']['invalid_grant']['total']['max'], 0.3)
+
+    def test_snapshot_by_host(self):
+        """
+        Test that a snapshot can be limited to one API host or merge them all
+        """
+        stats = ClientStats()
+        stats(event(0.1))
+        stats(event(0.2, endpoint=client.OAUTH_V1_TOKEN_ENDPOINT.format(OTHER_HOST)))
+        self.assertEqual(stats.snapshot(host=HOST)['token_exchange']['ok']['total']['count'], 1)
+        self.assertEqual(stats.snapshot(host=OTHER_HOST.upper())['token_exchange']['ok']['total']['count'], 1)
+        self.assertEqual(stats.snapshot()['token_exchange']['ok']['total']['count'], 2)
+
+    def test_snapshot_by_host_with_port(self):
+        """
+        Test that a host with a port only matches calls to that port
+        """
+        stats = ClientStats()
+        stats(event(0.1, endpoint=client.OAUTH_V1_TOKEN_ENDPOINT.format(HOST + ':8443')))
+        self.assertEqual(stats.snapshot(host=HOST + ':8443')['token_exchange']['ok']['total']['count'], 1)
+        self.assertEqual(stats.snapshot(host=HOST), {})
+
+    def test_reset_in_forked_child(self):
+        """
+        Test that a forked child starts with empty stats
+        """
+        stats = ClientStats()
+        stats(event(0.1))
+        stats._after_fork_in_child()
+        self.assertEqual(stats.snapshot(), {})
+
+
+class TestPrometheusText(unittest.TestCase):
+
+    def test_exposition(self):
+        """
+        Test the counters and summaries written for recorded calls
+        """
+        stats = ClientStats()
+        stats(event(0.25))
+        stats(event(0.25))
+        stats(event(0.125, phase='request'))
+        text = prometheus_text(stats)
+        labels = 'operation="token_exchange",endpoint="{}",outcome="ok"'.format(TOKEN_ENDPOINT)
+        self.assertIn('# TYPE duo_universal_calls_total counter\n', text)
+        self.assertIn('duo_universal_calls_total{%s} 2\n' % labels, text)
+        self.assertNotIn('duo_universal_calls_total{%s,phase' % labels, text)
+        self.assertIn('# TYPE duo_universal_call_duration_seconds summary\n', text)
+        self.assertIn('duo_universal_call_duration_seconds{%s,phase="total",quantile="0.5"} 0.25\n' % labels, text)
+        self.assertIn('duo_universal_call_duration_seconds_sum{%s,phase="total"} 0.5\n' % labels, text)
+        self.assertIn('duo_universal_call_duration_seconds_count{%s,phase="request"} 1\n' % labels, text)
+        self.assertTrue(text.endswith('\n'))
+
+    def test_label_escaping_and_prefix(self):
+        """
+        Test that label values are escaped and the prefix applied
+        """
+        stats = ClientStats()
+        stats(event(0.1, outcome='bad "grant"\\\n'))
+        text = prometheus_text(stats, prefix='duo')
+        self.assertIn('outcome="bad \\"grant\\"\\\\\\n"', text)
+        self.assertIn('duo_calls_total{', text)
+
+    def test_several_stats(self):
+        """
+        Test that several ClientStats are written as one exposition
+        """
+        first, second = ClientStats(), ClientStats()
+        first(event(0.1))
+        second(event(0.1, endpoint=client.OAUTH_V1_TOKEN_ENDPOINT.format(OTHER_HOST)))
+        self.assertEqual(prometheus_text(first, second).count('duo_universal_calls_total{'), 2)
+
+
+class TestClientCollectStats(unittest.TestCase):
+
+    @patch('requests.Session.post')
+    def test_client_stats(self, post_mock):
+        """
+        Test that a client created with collect_stats reports its calls
+        """
+        post_mock.return_value = MagicMock(status_code=200, content=SUCCESS_CHECK)
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI, collect_stats=True)
+        duo_client.health_check()
+        duo_client.health_check()
+        total = duo_client.stats()['health_check']['ok']['total']
+        self.assertEqual(total['count'], 2)
+        self.assertLessEqual(total['p50'], total['p99'])
+        self.assertEqual(sorted(duo_client.stats()['health_check']['ok']),
+                         ['request', 'sign', 'total', 'verify'])
+
+    def test_stats_disabled(self):
+        """
+        Test that stats() returns None unless the client collects stats
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        self.assertIsNone(duo_client.stats())
+        self.assertEqual(duo_client._observers, ())
+
+    @patch('requests.Session.post')
+    def test_registry_shares_stats(self, post_mock):
+        """
+        Test that a registry collecting stats aggregates its clients
+        """
+        post_mock.return_value = MagicMock(status_code=200, content=SUCCESS_CHECK)
+        registry = ClientRegistry(lambda key: dict(client_id="DI{:018d}".format(key), client_secret=CLIENT_SECRET,
+                                                   host=HOST, redirect_uri=REDIRECT_URI),
+                                  collect_stats=True)
+        self.addCleanup(registry.close)
+        registry.get(1).health_check()
+        registry.get(2).health_check()
+        self.assertEqual(registry.stats.snapshot()['health_check']['ok']['total']['count'], 2)
+        self.assertIs(registry.get(1)._stats, registry.stats)
+
+
+if __name__ == '__main__':
+    unittest.main()
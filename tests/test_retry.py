@@ -0,0 +1,223 @@
+from mock import MagicMock, patch
+from duo_universal import client
+from duo_universal.async_client import AsyncClient
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+import asyncio
+import httpx
+import requests
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+DUO_CODE = "deadbeefdeadbeefdeadbeefdeadbeef"
+USERNAME = "username"
+SUCCESS_CHECK = {'response': {'timestamp': 1}, 'stat': 'OK'}
+SUCCESS_CONTENT = b'{"stat": "OK", "response": {"timestamp": 1}}'
+ERROR_NETWORK_CONNECTION_FAILED = "Failed to establish a new connection"
+WRONG_CERT_ERROR = 'certificate verify failed'
+
+
+def unreachable_error():
+    reason = NewConnectionError(None, ERROR_NETWORK_CONNECTION_FAILED)
+    return requests.ConnectionError(MaxRetryError(None, '/oauth/v1/token', reason))
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_full_jitter_bounds(self):
+        """
+        Test that backoff is jittered below the exponential ceiling and the cap
+        """
+        policy = client.RetryPolicy(backoff_base=0.5, backoff_cap=3)
+        for _ in range(50):
+            self.assertLessEqual(policy.backoff(1), 0.5)
+            self.assertLessEqual(policy.backoff(2), 1)
+            self.assertLessEqual(policy.backoff(10), 3)
+
+    def test_invalid_config(self):
+        """
+        Test that a policy without attempts is rejected
+        """
+        with self.assertRaises(client.DuoException):
+            client.RetryPolicy(max_attempts=0)
+
+
+@patch('time.sleep', MagicMock())
+class TestClientRetries(unittest.TestCase):
+
+    def setUp(self):
+        self.client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                    retry_policy=client.RetryPolicy(max_attempts=3))
+
+    @patch('requests.Session.post')
+    def test_no_retry_by_default(self, requests_mock):
+        """
+        Test that a client without a policy makes a single attempt
+        """
+        requests_mock.side_effect = requests.ConnectionError(ERROR_NETWORK_CONNECTION_FAILED)
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        with self.assertRaises(client.DuoException):
+            duo_client.health_check()
+        self.assertEqual(requests_mock.call_count, 1)
+
+    @patch('requests.Session.post')
+    def test_health_check_retries_connection_error(self, requests_mock):
+        """
+        Test that a connection reset during a health check is retried
+        """
+        requests_mock.side_effect = [requests.ConnectionError('reset'),
+                                     MagicMock(status_code=200, content=SUCCESS_CONTENT)]
+        self.assertEqual(self.client.health_check(), SUCCESS_CHECK)
+        self.assertEqual(requests_mock.call_count, 2)
+
+    @patch('requests.Session.post')
+    def test_health_check_retry_signs_again(self, requests_mock):
+        """
+        Test that each health check attempt carries its own client assertion
+        """
+        requests_mock.side_effect = [requests.ConnectionError('reset'),
+                                     MagicMock(status_code=200, content=SUCCESS_CONTENT)]
+        self.client.health_check()
+        assertions = [kwargs['data']['client_assertion'] for _, kwargs in requests_mock.call_args_list]
+        self.assertEqual(len(set(assertions)), 2)
+
+    @patch('requests.Session.post')
+    def test_health_check_retries_5xx(self, requests_mock):
+        """
+        Test that a 503 health check response is retried
+        """
+        requests_mock.side_effect = [MagicMock(status_code=503),
+                                     MagicMock(status_code=200, content=SUCCESS_CONTENT)]
+        self.assertEqual(self.client.health_check(), SUCCESS_CHECK)
+
+    @patch('requests.Session.post')
+    def test_gives_up_after_max_attempts(self, requests_mock):
+        """
+        Test that retries stop after max_attempts
+        """
+        requests_mock.side_effect = requests.ConnectionError('reset')
+        with self.assertRaises(client.DuoException):
+            self.client.health_check()
+        self.assertEqual(requests_mock.call_count, 3)
+
+    @patch('requests.Session.post')
+    def test_ssl_error_not_retried(self, requests_mock):
+        """
+        Test that certificate failures are not retried
+        """
+        requests_mock.side_effect = requests.exceptions.SSLError(WRONG_CERT_ERROR)
+        with self.assertRaises(client.DuoException):
+            self.client.health_check()
+        self.assertEqual(requests_mock.call_count, 1)
+
+    @patch('requests.Session.post')
+    def test_retry_respects_deadline(self, requests_mock):
+        """
+        Test that no retry is attempted when the backoff would overrun the deadline
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                   retry_policy=client.RetryPolicy(backoff_base=60, backoff_cap=60))
+        duo_client._retry_policy.backoff = MagicMock(return_value=30)
+        requests_mock.side_effect = requests.ConnectionError('reset')
+        with self.assertRaises(client.DuoException):
+            duo_client.warm(deadline=5)
+        self.assertEqual(requests_mock.call_count, 1)
+
+    @patch('requests.Session.post')
+    def test_exchange_retries_stop_at_deadline(self, requests_mock):
+        """
+        Test that a shared exchange sends no retry after its caller's deadline
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                   retry_policy=client.RetryPolicy(max_attempts=6))
+        duo_client._retry_policy.backoff = MagicMock(return_value=0.1)
+        clock = [1000.0]
+        sent = []
+
+        def sleep(seconds):
+            clock[0] += seconds
+
+        def unreachable(*args, **kwargs):
+            sent.append(clock[0])
+            raise requests.ConnectTimeout('connect')
+
+        requests_mock.side_effect = unreachable
+        with patch('time.monotonic', side_effect=lambda: clock[0]), patch('time.sleep', side_effect=sleep):
+            with self.assertRaises(client.DuoTimeoutException):
+                duo_client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, deadline=0.25)
+        self.assertEqual(len(sent), 3)
+        self.assertTrue(all(at < 1000.25 for at in sent))
+
+    @patch('requests.Session.post')
+    def test_exchange_not_retried_after_send(self, requests_mock):
+        """
+        Test that an exchange which may have reached Duo is never repeated
+        """
+        requests_mock.side_effect = requests.ConnectionError('reset')
+        with self.assertRaises(client.DuoException):
+            self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
+        self.assertEqual(requests_mock.call_count, 1)
+
+    @patch('requests.Session.post')
+    def test_exchange_not_retried_on_5xx(self, requests_mock):
+        """
+        Test that a 5xx exchange response is not retried
+        """
+        requests_mock.return_value = MagicMock(status_code=503, content=b'{"error": "unavailable"}')
+        with self.assertRaises(client.DuoException):
+            self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
+        self.assertEqual(requests_mock.call_count, 1)
+
+    @patch('requests.Session.post')
+    def test_exchange_retried_when_never_sent(self, requests_mock):
+        """
+        Test that an exchange is retried when the connection was never established
+        """
+        requests_mock.side_effect = [unreachable_error(), requests.ConnectTimeout('connect'),
+                                     MagicMock(status_code=400, content=b'{"error": "invalid_grant"}')]
+        with self.assertRaises(client.DuoException):
+            self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
+        self.assertEqual(requests_mock.call_count, 3)
+        assertions = [kwargs['params']['client_assertion'] for _, kwargs in requests_mock.call_args_list]
+        self.assertEqual(len(set(assertions)), 3)
+
+
+class TestAsyncClientRetries(unittest.TestCase):
+
+    def test_exchange_retried_only_when_never_sent(self):
+        """
+        Test the async exchange retry rules
+        """
+        duo_client = AsyncClient(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                 retry_policy=client.RetryPolicy(backoff_base=0))
+        errors = [httpx.ConnectError('refused'), httpx.ReadError('reset')]
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            raise errors[len(calls) - 1]
+
+        duo_client._build_async_session = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(handler))
+        with self.assertRaises(client.DuoException):
+            asyncio.run(duo_client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME))
+        self.assertEqual(len(calls), 2)
+        assertions = {request.url.params['client_assertion'] for request in calls}
+        self.assertEqual(len(assertions), 2)
+
+    def test_health_check_retries_5xx(self):
+        """
+        Test that the async health check retries a 5xx response
+        """
+        duo_client = AsyncClient(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                 retry_policy=client.RetryPolicy(backoff_base=0))
+        responses = [httpx.Response(502), httpx.Response(200, content=SUCCESS_CONTENT)]
+        duo_client._build_async_session = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: responses.pop(0)))
+        self.assertEqual(asyncio.run(duo_client.health_check()), SUCCESS_CHECK)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+from mock import MagicMock, patch
+from duo_universal import client
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+SUCCESS_CHECK = b'{"stat": "OK", "response": {"timestamp": 1}}'
+
+
+class TestSessionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                    pool_maxsize=4, pool_block=True)
+
+    def test_session_created_lazily(self):
+        """
+        Test that no session exists until the first request
+        """
+        self.assertIsNone(self.client._session_pool._session)
+
+    def test_adapter_uses_pool_config(self):
+        """
+        Test that the mounted adapter honors the pool configuration
+        """
+        session = self.client._checkout_session()
+        self.client._checkin_session()
+        adapter = session.get_adapter("https://" + HOST)
+        self.assertEqual(adapter._pool_maxsize, 4)
+        self.assertTrue(adapter._pool_block)
+
+    @patch('requests.Session.post')
+    def test_session_reused_across_calls(self, requests_mock):
+        """
+        Test that health checks share one pooled session
+        """
+        requests_mock.return_value = MagicMock(content=SUCCESS_CHECK)
+        self.client.health_check()
+        first_session = self.client._session_pool._session
+        self.client.health_check()
+        self.assertIs(first_session, self.client._session_pool._session)
+        self.assertEqual(requests_mock.call_count, 2)
+
+    def test_close_releases_session(self):
+        """
+        Test that close drops the session so the pool is released
+        """
+        self.client._checkout_session()
+        self.client._checkin_session()
+        with patch('requests.Session.close') as close_mock:
+            self.client.close()
+            close_mock.assert_called_once_with()
+        self.assertIsNone(self.client._session_pool._session)
+
+    def test_context_manager_closes(self):
+        """
+        Test that leaving the with block closes the client
+        """
+        with patch.object(client.Client, 'close') as close_mock:
+            with client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI) as duo_client:
+                self.assertIsInstance(duo_client, client.Client)
+            close_mock.assert_called_once_with()
+
+    def test_idle_connections_dropped(self):
+        """
+        Test that a session left idle past the timeout has its connections closed
+        """
+        idle_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                    pool_idle_timeout=0)
+        session = idle_client._checkout_session()
+        idle_client._checkin_session()
+        idle_client._session_pool._last_used -= 1
+        with patch.object(session, 'close') as close_mock:
+            self.assertIs(session, idle_client._checkout_session())
+            close_mock.assert_called_once_with()
+
+    def test_invalid_pool_size(self):
+        """
+        Test that an empty pool is rejected
+        """
+        with self.assertRaises(client.DuoException):
+            client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI, pool_maxsize=0)
+
+    def test_invalid_idle_timeout(self):
+        """
+        Test that a negative idle timeout is rejected
+        """
+        with self.assertRaises(client.DuoException):
+            client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI, pool_idle_timeout=-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
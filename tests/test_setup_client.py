@@ -204,7 +204,7 @@ class TestDisableCaPinning(unittest.TestCase):
 
 class TestDisableCaPinningRequests(unittest.TestCase):
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_health_check_pinning_disabled_uses_system_trust_store(self, requests_mock):
         requests_mock.return_value = MagicMock(content=b'{"stat": "OK", "response": {"timestamp": 1}}')
         c = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
@@ -214,7 +214,7 @@ class TestDisableCaPinningRequests(unittest.TestCase):
         self.assertTrue(kwargs['verify'])
         self.assertIsNot(kwargs['verify'], client.DEFAULT_CA_CERT_PATH)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_health_check_pinning_enabled_uses_bundled_certs(self, requests_mock):
         requests_mock.return_value = MagicMock(content=b'{"stat": "OK", "response": {"timestamp": 1}}')
         c = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
@@ -222,7 +222,7 @@ class TestDisableCaPinningRequests(unittest.TestCase):
         _, kwargs = requests_mock.call_args
         self.assertEqual(kwargs['verify'], client.DEFAULT_CA_CERT_PATH)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_token_exchange_pinning_disabled_uses_system_trust_store(self, requests_mock):
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -238,7 +238,7 @@ class TestDisableCaPinningRequests(unittest.TestCase):
         self.assertTrue(kwargs['verify'])
         self.assertIsNot(kwargs['verify'], client.DEFAULT_CA_CERT_PATH)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_token_exchange_pinning_enabled_uses_bundled_certs(self, requests_mock):
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -255,7 +255,7 @@ class TestDisableCaPinningRequests(unittest.TestCase):
 
 class TestUserAgent(unittest.TestCase):
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_user_agent_includes_ca_bundle_version(self, requests_mock):
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -269,7 +269,7 @@ class TestUserAgent(unittest.TestCase):
         _, kwargs = requests_mock.call_args
         self.assertIn('ca_bundle/1.0', kwargs['headers']['user-agent'])
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_user_agent_ca_pinning_enabled(self, requests_mock):
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -283,7 +283,7 @@ class TestUserAgent(unittest.TestCase):
         _, kwargs = requests_mock.call_args
         self.assertIn('(ca_pinning=enabled)', kwargs['headers']['user-agent'])
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_user_agent_ca_pinning_disabled(self, requests_mock):
         mock_response = MagicMock()
         mock_response.status_code = 200
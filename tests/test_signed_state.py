@@ -0,0 +1,88 @@
+from duo_universal import client
+from mock import MagicMock, patch
+import time
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+OTHER_CLIENT_SECRET = "wrongclientidwrongclientidwrongclientidw"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+USERNAME = "user1"
+NONCE = "abcdefghijklmnopqrstuvwxyzabcdef"
+
+
+class TestSignedState(unittest.TestCase):
+
+    def setUp(self):
+        self.client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+
+    def test_round_trip(self):
+        """
+        Test that a signed state verifies to its username and nonce
+        """
+        state = self.client.generate_signed_state(USERNAME, NONCE)
+        self.assertEqual(self.client.verify_signed_state(state), (USERNAME, NONCE))
+        state = self.client.generate_signed_state("ünïcödé")
+        self.assertEqual(self.client.verify_signed_state(state), ("ünïcödé", None))
+
+    def test_usable_as_state(self):
+        """
+        Test that signed states pass create_auth_url validation
+        """
+        state = self.client.generate_signed_state(USERNAME, NONCE)
+        self.assertGreaterEqual(len(state), client.MINIMUM_STATE_LENGTH)
+        self.client.create_auth_url(USERNAME, state, NONCE)
+
+    def test_unique(self):
+        """
+        Test that states for the same user differ
+        """
+        self.assertNotEqual(self.client.generate_signed_state(USERNAME),
+                            self.client.generate_signed_state(USERNAME))
+
+    def test_tampered(self):
+        """
+        Test that altered or foreign states are rejected
+        """
+        state = self.client.generate_signed_state(USERNAME, NONCE)
+        payload, signature = state.split('.')
+        other_client = client.Client(CLIENT_ID, OTHER_CLIENT_SECRET, HOST, REDIRECT_URI)
+        other_user_state = self.client.generate_signed_state("user2", NONCE)
+        for bad_state in [payload[:-1] + ('A' if payload[-1] != 'A' else 'B') + '.' + signature,
+                          payload + '.' + signature[:-1],
+                          other_user_state.split('.')[0] + '.' + signature,
+                          other_client.generate_signed_state(USERNAME, NONCE),
+                          state + '.x', "", None, "é.é", self.client.generate_state()]:
+            with self.subTest(state=bad_state):
+                with self.assertRaises(client.DuoException):
+                    self.client.verify_signed_state(bad_state)
+
+    def test_expired(self):
+        """
+        Test that states are rejected after their lifetime
+        """
+        state = self.client.generate_signed_state(USERNAME, ttl=60)
+        with patch('time.time', MagicMock(return_value=time.time() + 61)):
+            with self.assertRaises(client.DuoException):
+                self.client.verify_signed_state(state)
+
+    def test_length_limit(self):
+        """
+        Test that states longer than MAXIMUM_STATE_LENGTH are refused
+        """
+        with self.assertRaises(client.DuoException):
+            self.client.generate_signed_state("u" * client.MAXIMUM_STATE_LENGTH)
+
+    def test_invalid_arguments(self):
+        """
+        Test that a missing username or bad lifetime is refused
+        """
+        with self.assertRaises(client.DuoException):
+            self.client.generate_signed_state(None)
+        with self.assertRaises(client.DuoException):
+            self.client.generate_signed_state(USERNAME, ttl=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,246 @@
+from mock import MagicMock, patch
+from duo_universal import client
+from duo_universal.async_client import AsyncClient
+from duo_universal.singleflight import AsyncSingleFlight, SingleFlight
+import asyncio
+import threading
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+SUCCESS_CHECK = {'response': {'timestamp': 1}, 'stat': 'OK'}
+SUCCESS_CONTENT = b'{"stat": "OK", "response": {"timestamp": 1}}'
+CALLERS = 8
+
+
+def run_concurrently(target, count=CALLERS):
+    results = []
+    errors = []
+
+    def call():
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_callers_share_result(self):
+        """
+        Test that callers arriving while a call is in flight share its result
+        """
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            release.wait(5)
+            return SUCCESS_CHECK
+
+        threads, results, errors = run_concurrently(lambda: flight.do(HOST, slow))
+        while not calls:
+            release.wait(0.01)
+        release.wait(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [SUCCESS_CHECK] * CALLERS)
+        self.assertEqual(errors, [])
+
+    def test_exception_shared(self):
+        """
+        Test that waiting callers receive the in-flight call's exception
+        """
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def failing():
+            release.wait(5)
+            raise client.DuoException('down')
+
+        threads, results, errors = run_concurrently(lambda: flight.do(HOST, failing), count=3)
+        release.wait(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(errors), 3)
+        self.assertTrue(all(isinstance(e, client.DuoException) for e in errors))
+        self.assertEqual({e.args for e in errors}, {('down',)})
+        # Each caller raises its own instance, so tracebacks are not shared
+        self.assertEqual(len({id(e) for e in errors}), 3)
+
+    def test_sequential_calls_not_coalesced(self):
+        """
+        Test that a finished call is not reused by later callers
+        """
+        flight = SingleFlight()
+        func = MagicMock(return_value=SUCCESS_CHECK)
+        flight.do(HOST, func)
+        flight.do(HOST, func)
+        self.assertEqual(func.call_count, 2)
+
+    def test_call_runs_in_starting_thread(self):
+        """
+        Test that the first caller runs the call itself rather than in a new thread
+        """
+        flight = SingleFlight()
+        self.assertIs(flight.do(HOST, threading.current_thread, timeout=1),
+                      threading.current_thread())
+
+    def test_waiter_takes_over(self):
+        """
+        Test that a waiter runs the call itself when the takeover predicate accepts the failure
+        """
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def failing():
+            release.wait(5)
+            raise client.DuoDeadlineExceededException('late')
+
+        threads, results, errors = run_concurrently(lambda: flight.do(HOST, failing), count=1)
+        while HOST not in flight._calls:
+            release.wait(0.01)
+        threading.Timer(0.05, release.set).start()
+        takeover = MagicMock(return_value=True)
+        self.assertEqual(flight.do(HOST, lambda: SUCCESS_CHECK, timeout=5, takeover=takeover),
+                         SUCCESS_CHECK)
+        threads[0].join(5)
+        self.assertIsInstance(errors[0], client.DuoDeadlineExceededException)
+        self.assertIsInstance(takeover.call_args[0][0], client.DuoDeadlineExceededException)
+
+    def test_waiter_timeout(self):
+        """
+        Test that a waiting caller gives up after its timeout
+        """
+        flight = SingleFlight()
+        release = threading.Event()
+        leader = threading.Thread(target=flight.do, args=(HOST, lambda: release.wait(5)))
+        leader.start()
+        while HOST not in flight._calls:
+            release.wait(0.01)
+        with self.assertRaises(TimeoutError):
+            flight.do(HOST, MagicMock(), timeout=0.01)
+        release.set()
+        leader.join(5)
+
+
+class TestAsyncSingleFlight(unittest.TestCase):
+
+    def test_concurrent_awaits_share_result(self):
+        """
+        Test that concurrent awaits share one coroutine call
+        """
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return SUCCESS_CHECK
+
+        async def gather():
+            return await asyncio.gather(*[flight.do(HOST, slow) for _ in range(CALLERS)])
+
+        self.assertEqual(asyncio.run(gather()), [SUCCESS_CHECK] * CALLERS)
+        self.assertEqual(len(calls), 1)
+
+    def test_exception_copied_per_await(self):
+        """
+        Test that each await raises its own copy of the shared exception
+        """
+        flight = AsyncSingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise client.DuoException('down')
+
+        async def gather():
+            return await asyncio.gather(*[flight.do(HOST, failing) for _ in range(3)],
+                                        return_exceptions=True)
+
+        errors = asyncio.run(gather())
+        self.assertTrue(all(isinstance(e, client.DuoException) for e in errors))
+        self.assertEqual(len({id(e) for e in errors}), 3)
+
+    def test_waiter_takes_over(self):
+        """
+        Test that an await runs the call itself when the takeover predicate accepts the failure
+        """
+        flight = AsyncSingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise client.DuoDeadlineExceededException('late')
+
+        async def succeeding():
+            return SUCCESS_CHECK
+
+        async def gather():
+            return await asyncio.gather(flight.do(HOST, failing),
+                                        flight.do(HOST, succeeding, 5, lambda e: True),
+                                        return_exceptions=True)
+
+        error, result = asyncio.run(gather())
+        self.assertIsInstance(error, client.DuoDeadlineExceededException)
+        self.assertEqual(result, SUCCESS_CHECK)
+
+
+class TestClientCoalescing(unittest.TestCase):
+
+    @patch('requests.Session.post')
+    def test_concurrent_health_checks_share_request(self, requests_mock):
+        """
+        Test that concurrent health checks on one client send one request
+        """
+        release = threading.Event()
+
+        def slow_post(*args, **kwargs):
+            release.wait(5)
+            return MagicMock(content=SUCCESS_CONTENT)
+
+        requests_mock.side_effect = slow_post
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        threads, results, errors = run_concurrently(duo_client.health_check)
+        while not requests_mock.called:
+            release.wait(0.01)
+        release.wait(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(requests_mock.call_count, 1)
+        self.assertEqual(results, [SUCCESS_CHECK] * CALLERS)
+
+    def test_async_health_checks_share_request(self):
+        """
+        Test that concurrent AsyncClient health checks send one request
+        """
+        duo_client = AsyncClient(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        calls = []
+
+        async def check(expires_at=None):
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return SUCCESS_CHECK
+
+        duo_client._check_health = check
+
+        async def gather():
+            return await asyncio.gather(*[duo_client.health_check() for _ in range(CALLERS)])
+
+        self.assertEqual(asyncio.run(gather()), [SUCCESS_CHECK] * CALLERS)
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
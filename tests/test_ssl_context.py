@@ -0,0 +1,106 @@
+from mock import MagicMock
+from duo_universal import client
+from duo_universal import tls
+from duo_universal.async_client import AsyncClient
+from requests.adapters import HTTPAdapter
+import requests
+import ssl
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+
+
+class TestSharedSSLContext(unittest.TestCase):
+
+    def _adapter(self, duo_client):
+        return duo_client._build_session().get_adapter("https://" + HOST)
+
+    def test_context_loaded_once(self):
+        """
+        Test that the pinned bundle is parsed once and shared by every client
+        """
+        first = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                              tls_session_resumption=False)
+        second = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                               tls_session_resumption=False)
+        context = self._adapter(first)._ssl_context
+        self.assertIsInstance(context, ssl.SSLContext)
+        self.assertIs(context, self._adapter(second)._ssl_context)
+        self.assertIs(context, tls.get_ssl_context(client.DEFAULT_CA_CERT_PATH))
+
+    def test_context_settings(self):
+        """
+        Test that the shared context keeps urllib3's defaults but allows session tickets
+        """
+        context = tls.get_ssl_context(client.DEFAULT_CA_CERT_PATH)
+        self.assertGreaterEqual(context.minimum_version, ssl.TLSVersion.TLSv1_2)
+        self.assertFalse(context.options & ssl.OP_NO_TICKET)
+        self.assertEqual(context.verify_mode, ssl.CERT_REQUIRED)
+        self.assertTrue(context.get_ca_certs())
+
+    def test_disable_ca_pinning_uses_default_bundle(self):
+        """
+        Test that disabling pinning shares the context for the default bundle
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                   disable_ca_pinning=True, tls_session_resumption=False)
+        context = self._adapter(duo_client)._ssl_context
+        self.assertIs(context, tls.get_ssl_context())
+        self.assertIsNot(context, tls.get_ssl_context(client.DEFAULT_CA_CERT_PATH))
+
+    def test_async_client_has_own_context(self):
+        """
+        Test that httpx clients share a context that requests never uses
+        """
+        first = AsyncClient(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        second = AsyncClient(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        context = first._async_verify()
+        self.assertIs(context, tls.get_async_ssl_context(client.DEFAULT_CA_CERT_PATH))
+        self.assertIs(context, second._async_verify())
+        self.assertIsNot(context, tls.get_ssl_context(client.DEFAULT_CA_CERT_PATH))
+        self.assertIsNot(context, self._adapter(first)._ssl_context._context)
+
+    def test_disabled_verification_has_no_context(self):
+        """
+        Test that DISABLE leaves certificate handling to requests
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI, "DISABLE")
+        self.assertIsNone(self._adapter(duo_client)._ssl_context)
+
+    @unittest.skipUnless(hasattr(HTTPAdapter, 'build_connection_pool_key_attributes'),
+                         "requests < 2.32 has no pool key hook")
+    def test_pool_uses_context_without_bundle_path(self):
+        """
+        Test that connection pools get the shared context and no CA path to reload
+        """
+        context = tls.get_ssl_context(client.DEFAULT_CA_CERT_PATH)
+        adapter = tls.SSLContextAdapter(ssl_context=context)
+        request = requests.Request('POST', "https://" + HOST).prepare()
+        _, pool_kwargs = adapter.build_connection_pool_key_attributes(
+            request, client.DEFAULT_CA_CERT_PATH)
+        self.assertIs(pool_kwargs['ssl_context'], context)
+        self.assertNotIn('ca_certs', pool_kwargs)
+
+        conn = MagicMock()
+        adapter.cert_verify(conn, "https://" + HOST, client.DEFAULT_CA_CERT_PATH, None)
+        self.assertEqual(conn.cert_reqs, 'CERT_REQUIRED')
+        self.assertIsNone(conn.ca_certs)
+
+    @unittest.skipUnless(hasattr(HTTPAdapter, 'build_connection_pool_key_attributes'),
+                         "requests < 2.32 has no pool key hook")
+    def test_unverified_request_keeps_requests_behavior(self):
+        """
+        Test that verify=False requests are not forced onto the shared context
+        """
+        adapter = tls.SSLContextAdapter(ssl_context=tls.get_ssl_context(client.DEFAULT_CA_CERT_PATH))
+        request = requests.Request('POST', "https://" + HOST).prepare()
+        _, pool_kwargs = adapter.build_connection_pool_key_attributes(request, False)
+        self.assertNotIn('ssl_context', pool_kwargs)
+        self.assertEqual(pool_kwargs['cert_reqs'], 'CERT_NONE')
+
+
+if __name__ == '__main__':
+    unittest.main()
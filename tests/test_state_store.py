@@ -0,0 +1,202 @@
+from duo_universal import client
+from duo_universal.state_store import InMemoryStateStore, RemoteStateStore, StateStore
+from mock import MagicMock, patch
+import threading
+import time
+import unittest
+
+STATE = "deadbeefdeadbeefdeadbeefdeadbeefdead"
+VALUE = {'username': 'user1', 'nonce': 'abcdefghijklmnopqrstuvwxyzabcdef'}
+
+
+class FakeServer:
+    """
+    Key-value server shared by the FakeConnections of several nodes
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+
+class FakeConnection:
+    """
+    The part of redis-py's client RemoteStateStore relies on, with SET NX PX
+    and GETDEL semantics and bytes replies
+    """
+
+    def __init__(self, server):
+        self.server = server
+
+    def set(self, name, value, px=None, nx=False):
+        with self.server.lock:
+            now = time.monotonic()
+            existing = self.server.data.get(name)
+            if nx and existing is not None and existing[0] > now:
+                return None
+            self.server.data[name] = (now + px / 1000, value.encode())
+            return True
+
+    def getdel(self, name):
+        with self.server.lock:
+            entry = self.server.data.pop(name, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+
+class UnreachableConnection:
+
+    def set(self, name, value, px=None, nx=False):
+        raise ConnectionError("Connection refused")
+
+    def getdel(self, name):
+        raise ConnectionError("Connection refused")
+
+
+class TestInMemoryStateStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = InMemoryStateStore(ttl=60, shards=4)
+
+    def test_take_is_single_use(self):
+        """
+        Test that a saved value is returned once
+        """
+        self.store.put(STATE, VALUE)
+        self.assertEqual(self.store.take(STATE), VALUE)
+        self.assertIsNone(self.store.take(STATE))
+
+    def test_unknown_state(self):
+        """
+        Test that an unknown state returns None
+        """
+        self.assertIsNone(self.store.take(STATE))
+
+    def test_duplicate_put(self):
+        """
+        Test that a live state cannot be overwritten
+        """
+        self.store.put(STATE, VALUE)
+        with self.assertRaises(client.DuoException):
+            self.store.put(STATE, {'username': 'attacker'})
+        self.assertEqual(self.store.take(STATE), VALUE)
+
+    def test_expired(self):
+        """
+        Test that expired values are not returned and may be replaced
+        """
+        self.store.put(STATE, VALUE, ttl=10)
+        later = time.monotonic() + 11
+        with patch('time.monotonic', MagicMock(return_value=later)):
+            self.assertIsNone(self.store.take(STATE))
+        self.store.put(STATE, VALUE, ttl=10)
+        with patch('time.monotonic', MagicMock(return_value=later)):
+            self.store.put(STATE, {'username': 'user2'})
+            self.assertEqual(self.store.take(STATE), {'username': 'user2'})
+
+    def test_expired_entries_evicted(self):
+        """
+        Test that puts drop expired entries instead of growing forever
+        """
+        store = InMemoryStateStore(ttl=10, shards=1)
+        for i in range(100):
+            store.put(STATE + str(i), VALUE)
+        with patch('time.monotonic', MagicMock(return_value=time.monotonic() + 11)):
+            store.put(STATE, VALUE)
+        self.assertEqual(len(store), 1)
+
+    def test_max_entries(self):
+        """
+        Test that the oldest states are dropped beyond max_entries
+        """
+        store = InMemoryStateStore(shards=2, max_entries=10)
+        for i in range(100):
+            store.put(STATE + str(i), VALUE)
+        self.assertLessEqual(len(store), 10)
+        self.assertEqual(store.take(STATE + "99"), VALUE)
+
+    def test_concurrent_take(self):
+        """
+        Test that only one of many concurrent takes redeems a state
+        """
+        self.store.put(STATE, VALUE)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.store.take(STATE)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([result for result in results if result is not None], [VALUE])
+
+    def test_invalid_config(self):
+        """
+        Test that nonsensical settings are rejected
+        """
+        for kwargs in ({'ttl': 0}, {'shards': 0}, {'max_entries': 0}):
+            with self.subTest(**kwargs):
+                with self.assertRaises(client.DuoException):
+                    InMemoryStateStore(**kwargs)
+
+    def test_interface(self):
+        """
+        Test that the base class only defines the interface
+        """
+        self.assertIsInstance(self.store, StateStore)
+        with self.assertRaises(TypeError):
+            StateStore()
+
+
+class TestRemoteStateStore(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeServer()
+        self.store = RemoteStateStore(FakeConnection(self.server), ttl=60)
+        # A second node sharing the same server
+        self.other_node = RemoteStateStore(FakeConnection(self.server), ttl=60)
+
+    def test_shared_between_nodes(self):
+        """
+        Test that a state saved on one node is redeemed once on another
+        """
+        self.store.put(STATE, VALUE)
+        self.assertEqual(self.other_node.take(STATE), VALUE)
+        self.assertIsNone(self.store.take(STATE))
+
+    def test_duplicate_put(self):
+        """
+        Test that SET NX prevents overwriting a live state
+        """
+        self.store.put(STATE, VALUE)
+        with self.assertRaises(client.DuoException):
+            self.other_node.put(STATE, VALUE)
+
+    def test_expiry_sent_to_server(self):
+        """
+        Test that values expire on the server
+        """
+        self.store.put(STATE, VALUE, ttl=0.01)
+        time.sleep(0.05)
+        self.assertIsNone(self.store.take(STATE))
+
+    def test_key_prefix(self):
+        """
+        Test that keys are namespaced
+        """
+        self.store.put(STATE, VALUE)
+        self.assertEqual(list(self.server.data), ['duo_universal:state:' + STATE])
+
+    def test_connection_error(self):
+        """
+        Test that server failures surface as DuoException
+        """
+        store = RemoteStateStore(UnreachableConnection())
+        with self.assertRaises(client.DuoException):
+            store.put(STATE, VALUE)
+        with self.assertRaises(client.DuoException):
+            store.take(STATE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,278 @@
+from mock import MagicMock, patch
+from duo_universal import client
+from duo_universal.async_client import AsyncClient
+import asyncio
+import json
+import threading
+import time
+import httpx
+import requests
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+DUO_CODE = "deadbeefdeadbeefdeadbeefdeadbeef"
+USERNAME = "username"
+SUCCESS_CONTENT = b'{"stat": "OK", "response": {"timestamp": 1}}'
+ERROR_TIMEOUT = "Connection to api-xxxxxxx.test.duosecurity.com timed out."
+
+
+class TestTimeouts(unittest.TestCase):
+
+    def setUp(self):
+        self.client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                    connect_timeout=2, read_timeout=5)
+
+    @patch('requests.Session.post')
+    def test_configured_timeouts_passed(self, requests_mock):
+        """
+        Test that the connect and read timeouts reach requests
+        """
+        requests_mock.return_value = MagicMock(content=SUCCESS_CONTENT)
+        self.client.health_check()
+        _, kwargs = requests_mock.call_args
+        self.assertEqual(kwargs['timeout'], (2, 5))
+
+    @patch('requests.Session.post')
+    def test_default_timeouts(self, requests_mock):
+        """
+        Test that a default client never waits forever
+        """
+        requests_mock.return_value = MagicMock(content=SUCCESS_CONTENT)
+        client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI).health_check()
+        _, kwargs = requests_mock.call_args
+        self.assertEqual(kwargs['timeout'], (client.DEFAULT_CONNECT_TIMEOUT,
+                                             client.DEFAULT_READ_TIMEOUT))
+
+    @patch('requests.Session.post')
+    def test_deadline_caps_timeouts(self, requests_mock):
+        """
+        Test that a short warm-up deadline lowers both timeouts
+        """
+        requests_mock.return_value = MagicMock(content=SUCCESS_CONTENT)
+        self.client.warm(deadline=1)
+        _, kwargs = requests_mock.call_args
+        connect_timeout, read_timeout = kwargs['timeout']
+        self.assertLessEqual(connect_timeout, 1)
+        self.assertLessEqual(read_timeout, 1)
+
+    @patch('requests.Session.post')
+    def test_health_check_deadline_caps_timeouts(self, requests_mock):
+        """
+        Test that the caller sending a shared health check keeps it within its deadline
+        """
+        requests_mock.return_value = MagicMock(content=SUCCESS_CONTENT)
+        self.client.health_check(deadline=1)
+        _, kwargs = requests_mock.call_args
+        connect_timeout, read_timeout = kwargs['timeout']
+        self.assertLessEqual(connect_timeout, 1)
+        self.assertLessEqual(read_timeout, 1)
+
+    @patch('requests.Session.post')
+    def test_exchange_deadline_caps_timeouts(self, requests_mock):
+        """
+        Test that the caller sending a shared exchange keeps it within its deadline
+        """
+        requests_mock.return_value = MagicMock(status_code=400, content=b'{"error": "invalid_grant"}')
+        with self.assertRaises(client.DuoException):
+            self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, deadline=1)
+        _, kwargs = requests_mock.call_args
+        connect_timeout, read_timeout = kwargs['timeout']
+        self.assertLessEqual(connect_timeout, 1)
+        self.assertLessEqual(read_timeout, 1)
+
+    @patch('requests.Session.post')
+    def test_caller_deadline_not_cached(self, requests_mock):
+        """
+        Test that a health check cut short by its caller's deadline is not cached as a failure
+        """
+        requests_mock.side_effect = [requests.ReadTimeout(ERROR_TIMEOUT),
+                                     MagicMock(content=SUCCESS_CONTENT)]
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI, health_check_ttl=60)
+        with self.assertRaises(client.DuoDeadlineExceededException):
+            duo_client.health_check(deadline=1)
+        self.assertEqual(duo_client.health_check(deadline=10), json.loads(SUCCESS_CONTENT))
+        self.assertEqual(duo_client.health_check(deadline=10), json.loads(SUCCESS_CONTENT))
+        self.assertEqual(requests_mock.call_count, 2)
+
+    @patch('requests.Session.post')
+    def test_exchange_waiter_bounded_by_own_deadline(self, requests_mock):
+        """
+        Test that a caller joining an exchange in flight gives up at its own deadline
+        """
+        release = threading.Event()
+
+        def slow_post(*args, **kwargs):
+            release.wait(5)
+            return MagicMock(status_code=400, content=b'{"error": "invalid_grant"}')
+
+        requests_mock.side_effect = slow_post
+        errors = []
+
+        def exchange():
+            try:
+                self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, deadline=10)
+            except client.DuoException as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=exchange)
+        leader.start()
+        while not requests_mock.called:
+            time.sleep(0.01)
+        with self.assertRaises(client.DuoDeadlineExceededException):
+            self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, deadline=0.05)
+        release.set()
+        leader.join(5)
+        self.assertNotIsInstance(errors[0], client.DuoTimeoutException)
+        self.assertEqual(requests_mock.call_count, 1)
+
+    @patch('requests.Session.post')
+    def test_health_check_waiter_takes_over_at_leader_deadline(self, requests_mock):
+        """
+        Test that a waiting health check sends its own request when the first caller's deadline ends the shared one
+        """
+        joined = threading.Event()
+
+        def post(*args, **kwargs):
+            if requests_mock.call_count == 1:
+                joined.wait(5)
+                raise requests.ReadTimeout(ERROR_TIMEOUT)
+            return MagicMock(content=SUCCESS_CONTENT)
+
+        requests_mock.side_effect = post
+        errors = []
+
+        def lead():
+            try:
+                self.client.health_check(deadline=1)
+            except client.DuoException as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        while not requests_mock.called:
+            time.sleep(0.01)
+        threading.Timer(0.05, joined.set).start()
+        self.assertEqual(self.client.health_check(deadline=10), json.loads(SUCCESS_CONTENT))
+        leader.join(5)
+        self.assertIsInstance(errors[0], client.DuoDeadlineExceededException)
+        self.assertEqual(requests_mock.call_count, 2)
+
+    def exchange_after_leader_fails_with(self, requests_mock, leader_error):
+        """
+        Returns the error raised to an exchange waiting on one that fails with `leader_error`
+        """
+        joined = threading.Event()
+
+        def post(*args, **kwargs):
+            if requests_mock.call_count == 1:
+                joined.wait(5)
+                raise leader_error
+            return MagicMock(status_code=400, content=b'{"error": "invalid_grant"}')
+
+        requests_mock.side_effect = post
+        errors = {}
+
+        def exchange(deadline):
+            try:
+                self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, deadline=deadline)
+            except client.DuoException as e:
+                errors[deadline] = e
+
+        leader = threading.Thread(target=exchange, args=(1,))
+        leader.start()
+        while not requests_mock.called:
+            time.sleep(0.01)
+        threading.Timer(0.05, joined.set).start()
+        exchange(10)
+        leader.join(5)
+        self.assertIsInstance(errors[1], client.DuoDeadlineExceededException)
+        return errors[10]
+
+    @patch('requests.Session.post')
+    def test_exchange_waiter_takes_over_when_never_sent(self, requests_mock):
+        """
+        Test that a waiting exchange sends the code itself when the first caller's deadline ended it before it reached Duo
+        """
+        error = self.exchange_after_leader_fails_with(requests_mock, requests.ConnectTimeout(ERROR_TIMEOUT))
+        self.assertNotIsInstance(error, client.DuoTimeoutException)
+        self.assertEqual(requests_mock.call_count, 2)
+
+    @patch('requests.Session.post')
+    def test_exchange_waiter_not_resent_after_send(self, requests_mock):
+        """
+        Test that a waiting exchange never repeats a code the first caller may have sent
+        """
+        error = self.exchange_after_leader_fails_with(requests_mock, requests.ReadTimeout(ERROR_TIMEOUT))
+        self.assertIsInstance(error, client.DuoDeadlineExceededException)
+        self.assertEqual(requests_mock.call_count, 1)
+
+    @patch('requests.Session.post')
+    def test_expired_deadline_fails_fast(self, requests_mock):
+        """
+        Test that an exhausted deadline raises without sending a request
+        """
+        with self.assertRaises(client.DuoTimeoutException):
+            self.client._post(client.OAUTH_V1_TOKEN_ENDPOINT.format(HOST), expires_at=0)
+        requests_mock.assert_not_called()
+
+    @patch('requests.Session.post', MagicMock(side_effect=requests.ReadTimeout(ERROR_TIMEOUT)))
+    def test_health_check_timeout_is_distinct(self):
+        """
+        Test that a health check timeout raises DuoTimeoutException
+        """
+        with self.assertRaises(client.DuoTimeoutException):
+            self.client.health_check()
+
+    @patch('requests.Session.post', MagicMock(side_effect=requests.ConnectTimeout(ERROR_TIMEOUT)))
+    def test_exchange_timeout_is_distinct(self):
+        """
+        Test that a token exchange timeout raises DuoTimeoutException
+        """
+        with self.assertRaises(client.DuoTimeoutException):
+            self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
+
+    def test_invalid_timeout(self):
+        """
+        Test that non-positive timeouts are rejected
+        """
+        with self.assertRaises(client.DuoException):
+            client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI, connect_timeout=0)
+
+
+class TestAsyncTimeouts(unittest.TestCase):
+
+    def test_deadline_bounds_whole_request(self):
+        """
+        Test that a slow response past the deadline raises DuoTimeoutException
+        """
+        duo_client = AsyncClient(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+
+        async def slow_handler(request):
+            await asyncio.sleep(5)
+            return httpx.Response(200, content=SUCCESS_CONTENT)
+
+        duo_client._build_async_session = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(slow_handler))
+        with self.assertRaises(client.DuoTimeoutException):
+            asyncio.run(duo_client.health_check(deadline=0.05))
+
+    def test_httpx_timeout_is_distinct(self):
+        """
+        Test that httpx timeouts raise DuoTimeoutException
+        """
+        duo_client = AsyncClient(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+
+        def handler(request):
+            raise httpx.ReadTimeout(ERROR_TIMEOUT)
+
+        duo_client._build_async_session = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(handler))
+        with self.assertRaises(client.DuoTimeoutException):
+            asyncio.run(duo_client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME))
+
+
+if __name__ == '__main__':
+    unittest.main()
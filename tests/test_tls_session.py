@@ -0,0 +1,118 @@
+from mock import MagicMock
+from duo_universal import client
+from duo_universal import tls
+import ssl
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+
+
+def mock_socket(session, reused=False):
+    return MagicMock(session=session, session_reused=reused)
+
+
+class TestTLSSessionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = tls.TLSSessionCache()
+
+    def test_counts_handshakes(self):
+        """
+        Test that resumed and full handshakes are counted separately
+        """
+        self.cache.record(HOST, mock_socket(MagicMock(has_ticket=True)))
+        self.cache.record(HOST, mock_socket(MagicMock(has_ticket=True), reused=True))
+        self.assertEqual(self.cache.stats(), {'resumed': 1, 'full': 1})
+
+    def test_session_kept_per_host(self):
+        """
+        Test that sessions are offered only to the host they came from
+        """
+        session = MagicMock(has_ticket=True)
+        self.cache.record(HOST, mock_socket(session))
+        self.assertIs(self.cache.session_for(HOST), session)
+        self.assertIsNone(self.cache.session_for("api-other.duosecurity.com"))
+
+    def test_late_ticket_captured(self):
+        """
+        Test that a TLS 1.3 ticket arriving after the handshake is picked up
+        """
+        sock = mock_socket(None)
+        self.cache.record(HOST, sock)
+        self.assertIsNone(self.cache.session_for(HOST))
+        sock.session = MagicMock(has_ticket=True)
+        self.cache.capture()
+        self.assertIs(self.cache.session_for(HOST), sock.session)
+        self.assertEqual(self.cache._pending, {})
+
+
+class TestSessionResumingSSLContext(unittest.TestCase):
+
+    def setUp(self):
+        self.context = MagicMock()
+        self.cache = tls.TLSSessionCache()
+        self.resuming = tls.SessionResumingSSLContext(self.context, self.cache)
+
+    def test_offers_cached_session(self):
+        """
+        Test that new sockets are wrapped with the cached session
+        """
+        session = MagicMock(has_ticket=True)
+        self.context.wrap_socket.return_value = mock_socket(session)
+        self.resuming.wrap_socket(MagicMock(), server_hostname=HOST)
+        self.resuming.wrap_socket(MagicMock(), server_hostname=HOST)
+        _, kwargs = self.context.wrap_socket.call_args
+        self.assertIs(kwargs['session'], session)
+
+    def test_delegates_to_shared_context(self):
+        """
+        Test that attribute access reaches the shared context
+        """
+        self.assertIs(self.resuming.verify_mode, self.context.verify_mode)
+        self.resuming.set_alpn_protocols(['http/1.1'])
+        self.context.set_alpn_protocols.assert_called_once_with(['http/1.1'])
+
+    def test_writes_never_reach_shared_context(self):
+        """
+        Test that urllib3's per-connection settings leave the shared context alone
+        """
+        shared = tls.get_ssl_context(client.DEFAULT_CA_CERT_PATH)
+        resuming = tls.SessionResumingSSLContext(shared, self.cache)
+        resuming.verify_mode = ssl.CERT_REQUIRED
+        self.assertIs(resuming._context, shared)
+
+        resuming.check_hostname = False
+        self.assertTrue(shared.check_hostname)
+        self.assertIsNot(resuming._context, shared)
+        self.assertFalse(resuming.check_hostname)
+        self.assertEqual(resuming.verify_mode, ssl.CERT_REQUIRED)
+        self.assertEqual(resuming.get_ca_certs(), shared.get_ca_certs())
+
+
+class TestClientTLSSessions(unittest.TestCase):
+
+    def test_client_wraps_shared_context(self):
+        """
+        Test that a client resumes sessions on top of the shared context
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        adapter = duo_client._build_session().get_adapter("https://" + HOST)
+        self.assertIsInstance(adapter._ssl_context, tls.SessionResumingSSLContext)
+        self.assertIs(adapter._ssl_context._context,
+                      tls.get_ssl_context(client.DEFAULT_CA_CERT_PATH))
+        self.assertEqual(duo_client.tls_session_stats(), {'resumed': 0, 'full': 0})
+
+    def test_resumption_disabled(self):
+        """
+        Test that resumption can be turned off
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                   tls_session_resumption=False)
+        self.assertIsNone(duo_client.tls_session_stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,232 @@
+from duo_universal import client
+from duo_universal.async_client import AsyncClient
+from duo_universal.token_cache import TokenExchangeCache, token_exchange_key
+from mock import MagicMock, patch
+from token_helpers import id_token, id_token_claims, token_response
+import asyncio
+import httpx
+import threading
+import time
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+DUO_CODE = "deadbeefdeadbeefdeadbeefdeadbeef"
+USERNAME = "username"
+NONCE = "abcdefghijklmnopqrstuvwxyzabcdef"
+ERROR_WRONG_DUO_CODE = b'{"error": "invalid_grant"}'
+
+
+class TestTokenExchangeCache(unittest.TestCase):
+
+    def test_key_is_digest(self):
+        """
+        Test that keys tell exchanges apart without holding the duo_code
+        """
+        key = token_exchange_key(DUO_CODE, USERNAME, NONCE)
+        self.assertNotIn(DUO_CODE.encode(), key)
+        self.assertEqual(key, token_exchange_key(DUO_CODE, USERNAME, NONCE))
+        self.assertNotEqual(key, token_exchange_key(DUO_CODE, USERNAME, None))
+        self.assertNotEqual(key, token_exchange_key(DUO_CODE, "other", NONCE))
+
+    def test_returns_copies(self):
+        """
+        Test that callers cannot change a cached token
+        """
+        cache = TokenExchangeCache(30, 10)
+        token = id_token_claims()
+        cache.put(b'key', token)
+        token['auth_result']['result'] = 'deny'
+        cached = cache.get(b'key')
+        cached['auth_result']['result'] = 'deny'
+        self.assertEqual(cache.get(b'key')['auth_result']['result'], 'allow')
+
+    @patch('time.monotonic')
+    def test_ttl(self, monotonic_mock):
+        """
+        Test that entries expire after the ttl
+        """
+        monotonic_mock.return_value = 100
+        cache = TokenExchangeCache(30, 10)
+        cache.put(b'key', id_token_claims())
+        monotonic_mock.return_value = 129
+        self.assertIsNotNone(cache.get(b'key'))
+        monotonic_mock.return_value = 130
+        self.assertIsNone(cache.get(b'key'))
+        self.assertEqual(len(cache), 0)
+
+    @patch('time.monotonic')
+    def test_ttl_capped_by_token_expiry(self, monotonic_mock):
+        """
+        Test that an entry never outlives its id_token
+        """
+        monotonic_mock.return_value = 100
+        cache = TokenExchangeCache(30, 10)
+        cache.put(b'key', id_token_claims(exp=time.time() + 10))
+        monotonic_mock.return_value = 111
+        self.assertIsNone(cache.get(b'key'))
+        cache.put(b'expired', id_token_claims(exp=time.time() - 1))
+        self.assertEqual(len(cache), 0)
+
+    def test_bounded(self):
+        """
+        Test that the oldest entry is dropped once the cache is full
+        """
+        cache = TokenExchangeCache(30, 2)
+        for key in (b'a', b'b', b'c'):
+            cache.put(key, id_token_claims())
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(b'a'))
+        self.assertIsNotNone(cache.get(b'c'))
+
+
+class TestClientTokenExchangeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                    token_exchange_cache_ttl=client.DEFAULT_TOKEN_EXCHANGE_CACHE_TTL)
+
+    @patch('requests.Session.post')
+    def test_duplicate_callback_served_from_cache(self, post_mock):
+        """
+        Test that a repeated exchange is answered without calling Duo
+        """
+        post_mock.return_value = token_response()
+        first = self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, NONCE)
+        post_mock.return_value = MagicMock(status_code=400, content=ERROR_WRONG_DUO_CODE)
+        second = self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, NONCE)
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+        self.assertEqual(post_mock.call_count, 1)
+
+    @patch('requests.Session.post')
+    def test_other_username_not_served(self, post_mock):
+        """
+        Test that a cached result is only replayed for the same username and nonce
+        """
+        post_mock.return_value = token_response()
+        self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, NONCE)
+        with self.assertRaises(client.DuoException):
+            self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, "other_username", NONCE)
+        self.assertEqual(post_mock.call_count, 2)
+
+    @patch('requests.Session.post')
+    def test_failures_not_cached(self, post_mock):
+        """
+        Test that a failed exchange is retried with Duo
+        """
+        post_mock.return_value = MagicMock(status_code=400, content=ERROR_WRONG_DUO_CODE)
+        with self.assertRaises(client.DuoException):
+            self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, NONCE)
+        post_mock.return_value = token_response()
+        self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, NONCE)
+        self.assertEqual(post_mock.call_count, 2)
+
+    @patch('requests.Session.post')
+    def test_cache_disabled_by_default(self, post_mock):
+        """
+        Test that by default a replayed duo_code is sent to Duo again and rejected
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        self.assertIsNone(duo_client._token_exchange_cache)
+        post_mock.return_value = token_response()
+        duo_client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, NONCE)
+        post_mock.return_value = MagicMock(status_code=400, content=ERROR_WRONG_DUO_CODE)
+        with self.assertRaises(client.DuoException):
+            duo_client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, NONCE)
+        self.assertEqual(post_mock.call_count, 2)
+
+    @patch('requests.Session.post')
+    def test_concurrent_exchanges_coalesced(self, post_mock):
+        """
+        Test that concurrent exchanges of one duo_code share a single request
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        release = threading.Event()
+
+        def slow_post(*args, **kwargs):
+            release.wait(5)
+            return token_response()
+
+        post_mock.side_effect = slow_post
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            duo_client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, NONCE)))
+            for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(post_mock.call_count, 1)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(len({id(result) for result in results}), 4)
+
+    @patch('requests.Session.post')
+    def test_waiter_deadline(self, post_mock):
+        """
+        Test that a coalesced caller still honours its own deadline
+        """
+        release = threading.Event()
+
+        def slow_post(*args, **kwargs):
+            release.wait(5)
+            return token_response()
+
+        post_mock.side_effect = slow_post
+        leader = threading.Thread(target=self.client.exchange_authorization_code_for_2fa_result,
+                                  args=(DUO_CODE, USERNAME, NONCE))
+        leader.start()
+        time.sleep(0.05)
+        try:
+            with self.assertRaises(client.DuoTimeoutException):
+                self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME, NONCE,
+                                                                       deadline=0.01)
+        finally:
+            release.set()
+            leader.join()
+
+    def test_invalid_config(self):
+        """
+        Test that invalid cache settings raise DuoException
+        """
+        for ttl, size in ((-1, 10), (30, 0)):
+            with self.assertRaises(client.DuoException):
+                client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                              token_exchange_cache_ttl=ttl, token_exchange_cache_size=size)
+
+
+class TestAsyncClientTokenExchangeCache(unittest.TestCase):
+
+    def test_concurrent_and_duplicate_exchanges(self):
+        """
+        Test that AsyncClient coalesces concurrent exchanges and caches the result
+        """
+        duo_client = AsyncClient(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                 token_exchange_cache_ttl=client.DEFAULT_TOKEN_EXCHANGE_CACHE_TTL)
+        requests = []
+
+        async def handler(request):
+            requests.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={'id_token': id_token()})
+
+        duo_client._build_async_session = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        async def exchange_repeatedly():
+            exchange = duo_client.exchange_authorization_code_for_2fa_result
+            results = await asyncio.gather(*[exchange(DUO_CODE, USERNAME, NONCE) for _ in range(3)])
+            results.append(await exchange(DUO_CODE, USERNAME, NONCE))
+            await duo_client.aclose()
+            return results
+
+        results = asyncio.run(exchange_repeatedly())
+        self.assertEqual(len(requests), 1)
+        self.assertTrue(all(result == results[0] for result in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+from duo_universal import client, tracing
+from duo_universal.async_client import AsyncClient
+from mock import MagicMock, patch
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import SpanKind, StatusCode
+from token_helpers import id_token, token_response
+import asyncio
+import httpx
+import requests
+import unittest
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+REDIRECT_URI = "https://www.example.com"
+DUO_CODE = "deadbeefdeadbeefdeadbeefdeadbeef"
+USERNAME = "username"
+SUCCESS_CHECK = b'{"stat": "OK", "response": {"timestamp": 1}}'
+TOKEN_ENDPOINT = client.OAUTH_V1_TOKEN_ENDPOINT.format(HOST)
+HEALTH_CHECK_ENDPOINT = client.OAUTH_V1_HEALTH_CHECK_ENDPOINT.format(HOST)
+
+
+class TracingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        self.provider = TracerProvider()
+        self.provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        self.tracer = tracing.OpenTelemetryTracer(tracer_provider=self.provider)
+
+    def spans(self):
+        return {span.name: span for span in self.exporter.get_finished_spans()}
+
+    def assert_children(self, spans, parent_name, child_names):
+        parent = spans[parent_name]
+        for name in child_names:
+            self.assertEqual(spans[name].parent.span_id, parent.context.span_id)
+            self.assertEqual(spans[name].context.trace_id, parent.context.trace_id)
+
+
+class TestClientTracing(TracingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI,
+                                    tracer=self.tracer)
+
+    def test_no_tracer_records_nothing(self):
+        """
+        Test that a client without a tracer uses the no-op span
+        """
+        duo_client = client.Client(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI)
+        self.assertIs(duo_client._tracer, tracing.NOOP_TRACER)
+        self.assertIs(duo_client._http_span(client.OAUTH_V1_TOKEN_ENDPOINT), tracing.NOOP_SPAN)
+        self.assertNotIn('_tracer', duo_client.__dict__)
+        with patch('requests.Session.post') as post_mock:
+            post_mock.return_value = MagicMock(status_code=200, content=SUCCESS_CHECK)
+            duo_client.health_check()
+        self.assertEqual(post_mock.call_args[1]['headers'], {})
+
+    @patch('requests.Session.post')
+    def test_health_check_span(self, post_mock):
+        """
+        Test that a health check records a client span with the HTTP attributes
+        """
+        post_mock.return_value = MagicMock(status_code=200, content=SUCCESS_CHECK)
+        self.client.health_check()
+        spans = self.spans()
+        span = spans['POST /oauth/v1/health_check']
+        self.assertEqual(span.kind, SpanKind.CLIENT)
+        self.assertEqual(dict(span.attributes), {
+            'http.request.method': 'POST',
+            'url.full': HEALTH_CHECK_ENDPOINT,
+            'server.address': HOST,
+            'server.port': 443,
+            'http.response.status_code': 200,
+        })
+        self.assertEqual(span.status.status_code, StatusCode.UNSET)
+        self.assert_children(spans, 'POST /oauth/v1/health_check', [tracing.SPAN_SIGN])
+
+    @patch('requests.Session.post')
+    def test_exchange_spans(self, post_mock):
+        """
+        Test that a token exchange records sign and verify spans under its client span
+        """
+        post_mock.return_value = token_response()
+        self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
+        spans = self.spans()
+        self.assertEqual(sorted(spans), ['POST /oauth/v1/token', tracing.SPAN_SIGN, tracing.SPAN_VERIFY])
+        self.assertEqual(spans['POST /oauth/v1/token'].attributes['url.full'], TOKEN_ENDPOINT)
+        self.assert_children(spans, 'POST /oauth/v1/token', [tracing.SPAN_SIGN, tracing.SPAN_VERIFY])
+
+    @patch('requests.Session.post')
+    def test_trace_context_injected(self, post_mock):
+        """
+        Test that the request carries a traceparent header for the client span
+        """
+        post_mock.return_value = token_response()
+        self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
+        headers = post_mock.call_args[1]['headers']
+        span = self.spans()['POST /oauth/v1/token']
+        self.assertIn('duo_universal_python/', headers['user-agent'])
+        version, trace_id, span_id, flags = headers['traceparent'].split('-')
+        self.assertEqual(int(trace_id, 16), span.context.trace_id)
+        self.assertEqual(int(span_id, 16), span.context.span_id)
+
+    @patch('requests.Session.post')
+    def test_joins_active_span(self, post_mock):
+        """
+        Test that calls made inside an application span join its trace
+        """
+        post_mock.return_value = MagicMock(status_code=200, content=SUCCESS_CHECK)
+        with self.provider.get_tracer('app').start_as_current_span('login') as login:
+            self.client.health_check()
+        span = self.spans()['POST /oauth/v1/health_check']
+        self.assertEqual(span.parent.span_id, login.get_span_context().span_id)
+
+    @patch('requests.Session.post')
+    def test_error_response(self, post_mock):
+        """
+        Test that a rejected exchange marks its span failed with Duo's error
+        """
+        post_mock.return_value = MagicMock(status_code=400, content=b'{"error": "invalid_grant"}')
+        with self.assertRaises(client.DuoException):
+            self.client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
+        span = self.spans()['POST /oauth/v1/token']
+        self.assertEqual(span.status.status_code, StatusCode.ERROR)
+        self.assertEqual(span.attributes['error.type'], 'invalid_grant')
+        self.assertEqual(span.attributes['http.response.status_code'], 400)
+        self.assertEqual(span.events[0].name, 'exception')
+
+    @patch('requests.Session.post', MagicMock(side_effect=requests.Timeout("timed out")))
+    def test_timeout(self):
+        """
+        Test that a timed out call marks its span failed with error.type timeout
+        """
+        with self.assertRaises(client.DuoTimeoutException):
+            self.client.health_check()
+        span = self.spans()['POST /oauth/v1/health_check']
+        self.assertEqual(span.attributes['error.type'], 'timeout')
+        self.assertNotIn('http.response.status_code', span.attributes)
+
+    def test_opentelemetry_missing(self):
+        """
+        Test that OpenTelemetryTracer explains how to install the extra
+        """
+        with patch.object(tracing, 'otel_trace', None):
+            with self.assertRaises(ImportError) as cm:
+                tracing.OpenTelemetryTracer()
+        self.assertEqual(str(cm.exception), tracing.ERR_OPENTELEMETRY_MISSING)
+
+
+class TestAsyncClientTracing(TracingTestCase):
+
+    def test_exchange_spans(self):
+        """
+        Test that AsyncClient records the same spans and headers as Client
+        """
+        requests_seen = []
+
+        def handler(request):
+            requests_seen.append(request)
+            return httpx.Response(200, json={'id_token': id_token()})
+
+        duo_client = AsyncClient(CLIENT_ID, CLIENT_SECRET, HOST, REDIRECT_URI, tracer=self.tracer)
+        duo_client._build_async_session = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        async def exchange():
+            await duo_client.exchange_authorization_code_for_2fa_result(DUO_CODE, USERNAME)
+            await duo_client.aclose()
+
+        asyncio.run(exchange())
+        spans = self.spans()
+        self.assert_children(spans, 'POST /oauth/v1/token', [tracing.SPAN_SIGN, tracing.SPAN_VERIFY])
+        trace_id = requests_seen[0].headers['traceparent'].split('-')[1]
+        self.assertEqual(int(trace_id, 16), spans['POST /oauth/v1/token'].context.trace_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+Id token fixtures shared by the tests that exchange a duo_code
+"""
+from duo_universal import client
+from mock import MagicMock
+import jwt
+import time
+
+CLIENT_ID = "DIXXXXXXXXXXXXXXXXXX"
+CLIENT_SECRET = "deadbeefdeadbeefdeadbeefdeadbeefdeadbeef"
+HOST = "api-XXXXXXX.test.duosecurity.com"
+USERNAME = "username"
+NONCE = "abcdefghijklmnopqrstuvwxyzabcdef"
+
+
+def id_token_claims(**overrides):
+    """
+    Returns the claims of a valid id_token for USERNAME, updated with `overrides`
+    """
+    claims = {
+        "aud": CLIENT_ID,
+        "exp": time.time() + client.FIVE_MINUTES_IN_SECONDS,
+        "iat": time.time(),
+        "iss": client.OAUTH_V1_TOKEN_ENDPOINT.format(HOST),
+        "preferred_username": USERNAME,
+        "nonce": NONCE,
+        "auth_result": {"result": "allow"},
+    }
+    claims.update(overrides)
+    return claims
+
+
+def id_token(secret=CLIENT_SECRET, **overrides):
+    """
+    Returns an id_token signed with `secret`
+    """
+    return jwt.encode(id_token_claims(**overrides), secret, algorithm='HS512')
+
+
+def token_response(secret=CLIENT_SECRET, **overrides):
+    """
+    Returns a mocked successful token endpoint response
+    """
+    response = MagicMock(status_code=200)
+    response.json.return_value = {'id_token': id_token(secret, **overrides)}
+    return response